@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# ==============================
+# ======| Ring Buffer |=========
+# ==============================
+
+class RingBuffer:
+    def __init__(self, capacity):
+        """
+        Fixed-size byte ring buffer. Memory is allocated once; writing past the
+        capacity overwrites the oldest bytes.
+        :param capacity: buffer size in bytes
+        """
+        self.buffer     = bytearray(capacity)
+        self.capacity   = capacity
+        self.write_pos  = 0     # Next byte to write
+        self.size       = 0     # Valid bytes currently held
+
+
+    def __len__(self):
+        return self.size
+
+
+    def write(self, data):
+        """
+        Append data, dropping the oldest bytes once the buffer is full.
+        :param data: bytes-like object
+        """
+        if self.capacity == 0:
+            return
+
+        view = memoryview(data).cast("B")
+        if len(view) >= self.capacity:     # Only the newest capacity bytes survive
+            view = view[len(view) - self.capacity:]
+
+        first = min(len(view), self.capacity - self.write_pos)
+        self.buffer[self.write_pos:self.write_pos + first] = view[:first]
+        self.buffer[:len(view) - first] = view[first:]
+
+        self.write_pos = (self.write_pos + len(view)) % self.capacity
+        self.size = min(self.size + len(view), self.capacity)
+
+
+    def views(self):
+        """
+        Zero-copy views of the held bytes, oldest first (one or two memoryviews).
+        They are only valid until the next write.
+        """
+        start = (self.write_pos - self.size) % self.capacity if self.capacity else 0
+        view = memoryview(self.buffer)
+        if start + self.size <= self.capacity:
+            return [view[start:start + self.size]]
+        return [view[start:], view[:self.write_pos]]
+
+
+    def read_all(self):
+        """
+        Return the held bytes, oldest first.
+        """
+        return b''.join(self.views())
+
+
+    def clear(self):
+        self.write_pos  = 0
+        self.size       = 0
+
+
+# ==============================
+# ======| Capture Buffer |======
+# ==============================
+
+class CaptureBuffer:
+    def __init__(self, capacity, growable=False):
+        """
+        Append-only byte store for one utterance, allocated once. Audio handed
+        downstream is a memoryview into it (no copy); the store is never reused
+        or resized in place, so those views stay valid after the capture moves on.
+        :param capacity: store size in bytes
+        :param growable: when full, move to a store twice as large (one copy)
+                         instead of refusing the write
+        """
+        self.buffer     = bytearray(capacity)
+        self.size       = 0     # Bytes written so far
+        self.growable   = growable
+
+
+    def __len__(self):
+        return self.size
+
+
+    @property
+    def remaining(self):
+        return len(self.buffer) - self.size
+
+
+    def write(self, data):
+        """
+        Append data.
+        :param data: bytes-like object
+        :return: False (nothing written) when the store is full and not growable
+        """
+        view = memoryview(data).cast("B")
+        if len(view) > self.remaining:
+            if not self.growable:
+                return False
+            # Views already handed out keep the old store alive, so it is replaced, not resized
+            capacity = max(2 * len(self.buffer), self.size + len(view))
+            buffer = bytearray(capacity)
+            buffer[:self.size] = self.buffer[:self.size]
+            self.buffer = buffer
+
+        self.buffer[self.size:self.size + len(view)] = view
+        self.size += len(view)
+        return True
+
+
+    def view(self, start=0, stop=None):
+        """
+        Zero-copy view of the bytes written between start and stop (the end if None).
+        """
+        return memoryview(self.buffer)[start:self.size if stop is None else stop]
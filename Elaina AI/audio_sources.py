@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import os
+import time
+import wave
+import numpy
+from vad import SAMPLE_WIDTH, SAMPLE_DTYPE
+
+# Audio sources all expose the same minimal interface as a pyaudio input stream:
+#   read(num_frames) -> bytes   (raises EOFError once a finite source is exhausted)
+#   close()
+# so the Recorder can run against a microphone, a WAV file or an in-memory buffer.
+
+
+# ===============================
+# ======| Finite Sources |=======
+# ===============================
+
+class BytesSource:
+    def __init__(self, data, channels=1):
+        """
+        Audio source over raw 16-bit PCM held in memory.
+        :param data: bytes, bytearray or memoryview of PCM samples
+        :param channels: number of interleaved channels in data
+        """
+        self.data       = memoryview(data).cast("B")
+        self.frame_size = SAMPLE_WIDTH * channels
+        self.position   = 0
+
+
+    def read(self, num_frames, exception_on_overflow=True):
+        """
+        Read the next num_frames frames. The last read may be short.
+        :param num_frames: number of frames to read
+        """
+        if self.position >= len(self.data):
+            raise EOFError("End of audio buffer")
+        end = self.position + num_frames * self.frame_size
+        frames = bytes(self.data[self.position:end])
+        self.position = end
+        return frames
+
+
+    def close(self):
+        self.data.release()
+
+
+class WavSource:
+    def __init__(self, filename, rate=None, channels=None):
+        """
+        Audio source reading 16-bit PCM frames from a WAV file.
+        :param filename: path to the .wav file
+        :param rate: sample rate the file must have (None accepts any); the VAD and endpointing
+                     presets are tuned for the capture rate, so other files are rejected
+        :param channels: channel count the file must have (None accepts any)
+        """
+        self.wf = wave.open(filename, "rb")
+        sample_width = self.wf.getsampwidth()
+        if sample_width != SAMPLE_WIDTH:
+            self.wf.close()
+            raise ValueError(f"{filename}: expected 16-bit PCM, got {sample_width * 8}-bit")
+
+        self.rate       = self.wf.getframerate()
+        self.channels   = self.wf.getnchannels()
+        if (rate is not None and self.rate != rate) or (channels is not None and self.channels != channels):
+            self.wf.close()
+            raise ValueError(f"{filename}: expected {rate or self.rate} Hz, {channels or self.channels} channel(s), "
+                             f"got {self.rate} Hz, {self.channels} channel(s) "
+                             f"(long_audio.py transcribes files of any rate)")
+
+
+    def read(self, num_frames, exception_on_overflow=True):
+        """
+        Read the next num_frames frames. The last read may be short.
+        :param num_frames: number of frames to read
+        """
+        frames = self.wf.readframes(num_frames)
+        if not frames:
+            raise EOFError("End of WAV file")
+        return frames
+
+
+    def close(self):
+        self.wf.close()
+
+
+class SyntheticSource:
+    def __init__(self, pattern, rate=16000, seed=0, realtime=False):
+        """
+        Deterministic generated audio, for exercising the capture pipeline without a device.
+        :param pattern: list of (seconds, amplitude) pairs, e.g. [(1, 30), (0.5, 4000), (2, 30)]
+                        low amplitudes stand in for background noise, high ones for speech
+        :param rate: sample rate (Hz)
+        :param seed: random seed for the generated noise
+        :param realtime: pace reads like a live device (sleep for the duration of each read)
+        """
+        self.rate       = rate
+        self.realtime   = realtime
+        self.rng        = numpy.random.default_rng(seed)
+        self.segments   = [(int(seconds * rate), amplitude) for seconds, amplitude in pattern]
+        self.segment    = 0     # Current segment index
+        self.offset     = 0     # Samples already produced from the current segment
+
+
+    def read(self, num_frames, exception_on_overflow=True):
+        """
+        Generate the next num_frames samples. The last read may be short.
+        :param num_frames: number of frames to read
+        """
+        if self.segment >= len(self.segments):
+            raise EOFError("End of synthetic audio")
+
+        out = numpy.empty(num_frames, dtype=SAMPLE_DTYPE)
+        filled = 0
+        while filled < num_frames and self.segment < len(self.segments):
+            length, amplitude = self.segments[self.segment]
+            take = min(num_frames - filled, length - self.offset)
+            noise = self.rng.standard_normal(take) * amplitude
+            out[filled:filled + take] = numpy.clip(noise, -32768, 32767)
+
+            filled += take
+            self.offset += take
+            if self.offset == length:
+                self.segment += 1
+                self.offset = 0
+
+        if self.realtime:
+            time.sleep(filled / self.rate)
+        return out[:filled].tobytes()
+
+
+    def close(self):
+        self.segment = len(self.segments)
+
+
+# ===============================
+# ======| Microphone Source |====
+# ===============================
+
+class MicrophoneSource:
+    def __init__(self, rate, channels, chunk):
+        """
+        Audio source reading from the default input device through pyaudio.
+        :param rate: sample rate (Hz)
+        :param channels: number of channels
+        :param chunk: frames per buffer
+        """
+        import pyaudio  # only needed when an actual device is used
+
+        self.p = pyaudio.PyAudio()
+        self.stream = self.p.open(format=pyaudio.paInt16,
+                                  channels=channels,
+                                  rate=rate,
+                                  input=True,
+                                  output=True,
+                                  frames_per_buffer=chunk)
+
+
+    def read(self, num_frames, exception_on_overflow=True):
+        return self.stream.read(num_frames, exception_on_overflow=exception_on_overflow)
+
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.p.terminate()
+
+
+def open_source(source, rate, channels, chunk):
+    """
+    Resolve a Recorder source argument into an audio source.
+    :param source: None (microphone), a .wav path, raw PCM bytes, or an object with read()/close()
+    """
+    if source is None:
+        return MicrophoneSource(rate, channels, chunk)
+    if isinstance(source, (str, os.PathLike)):
+        return WavSource(source, rate, channels)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesSource(source, channels)
+    return source
@@ -27,27 +27,64 @@
 import os
 from utils.helper import uprint
 import speech_recognition as sr
+from stt_backends import get_backend
+
+default_backend = None
+recognizer = None   # sr.Recognizer reading .wav files, created once by setup_sr()
 
 def setup_sr():
-    r = sr.Recognizer()
-    return r
+    """
+    sr.Recognizer shared by every wav_to_text call (created once, on first use).
+    """
+    global recognizer
+    if recognizer is None:
+        recognizer = sr.Recognizer()
+    return recognizer
+
+def get_default_backend():
+    """
+    Backend shared by audio_to_text/wav_to_text (created once, on first use).
+    """
+    global default_backend
+    if default_backend is None:
+        default_backend = get_backend()
+    return default_backend
+
+def audio_to_text(audio, backend=None):
+    """
+    Recognize in-memory audio.
+    :param audio: sr.AudioData, or raw PCM frames captured with the default presets
+    :param backend: SpeechBackend to use (the shared default backend if None)
+    :return: recognized text, or None if nothing was understood
+    """
+    if backend is None:
+        backend = get_default_backend()
+
+    user_texts = backend.recognize(audio)
+    if user_texts is not None:
+        uprint(user_texts)
+    return user_texts
 
-def wav_to_text(wav_file=None):
-    r = setup_sr()
-    
+def wav_to_text(wav_file=None, backend=None, long_audio=False):
+    """
+    Recognize a .wav file.
+    :param long_audio: stream the file and recognize it segment by segment, split at
+                       silences (see long_audio.py), instead of in one request
+    """
     if wav_file == None:
         wav_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_recordings/user_audio.wav")
 
-    with sr.AudioFile(wav_file) as source:
-        audio = r.record(source)
-    try:
-        user_texts = r.recognize_google(audio)
-        uprint(user_texts)
+    if long_audio:
+        from long_audio import transcribe_wav
+        user_texts = transcribe_wav(wav_file, backend if backend is not None else get_default_backend())
+        if user_texts is not None:
+            uprint(user_texts)
         return user_texts
-    except Exception as e:
-        uprint("Exception: " + str(e), dev=True)
-        return None
-    
+
+    with sr.AudioFile(wav_file) as source:
+        audio = setup_sr().record(source)
+    return audio_to_text(audio, backend)
+
 
 if __name__ == "__main__":
     setup_sr()
@@ -0,0 +1,391 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Benchmark suite for the voice pipeline: every stage on its own (rms, VAD,
+# endpointing, tokenization, bag of words, model, routing, recognition overhead),
+# the full capture -> recognition -> comprehension loop on a fake audio stream,
+# and startup. Audio fixtures are generated (SyntheticSource) and, when given,
+# recorded WAV files. Stages whose dependencies are missing are reported as
+# skipped instead of aborting the run.
+# Usage (from this directory):
+#   python benchmark.py --output results.json
+#   python benchmark.py --wav audio_recordings/*.wav --baseline baseline.json
+
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import platform
+import subprocess
+from concurrent.futures import wait
+import numpy
+
+
+# ===============================
+# ======| Benchmark Presets |=====
+# ===============================
+
+REPEAT                  = 200   # Timed calls per stage
+WARMUP                  = 10    # Untimed calls before timing a stage
+REGRESSION_THRESHOLD    = 0.10  # Relative p50 slowdown reported as a regression
+FULL_LOOP_UTTERANCES    = 20    # Utterances in the full loop fake stream
+
+# Fake stream: background noise, then utterances separated by silence
+SYNTHETIC_UTTERANCE     = [(0.8, 3000), (0.2, 10), (0.6, 3000)]
+SYNTHETIC_GAP           = (1.3, 10)
+CALIBRATION_NOISE       = (1.2, 10)
+
+
+def percentiles(samples):
+    p50, p95, p99 = numpy.percentile(samples, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "mean": float(numpy.mean(samples))}
+
+
+class BenchmarkSuite:
+    def __init__(self, repeat=REPEAT, warmup=WARMUP):
+        self.repeat     = repeat
+        self.warmup     = warmup
+        self.results    = {}    # benchmark name -> result dict
+        self.parity     = {}    # comparison name -> agreement between two implementations
+
+
+    def measure(self, name, function, *args, items=1, unit="call", repeat=None):
+        """
+        Time function(*args) repeatedly.
+        :param items: units of work done by one call (throughput is reported per item)
+        :param unit: what an item is (call, chunk, text, second of audio...)
+        """
+        repeat = repeat or self.repeat
+        try:
+            for _ in range(self.warmup):
+                function(*args)
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function(*args)
+                samples.append(time.perf_counter() - start)
+        except Exception as e:
+            return self.skip(name, e)
+        self.record(name, samples, items, unit)
+
+
+    def record(self, name, samples, items=1, unit="call"):
+        result = {"samples": len(samples), "unit": unit, **percentiles(samples)}
+        result["throughput"] = items * len(samples) / sum(samples) if sum(samples) else 0.0
+        self.results[name] = result
+        return result
+
+
+    def skip(self, name, error):
+        message = next((line for line in str(error).splitlines() if line.strip() and "*" not in line), "")
+        self.results[name] = {"skipped": f"{type(error).__name__}: {message.strip()}"}
+
+
+    def report(self):
+        width = max(len(name) for name in self.results)
+        for name, result in self.results.items():
+            if "skipped" in result:
+                print(f"{name:<{width}}  skipped ({result['skipped']})")
+                continue
+            print(f"{name:<{width}}  p50 {result['p50'] * 1000:9.3f} ms  p95 {result['p95'] * 1000:9.3f} ms  "
+                  f"p99 {result['p99'] * 1000:9.3f} ms  {result['throughput']:12.1f} {result['unit']}/s")
+        for name, parity in self.parity.items():
+            if "skipped" in parity:
+                print(f"{name}: skipped ({parity['skipped']})")
+                continue
+            print(f"{name}: {parity['identical']}/{parity['texts']} identical")
+            for text, expected, actual in parity["differences"]:
+                print(f"    {text!r}: {expected} != {actual}")
+
+
+# ==============================
+# ======| Fixtures |============
+# ==============================
+
+def synthetic_frames(pattern, seed=0):
+    from audio_sources import SyntheticSource
+    source, chunks = SyntheticSource(pattern, seed=seed), []
+    while True:
+        try:
+            chunks.append(source.read(1024))
+        except EOFError:
+            return b''.join(chunks)
+
+
+def fake_stream_pattern(utterances):
+    return [CALIBRATION_NOISE] + (SYNTHETIC_UTTERANCE + [SYNTHETIC_GAP]) * utterances
+
+
+def load_wav_fixtures(filenames):
+    """
+    Recorded fixtures in the capture format; other files are left out with a note.
+    """
+    from record_audio import RATE, CHANNELS
+    from vad import SAMPLE_WIDTH
+
+    fixtures = {}
+    for filename in filenames:
+        try:
+            with wave.open(filename, "rb") as wf:
+                if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (RATE, CHANNELS, SAMPLE_WIDTH):
+                    raise ValueError("not 16 kHz mono 16-bit PCM")
+                fixtures[os.path.basename(filename)] = wf.readframes(wf.getnframes())
+        except (OSError, EOFError, ValueError, wave.Error) as e:
+            print(f"Skipping fixture {filename}: {e}", file=sys.stderr)
+    return fixtures
+
+
+# ==============================
+# ======| Stages |==============
+# ==============================
+
+def bench_audio(suite, fixtures):
+    import vad
+    from record_audio import CHUNK, RATE, Recorder
+    from endpointer import Endpointer
+
+    utterance = synthetic_frames(SYNTHETIC_UTTERANCE)
+    chunk = utterance[:CHUNK * vad.SAMPLE_WIDTH]
+    suite.measure("audio.rms", Recorder.rms, chunk, unit="chunk")
+    suite.measure("audio.vad_block", vad.VoiceActivityDetector(hangover_frames=15, chunk=CHUNK).process, utterance,
+                  items=len(utterance) / (RATE * vad.SAMPLE_WIDTH), unit="audio second")
+
+    for name, frames in {"synthetic": synthetic_frames(fake_stream_pattern(3)), **fixtures}.items():
+        def endpoint(frames=frames):
+            endpointer = Endpointer()
+            for offset in range(0, len(frames), CHUNK * vad.SAMPLE_WIDTH):
+                endpointer.feed(frames[offset:offset + CHUNK * vad.SAMPLE_WIDTH])
+            endpointer.flush()
+        suite.measure(f"audio.endpointer[{name}]", endpoint, repeat=max(1, suite.repeat // 20),
+                      items=len(frames) / (RATE * vad.SAMPLE_WIDTH), unit="audio second")
+
+
+def bench_text(suite):
+    """
+    :return: (router, texts) for the later stages, router None if the model cannot be loaded
+    """
+    from neural_network.featurizer import tokenize, BagOfWordsFeaturizer
+    from neural_network import train_neural_net as tnn
+
+    texts = [pattern for intent in tnn.load_intents()["intents"] for pattern in intent["patterns"]]
+    texts = [f"elaina {text}" for text in texts]
+    suite.measure("text.tokenize", lambda: [tokenize(text) for text in texts], items=len(texts), unit="text")
+
+    try:
+        trained_model, words, labels = tnn.load_inference_model()
+    except Exception as e:
+        for name in ("text.bag_of_words", "text.comprehend_text", "text.comprehend_batch",
+                     "router.comprehend", "router.comprehend_batch_uncached"):
+            suite.skip(name, e)
+        return None, texts
+
+    featurizer = BagOfWordsFeaturizer(words)
+    suite.measure("text.bag_of_words", lambda: [tnn.bag_of_words(text, featurizer) for text in texts],
+                  items=len(texts), unit="text")
+    suite.measure("text.comprehend_text", tnn.comprehend_text, trained_model, texts[0], featurizer, labels,
+                  unit="text")
+    suite.measure("text.comprehend_batch", tnn.comprehend_batch, trained_model, texts, featurizer, labels,
+                  items=len(texts), unit="text")
+
+    from intent_router import IntentRouter
+    router = IntentRouter(trained_model, featurizer, labels)
+    suite.measure("router.comprehend", router.comprehend, texts[-1], unit="text")
+    uncached = IntentRouter(trained_model, featurizer, labels, cache_size=0)
+    suite.measure("router.comprehend_batch_uncached", uncached.comprehend_batch, texts,
+                  items=len(texts), unit="text")
+    return router, texts
+
+
+def bench_tokenizer(suite):
+    """
+    Built-in regex tokenizer against nltk.word_tokenize: throughput (cold and warm
+    stem cache) and how often both give the same stemmed tokens.
+    """
+    from neural_network.featurizer import TextNormalizer
+    from neural_network import train_neural_net as tnn
+
+    texts = [pattern for intent in tnn.load_intents()["intents"] for pattern in intent["patterns"]]
+    texts += [f"elaina {text}" for text in texts]
+
+    normalizers = {name: TextNormalizer(name) for name in ("regex", "nltk")}
+    for name, normalizer in normalizers.items():
+        def warm(normalizer=normalizer):
+            for text in texts:
+                normalizer.tokenize(text)
+
+        def cold(normalizer=normalizer):
+            normalizer.stem.cache_clear()
+            warm(normalizer)
+
+        suite.measure(f"tokenizer.{name}[cold]", cold, items=len(texts), unit="text")
+        suite.measure(f"tokenizer.{name}[warm]", warm, items=len(texts), unit="text")
+
+    try:
+        differences = [(text, expected, actual) for text in texts
+                       for expected, actual in [(normalizers["nltk"].tokenize(text), normalizers["regex"].tokenize(text))]
+                       if expected != actual]
+    except Exception as e:
+        suite.parity["tokenizer.regex_vs_nltk"] = {"skipped": f"{type(e).__name__}"}
+        return
+    suite.parity["tokenizer.regex_vs_nltk"] = {"texts": len(texts), "identical": len(texts) - len(differences),
+                                               "differences": differences[:10]}
+
+
+def bench_recognition(suite):
+    from stt_backends import AsyncRecognizer, StandInBackend
+
+    frames = synthetic_frames(SYNTHETIC_UTTERANCE)
+    recognizer = AsyncRecognizer(StandInBackend())
+    suite.measure("recognition.async_overhead", lambda: recognizer.submit(frames).future.result())
+    recognizer.shutdown(wait=True)
+
+
+def bench_full_loop(suite, router, utterances=FULL_LOOP_UTTERANCES):
+    """
+    Fake stream -> CaptureService -> wake word screen -> stand-in ASR -> router, like main.run_elaina.
+    Latency runs from the moment an utterance is published to its intent.
+    """
+    from audio_sources import SyntheticSource
+    from capture_service import CaptureService
+    from stt_backends import AsyncRecognizer, StandInBackend
+    from wake_word import WakeWordSpotter
+
+    if router is None:
+        suite.skip("loop.turn", RuntimeError("needs the inference model"))
+        return
+
+    capture = CaptureService(SyntheticSource(fake_stream_pattern(utterances)))
+    recognizer = AsyncRecognizer(StandInBackend())
+    spotter = WakeWordSpotter()
+    samples = []
+    start = time.perf_counter()
+
+    capture.start()
+    while True:
+        utterance = capture.get_utterance()
+        if utterance is None:
+            break
+        turn_start = time.perf_counter()
+        if spotter.screen(utterance, capture.rms_threshold):
+            request = recognizer.submit(utterance)
+            wait([request.future])
+            text = request.result()
+            if spotter.confirm(text):
+                router.comprehend(text)
+        samples.append(time.perf_counter() - turn_start)
+    elapsed = time.perf_counter() - start
+
+    capture.stop()
+    recognizer.shutdown(wait=True)
+    if samples:
+        result = suite.record("loop.turn", samples, unit="turn")
+        result["wall_seconds"] = elapsed
+        result["turns_per_second"] = len(samples) / elapsed
+
+
+def bench_startup(suite, repeat=3):
+    """
+    Imports and model load in a fresh interpreter (see startup_profile.py).
+    """
+    samples = []
+    try:
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "startup_profile.py", "--json"], capture_output=True,
+                                    check=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+            samples.append(sum(phase["seconds"] for phase in json.loads(output)))
+    except (subprocess.CalledProcessError, ValueError) as e:
+        suite.skip("startup.total", e)
+        return
+    suite.record("startup.total", samples, unit="start")
+
+
+# ==============================
+# ======| Baseline Compare |====
+# ==============================
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare the p50 of every benchmark present (and not skipped) in both runs.
+    :return: names of the benchmarks slower than the baseline by more than threshold
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None or "skipped" in result or "skipped" in reference:
+            continue
+        ratio = result["p50"] / reference["p50"] if reference["p50"] else float("inf")
+        status = "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1 - threshold else "")
+        print(f"{name:<40} {reference['p50'] * 1000:10.3f} ms -> {result['p50'] * 1000:10.3f} ms  x{ratio:5.2f}  {status}")
+        if status == "REGRESSION":
+            regressions.append(name)
+    return regressions
+
+
+def run_benchmarks(wav_files=(), repeat=REPEAT,
+                   stages=("audio", "tokenizer", "text", "recognition", "loop", "startup")):
+    suite = BenchmarkSuite(repeat)
+    router = None
+    if "audio" in stages:
+        bench_audio(suite, load_wav_fixtures(wav_files))
+    if "tokenizer" in stages:
+        bench_tokenizer(suite)
+    if "text" in stages or "loop" in stages:
+        router, _ = bench_text(suite)
+    if "recognition" in stages:
+        bench_recognition(suite)
+    if "loop" in stages:
+        bench_full_loop(suite, router)
+    if "startup" in stages:
+        bench_startup(suite)
+    return suite
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the stages of Elaina's voice pipeline.")
+    parser.add_argument("--wav", nargs="*", default=[], help="recorded fixtures (16 kHz mono 16-bit WAV)")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed calls per stage")
+    parser.add_argument("--stages", default="audio,tokenizer,text,recognition,loop,startup")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results JSON of an earlier run")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative p50 slowdown reported as a regression")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    suite = run_benchmarks(args.wav, args.repeat, args.stages.split(","))
+    suite.report()
+
+    if args.output:
+        with open(args.output, "w") as wf:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "results": suite.results, "parity": suite.parity}, wf, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(suite.results, json.load(f)["results"], args.threshold)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,232 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Bulk transcription and classification of a directory of recorded utterances.
+# Decoding and recognition run on a process pool, transcripts are classified in
+# batches in the parent process, and results are appended to a JSONL file as
+# they arrive. The JSONL file doubles as the checkpoint: it is flushed to disk
+# after every batch, and a rerun skips every file it already lists.
+# Usage (from this directory):
+#   python bulk_transcribe.py audio_recordings results.jsonl
+#   python bulk_transcribe.py archive/ results.jsonl --workers 8 --backend standin
+#   python bulk_transcribe.py archive/ results.jsonl --no-classify
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from utils.helper import eprint
+
+
+# ====================================
+# ======| Bulk Transcribe Presets |===
+# ====================================
+
+AUDIO_EXTENSIONS        = (".wav",)
+CLASSIFY_BATCH_SIZE     = 64    # Transcripts classified (and checkpointed) together
+TASKS_PER_WORKER        = 4     # Files in flight per worker process, bounds parent memory
+
+
+# ==============================
+# ======| Worker Process |======
+# ==============================
+
+worker_backend = None   # Speech backend of the current worker process
+
+
+def init_worker(backend_name):
+    global worker_backend
+    from stt_backends import get_backend
+    worker_backend = get_backend(backend_name)
+
+
+def transcribe_file(path):
+    """
+    Decode and recognize one file (runs in a worker process). Service failures are
+    reported as errors, so that the next run retries the file.
+    :return: (path, text, duration in seconds, error)
+    """
+    import speech_recognition as sr
+    try:
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        return path, worker_backend.transcribe(audio), duration, None
+    except Exception as e:
+        return path, None, None, f"{type(e).__name__}: {e}"
+
+
+# ==============================
+# ======| Parent Process |======
+# ==============================
+
+def find_audio_files(directory):
+    """
+    Walk directory lazily, in a stable order.
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.join(root, filename)
+
+
+def load_checkpoint(output_file):
+    """
+    Files already listed in the JSONL output (failed ones excluded, they are retried).
+    A line cut short by an interrupted run is dropped so that the file can be appended to.
+    """
+    done = set()
+    if not os.path.exists(output_file):
+        return done
+
+    with open(output_file, "r+b") as f:
+        valid_length = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+                if "error" not in record:
+                    done.add(record["file"])
+            except (ValueError, KeyError):
+                break
+            valid_length += len(line)
+        f.truncate(valid_length)
+    return done
+
+
+class ResultWriter:
+    def __init__(self, output_file, directory, router=None, matcher=None, batch_size=CLASSIFY_BATCH_SIZE):
+        """
+        Classifies finished transcriptions in batches and appends them to the JSONL output.
+        :param router: IntentRouter (None to only transcribe)
+        :param matcher: WakeWordMatcher marking the transcripts addressed to Elaina
+        """
+        self.output         = open(output_file, "a", encoding="utf-8")
+        self.directory      = directory
+        self.router         = router
+        self.matcher        = matcher
+        self.batch_size     = batch_size
+        self.batch          = []
+        self.written        = 0
+        self.failed         = 0
+
+
+    def add(self, path, text, duration, error):
+        self.batch.append((path, text, duration, error))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+
+    def flush(self):
+        if not self.batch:
+            return
+
+        texts = [text for _, text, _, _ in self.batch if text is not None]
+        results = iter(self.router.comprehend_batch(texts) if self.router is not None and texts else [])
+
+        for path, text, duration, error in self.batch:
+            record = {"file": os.path.relpath(path, self.directory), "text": text, "duration": duration}
+            if error is not None:
+                record["error"] = error
+                self.failed += 1
+            if self.matcher is not None:
+                record["addressed"] = self.matcher.contains(text)
+            if self.router is not None and text is not None:
+                result = next(results)
+                record.update(intent=result.tag, slots=result.slots, confidence=result.confidence, tier=result.tier)
+            self.output.write(json.dumps(record) + "\n")
+
+        # Checkpoint: everything written so far survives an interruption
+        self.output.flush()
+        os.fsync(self.output.fileno())
+        self.written += len(self.batch)
+        self.batch = []
+
+
+    def close(self):
+        self.flush()
+        self.output.close()
+
+
+def bulk_transcribe(directory, output_file, workers=None, backend=None, classify=True,
+                    batch_size=CLASSIFY_BATCH_SIZE):
+    """
+    Transcribe (and classify) every WAV under directory that output_file does not list yet.
+    :param workers: worker processes (all cores by default)
+    :param backend: speech backend name (see stt_backends.BACKENDS)
+    :return: ResultWriter with the counts of the run
+    """
+    workers = workers or os.cpu_count() or 1
+    done = load_checkpoint(output_file)
+
+    router, matcher = None, None
+    if classify:
+        from intent_router import load_router
+        from wake_word import WakeWordMatcher
+        router, matcher = load_router(), WakeWordMatcher()
+
+    writer = ResultWriter(output_file, directory, router, matcher, batch_size)
+    start = time.perf_counter()
+    skipped = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(backend,)) as pool:
+            in_flight = set()
+            for path in find_audio_files(directory):
+                if os.path.relpath(path, directory) in done:
+                    skipped += 1
+                    continue
+                if len(in_flight) >= workers * TASKS_PER_WORKER:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        writer.add(*future.result())
+                in_flight.add(pool.submit(transcribe_file, path))
+
+            for future in wait(in_flight).done:
+                writer.add(*future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    eprint(f"{writer.written} files in {elapsed:.1f}s ({writer.failed} failed, {skipped} already done)", dev=True)
+    return writer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe and classify a directory of WAV recordings.")
+    parser.add_argument("directory")
+    parser.add_argument("output", help="JSONL results file (appended to, and used to resume)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--backend", help="speech-to-text backend (see stt_backends.BACKENDS)")
+    parser.add_argument("--batch-size", type=int, default=CLASSIFY_BATCH_SIZE,
+                        help="transcripts classified and checkpointed together")
+    parser.add_argument("--no-classify", action="store_true", help="only transcribe")
+    args = parser.parse_args()
+
+    writer = bulk_transcribe(args.directory, args.output, args.workers, args.backend,
+                             not args.no_classify, args.batch_size)
+    sys.exit(1 if writer.failed else 0)
@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import queue
+import threading
+from utils.helper import eprint
+from utils import metrics
+from audio_sources import open_source
+from endpointer import Endpointer, Segment, PRE_ROLL_FRAMES, SEGMENT_PAUSE_FRAMES, MAX_SEGMENT_FRAMES
+from record_audio import CHUNK, CHANNELS, RATE, NOISE_MARGIN, NOISE_ADAPT_RATE
+
+
+# ====================================
+# ======| Capture Service Presets |===
+# ====================================
+
+MAX_QUEUED_UTTERANCES   = 8     # Utterances waiting for a consumer before the oldest is dropped
+MAX_QUEUED_SEGMENTS     = 64    # Segments waiting for a consumer before the oldest is dropped
+
+
+# ======================================
+# ======| Capture Service Class |=======
+# ======================================
+
+class CaptureService:
+    def __init__(self, source=None, pre_roll_frames=PRE_ROLL_FRAMES, noise_margin=NOISE_MARGIN,
+                 noise_adapt_rate=NOISE_ADAPT_RATE, max_queued_utterances=MAX_QUEUED_UTTERANCES,
+                 stream_segments=False, segment_pause_frames=SEGMENT_PAUSE_FRAMES,
+                 max_segment_frames=MAX_SEGMENT_FRAMES):
+        """
+        Long-lived audio capture. One producer thread reads the source for the whole
+        lifetime of the service and runs it through an Endpointer (pre-roll, noise
+        floor tracking, VAD), putting every finished utterance on a queue.
+
+        :param source: audio input; None for the microphone, a .wav path, raw PCM bytes,
+                       or any object with read(num_frames)/close() (see audio_sources.py)
+        :param pre_roll_frames: chunks of audio kept from before the speech onset
+        :param noise_margin: rms above the noise floor that counts as speech
+        :param noise_adapt_rate: weight of every new silent chunk in the noise floor average
+        :param max_queued_utterances: queue size; the oldest utterance is dropped when full
+        :param stream_segments: publish Segment pieces of every utterance on self.segments as
+                                soon as a short pause (or max_segment_frames) is reached,
+                                instead of whole utterances on self.utterances
+        :param segment_pause_frames: silent chunks that close a segment
+        :param max_segment_frames: longest segment in chunks
+        """
+        self.source             = open_source(source, RATE, CHANNELS, CHUNK)
+        self.endpointer         = Endpointer(pre_roll_frames, noise_margin, noise_adapt_rate, stream_segments,
+                                             segment_pause_frames, max_segment_frames)
+        self.utterances         = queue.Queue(maxsize=max_queued_utterances)
+        self.segments           = queue.Queue(maxsize=MAX_QUEUED_SEGMENTS)
+
+        self.dropped_utterances = 0
+        self.dropped_segments   = 0
+        self.ready              = threading.Event()     # Set once the first noise floor estimate exists
+        self.finished           = threading.Event()     # Set when the source is exhausted or stopped
+        self.stop_requested     = threading.Event()
+        self.thread             = threading.Thread(target=self.run, name="elaina-capture", daemon=True)
+
+
+    def start(self):
+        self.thread.start()
+        return self
+
+
+    def stop(self, timeout=None):
+        """
+        Stop the producer thread and release the audio source.
+        """
+        self.stop_requested.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+        self.source.close()
+
+
+    def get_utterance(self, timeout=None):
+        """
+        Wait for the next captured utterance.
+        :param timeout: seconds to wait (None to wait until one arrives)
+        :return: raw PCM bytes, or None on timeout or once the source is exhausted
+        """
+        return self.get_next(self.utterances, timeout)
+
+
+    def get_segment(self, timeout=None):
+        """
+        Wait for the next streaming segment (stream_segments=True only).
+        :param timeout: seconds to wait (None to wait until one arrives)
+        :return: Segment, or None on timeout or once the source is exhausted
+        """
+        return self.get_next(self.segments, timeout)
+
+
+    def get_next(self, items, timeout):
+        while True:
+            try:
+                return items.get(timeout=0.1 if timeout is None else timeout)
+            except queue.Empty:
+                if self.finished.is_set():
+                    # The producer may have published its last item after the wait ran out
+                    try:
+                        return items.get_nowait()
+                    except queue.Empty:
+                        return None
+                if timeout is not None:
+                    return None
+
+
+    @property
+    def rms_threshold(self):
+        return self.endpointer.rms_threshold
+
+
+    @property
+    def noise_floor(self):
+        return self.endpointer.noise_floor
+
+
+    @property
+    def utterance_count(self):
+        return self.endpointer.utterance_count
+
+
+    # ==============================
+    # ======| Producer Thread |=====
+    # ==============================
+
+    def run(self):
+        try:
+            while not self.stop_requested.is_set():
+                try:
+                    data = self.source.read(CHUNK)
+                except EOFError:
+                    break
+
+                for item in self.endpointer.feed(data):
+                    self.publish(item)
+                if self.endpointer.calibrated:
+                    self.ready.set()
+
+            for item in self.endpointer.flush():
+                self.publish(item)
+        finally:
+            self.ready.set()
+            self.finished.set()
+
+
+    def publish(self, item):
+        """
+        Hand an utterance (or a Segment) to consumers, dropping the oldest queued one
+        when nobody keeps up.
+        """
+        if isinstance(item, Segment):
+            target, kind = self.segments, "segment"
+        else:
+            target, kind = self.utterances, "utterance"
+
+        while True:
+            try:
+                target.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    target.get_nowait()
+                    if kind == "segment":
+                        self.dropped_segments += 1
+                    else:
+                        self.dropped_utterances += 1
+                    metrics.count(f"dropped_{kind}s")
+                    eprint(f"The {kind} queue is full, dropping the oldest {kind}", dev=True)
+                except queue.Empty:
+                    pass
@@ -0,0 +1,263 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Endpointing state machine shared by the capture service and the voice server:
+# noise floor calibration and tracking, VAD with hangover, pre-roll, and cutting
+# the audio into utterances (or streaming segments). It only consumes bytes, so
+# any number of independent streams can run one each.
+
+import time
+from collections import namedtuple
+from utils import metrics
+from audio_buffers import RingBuffer, CaptureBuffer
+from vad import VoiceActivityDetector, SAMPLE_WIDTH
+import record_audio
+from record_audio import CHUNK, CHANNELS, TIMEOUT_FRAMES, CALIBRATION_FRAMES, ADAPTIVE_TIMEOUT, NOISE_MARGIN, \
+    NOISE_ADAPT_RATE, MAX_UTTERANCE_FRAMES, INITIAL_CAPTURE_FRAMES, archive_recording, make_hangover, make_noise_tracker
+
+
+# ===============================
+# ======| Endpoint Presets |=====
+# ===============================
+
+PRE_ROLL_FRAMES         = 10    # Chunks of audio kept from before the speech onset
+SEGMENT_PAUSE_FRAMES    = 3     # Silent chunks inside an utterance that close a streaming segment
+MAX_SEGMENT_FRAMES      = 32    # Longest streaming segment in chunks (~2s), cut even without a pause
+
+
+# Piece of an utterance published while the user is still speaking (streaming mode)
+Segment = namedtuple("Segment", ["utterance_id", "index", "frames", "final"])
+
+
+# ==============================
+# ======| Endpointer Class |=====
+# ==============================
+
+class Endpointer:
+    def __init__(self, pre_roll_frames=PRE_ROLL_FRAMES, noise_margin=NOISE_MARGIN,
+                 noise_adapt_rate=NOISE_ADAPT_RATE, stream_segments=False,
+                 segment_pause_frames=SEGMENT_PAUSE_FRAMES, max_segment_frames=MAX_SEGMENT_FRAMES,
+                 chunk=CHUNK, channels=CHANNELS, adaptive=ADAPTIVE_TIMEOUT,
+                 max_utterance_frames=MAX_UTTERANCE_FRAMES):
+        """
+        Turns a stream of raw PCM chunks into utterances.
+        :param pre_roll_frames: chunks of audio kept from before the speech onset
+        :param noise_margin: rms above the noise floor that counts as speech
+        :param noise_adapt_rate: weight of every new silent chunk in the noise floor average
+        :param stream_segments: emit Segment pieces of every utterance as soon as a short pause
+                                (or max_segment_frames) is reached, instead of whole utterances
+        :param segment_pause_frames: silent chunks that close a segment
+        :param max_segment_frames: longest segment in chunks
+        :param chunk: samples per chunk
+        :param channels: interleaved channels of the audio
+        :param adaptive: adaptive hangover and noise floor tracking during speech (see record_audio.py);
+                         False for the fixed TIMEOUT_LENGTH tail
+        :param max_utterance_frames: utterances are cut after this many chunks (None for no limit); speech
+                                     that goes on continues in the next utterance
+        """
+        self.chunk_bytes        = chunk * channels * SAMPLE_WIDTH
+        self.pre_roll           = RingBuffer(pre_roll_frames * self.chunk_bytes)
+        self.vad                = VoiceActivityDetector(hangover_frames=TIMEOUT_FRAMES, chunk=chunk,
+                                                        adaptive_hangover=make_hangover(adaptive))
+
+        self.noise              = make_noise_tracker(adaptive)
+        self.noise.margin       = noise_margin
+        self.noise.adapt_rate   = noise_adapt_rate
+        self.calibration        = []    # rms of the chunks read before the first noise floor estimate
+        self.max_utterance_frames = max_utterance_frames
+
+        self.chunks_fed         = 0     # Chunks consumed so far (stream position)
+        self.onset_chunk        = None  # Stream position of the utterance in progress
+        self.forced_endpoints   = 0     # Utterances cut at max_utterance_frames
+
+        self.stream_segments    = stream_segments
+        self.segment_pause_frames = segment_pause_frames
+        self.max_segment_frames = max_segment_frames
+        self.utterance_count    = 0
+
+        # Every utterance is captured into its own preallocated store and handed out as
+        # memoryviews of it, so publishing an utterance or a segment copies nothing
+        frames = max_utterance_frames if max_utterance_frames is not None else INITIAL_CAPTURE_FRAMES
+        self.store_bytes        = self.pre_roll.capacity + frames * self.chunk_bytes
+
+        self.recording          = None  # CaptureBuffer of the utterance in progress (None while idle)
+        self.recorded_frames    = 0     # Chunks recorded since the onset
+        self.segment_start      = 0     # Store offset of the streaming segment in progress
+        self.segment_frames     = 0     # Chunks in the streaming segment in progress
+        self.segment_index      = 0
+        self.pause_frames       = 0     # Trailing silent chunks of the segment in progress
+
+        self.trace_id           = None  # Trace of the utterance in progress (metrics enabled only)
+        self.started_at         = None  # perf_counter() of the calibration start / speech onset
+        self.last_voice_at      = None  # perf_counter() of the last voiced chunk
+
+
+    @property
+    def noise_floor(self):
+        return self.noise.floor
+
+
+    @property
+    def calibrated(self):
+        return self.noise.floor is not None
+
+
+    @property
+    def rms_threshold(self):
+        return self.vad.rms_threshold
+
+
+    def calibrate(self, energy):
+        """
+        Set the initial noise floor from the rms of known background audio. Detection
+        then starts with the first chunk fed instead of after CALIBRATION_FRAMES chunks.
+        """
+        self.noise.calibrate(energy)
+        self.vad.rms_threshold = self.noise.threshold
+
+
+    @property
+    def in_utterance(self):
+        return self.recording is not None
+
+
+    def feed(self, data):
+        """
+        Consume raw PCM audio holding one or more whole chunks.
+        :return: list of finished utterances (memoryviews of their capture store), or of Segments when streaming
+        """
+        energy, _, voiced = self.vad.analyze(data)
+        output = []
+        view = memoryview(data).cast("B")
+        for i in range(len(energy)):
+            chunk = view[i * self.chunk_bytes:(i + 1) * self.chunk_bytes]
+            self.feed_chunk(chunk, energy[i:i + 1], voiced[i:i + 1], output)
+        return output
+
+
+    def flush(self):
+        """
+        End of the stream: close the utterance in progress, if any.
+        :return: list of finished utterances (memoryviews of their capture store), or of Segments when streaming
+        """
+        output = []
+        if self.recording is not None:
+            self.finish_utterance(output)
+        return output
+
+
+    def feed_chunk(self, data, energy, voiced, output):
+        self.chunks_fed += 1
+
+        # Initial noise floor estimate (no detection until it exists)
+        if not self.calibrated:
+            if metrics.enabled and not self.calibration:
+                self.started_at = time.perf_counter()
+            self.calibration.extend(energy)
+            self.pre_roll.write(data)
+            if len(self.calibration) >= CALIBRATION_FRAMES:
+                self.noise.calibrate(self.calibration)
+                self.vad.rms_threshold = self.noise.threshold
+                if self.started_at is not None:
+                    metrics.observe("capture.calibration", time.perf_counter() - self.started_at)
+            return
+
+        active = self.vad.apply_hangover(voiced)[-1]
+        if self.recording is None:
+            if active:
+                self.recording = CaptureBuffer(self.store_bytes, growable=self.max_utterance_frames is None)
+                for view in self.pre_roll.views():
+                    self.recording.write(view)
+                self.recording.write(data)
+                self.recorded_frames = 1
+                self.pre_roll.clear()
+                self.utterance_count += 1
+                self.onset_chunk = self.chunks_fed - 1
+                self.segment_start, self.segment_frames, self.segment_index, self.pause_frames = 0, 1, 0, 0
+                self.trace_id = metrics.new_trace_id()
+                if self.trace_id is not None:
+                    self.started_at = self.last_voice_at = time.perf_counter()
+            else:
+                self.noise.update_silence(energy)
+                self.vad.rms_threshold = self.noise.threshold
+                self.pre_roll.write(data)
+            return
+
+        self.recording.write(data)
+        self.recorded_frames += 1
+        self.noise.update_speech(energy)
+        self.vad.rms_threshold = self.noise.threshold
+        if self.trace_id is not None and voiced[-1]:
+            self.last_voice_at = time.perf_counter()
+        if self.stream_segments:
+            self.segment_frames += 1
+            self.pause_frames = 0 if voiced[-1] else self.pause_frames + 1
+
+        # The store is full: end the utterance here, the speech goes on in the next one
+        forced = self.max_utterance_frames is not None and self.recorded_frames >= self.max_utterance_frames
+        if forced:
+            self.forced_endpoints += 1
+            metrics.count("forced_endpoints")
+            if self.noise.relevel():
+                self.vad.rms_threshold = self.noise.threshold
+        if not active or forced:
+            self.finish_utterance(output)
+            self.vad.reset()
+            return
+
+        if self.stream_segments:
+            if self.pause_frames < self.segment_frames:    # The segment holds speech
+                if self.pause_frames >= self.segment_pause_frames or self.segment_frames >= self.max_segment_frames:
+                    frames = metrics.tag(self.recording.view(self.segment_start), self.trace_id)
+                    output.append(Segment(self.utterance_count, self.segment_index, frames, False))
+                    self.segment_start, self.segment_frames = len(self.recording), 0
+                    self.segment_index, self.pause_frames = self.segment_index + 1, 0
+            elif self.pause_frames > self.segment_pause_frames:
+                # Only a short lead-in of silence is kept
+                self.segment_start += self.chunk_bytes
+                self.segment_frames -= 1
+                self.pause_frames -= 1
+
+
+    def finish_utterance(self, output):
+        recording = self.recording.view()
+        if self.stream_segments:
+            frames = self.recording.view(self.segment_start) if self.pause_frames < self.segment_frames else b''
+            output.append(Segment(self.utterance_count, self.segment_index, metrics.tag(frames, self.trace_id), True))
+        else:
+            output.append(metrics.tag(recording, self.trace_id))
+
+        if self.trace_id is not None:
+            # The endpoint tail is the silence waited for (VAD hangover) before the utterance could end
+            now = time.perf_counter()
+            metrics.observe("capture.utterance", now - self.started_at, self.trace_id)
+            metrics.observe("capture.endpoint_tail", now - self.last_voice_at, self.trace_id)
+            metrics.count("utterances")
+            self.trace_id = None
+
+        if record_audio.ARCHIVE_RECORDINGS:
+            archive_recording(recording)
+        self.recording = None
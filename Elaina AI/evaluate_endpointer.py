@@ -0,0 +1,222 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Offline evaluation of the endpointer: runs labelled recordings through the fixed
+# TIMEOUT_LENGTH tail and the adaptive endpointer, and reports how long after the
+# end of speech each command was closed (endpoint latency) and how often a command
+# was cut before its speech ended (truncation).
+# Labels are a JSON manifest next to the recordings: {"file.wav": [[start, end], ...]}
+# with the start and end (seconds) of every spoken command. Without a manifest,
+# generated scenarios with known labels are used.
+# Usage (from this directory):
+#   python evaluate_endpointer.py                      # generated scenarios
+#   python evaluate_endpointer.py labels.json --json results.json
+
+import os
+import json
+import wave
+import argparse
+import numpy
+from endpointer import Endpointer
+from record_audio import CHUNK, CHANNELS, RATE
+from vad import SAMPLE_WIDTH
+
+
+CHUNK_SECONDS   = CHUNK / RATE
+CONFIGURATIONS  = {
+    "fixed":    {"adaptive": False, "max_utterance_frames": None},
+    "adaptive": {},     # record_audio.py presets
+}
+
+NOISE   = 10        # Amplitudes of the generated audio (see audio_sources.SyntheticSource)
+SPEECH  = 3000
+QUIET_SPEECH = 1000 # Trailing words spoken more softly (still above the threshold)
+LOUD_NOISE = 800    # Background above the calibrated threshold ("noisy room")
+
+# name -> list of ("noise", seconds, amplitude) / ("command", [(seconds, amplitude), ...]) parts
+SCENARIOS = {
+    "short_command":        [("noise", 1.5, NOISE), ("command", [(0.4, SPEECH), (0.2, NOISE), (0.3, SPEECH)]),
+                             ("noise", 2.0, NOISE)],
+    "paused_command":       [("noise", 1.5, NOISE), ("command", [(0.4, SPEECH), (0.4, NOISE), (0.3, SPEECH),
+                                                                 (0.4, NOISE), (0.5, SPEECH), (0.3, NOISE),
+                                                                 (0.4, SPEECH)]),
+                             ("noise", 2.0, NOISE)],
+    "wake_word_pause":      [("noise", 1.5, NOISE), ("command", [(0.4, SPEECH), (0.7, NOISE), (0.8, SPEECH)]),
+                             ("noise", 2.0, NOISE)],
+    "back_to_back":         [("noise", 1.5, NOISE), ("command", [(0.4, SPEECH), (0.2, NOISE), (0.5, SPEECH)]),
+                             ("noise", 1.2, NOISE), ("command", [(0.6, SPEECH), (0.1, NOISE), (0.6, SPEECH)]),
+                             ("noise", 2.0, NOISE)],
+    "quieter_trailing":     [("noise", 1.5, NOISE), ("command", [(2.5, SPEECH), (0.2, NOISE), (1.2, QUIET_SPEECH)]),
+                             ("noise", 2.0, NOISE)],
+    "long_steady_speech":   [("noise", 1.5, NOISE), ("command", [(8.0, SPEECH)]), ("noise", 2.0, NOISE)],
+    "noisy_room":           [("noise", 1.5, NOISE), ("command", [(0.5, SPEECH), (0.2, NOISE), (0.6, SPEECH)]),
+                             ("noise", 15.0, LOUD_NOISE), ("noise", 2.0, NOISE)],
+}
+
+
+# ==============================
+# ======| Fixtures |============
+# ==============================
+
+def generate_scenario(parts, seed=0):
+    """
+    :return: (raw PCM frames, [[start, end], ...] labels in seconds)
+    """
+    from audio_sources import SyntheticSource
+
+    pattern, labels, position = [], [], 0.0
+    for part in parts:
+        if part[0] == "noise":
+            pattern.append(part[1:])
+            position += part[1]
+        else:
+            start = position
+            for seconds, amplitude in part[1]:
+                pattern.append((seconds, amplitude))
+                position += seconds
+            labels.append([start, position])
+
+    source, chunks = SyntheticSource(pattern, rate=RATE, seed=seed), []
+    while True:
+        try:
+            chunks.append(source.read(CHUNK))
+        except EOFError:
+            return b''.join(chunks), labels
+
+
+def load_manifest(manifest_file):
+    """
+    :return: {name: (raw PCM frames, labels)} for the recordings of a manifest
+    """
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+
+    recordings = {}
+    directory = os.path.dirname(os.path.abspath(manifest_file))
+    for filename, labels in manifest.items():
+        with wave.open(os.path.join(directory, filename), "rb") as wf:
+            if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (RATE, CHANNELS, SAMPLE_WIDTH):
+                raise ValueError(f"{filename}: expected {RATE} Hz, {CHANNELS} channel(s), 16-bit PCM")
+            recordings[filename] = (wf.readframes(wf.getnframes()), labels)
+    return recordings
+
+
+# ==============================
+# ======| Evaluation |==========
+# ==============================
+
+def detect(frames, **endpointer_options):
+    """
+    Run an endpointer over a recording chunk by chunk.
+    :return: ([[start, end], ...] detected utterances in seconds, forced endpoints)
+    """
+    endpointer = Endpointer(**endpointer_options)
+    chunk_bytes = endpointer.chunk_bytes
+    detected = []
+    for offset in range(0, len(frames) - chunk_bytes + 1, chunk_bytes):
+        if endpointer.feed(frames[offset:offset + chunk_bytes]):
+            detected.append([endpointer.onset_chunk * CHUNK_SECONDS, endpointer.chunks_fed * CHUNK_SECONDS])
+    if endpointer.flush():
+        detected.append([endpointer.onset_chunk * CHUNK_SECONDS, endpointer.chunks_fed * CHUNK_SECONDS])
+    return detected, endpointer.forced_endpoints
+
+
+def score(labels, detected):
+    """
+    Match every labelled command with the detected utterances overlapping it.
+    :return: dict with the endpoint latencies and the missed / truncated counts
+    """
+    latencies, missed, truncated = [], 0, 0
+    for start, end in labels:
+        overlapping = [d for d in detected if d[0] < end and d[1] > start]
+        if not overlapping:
+            missed += 1
+            continue
+        if overlapping[0][1] < end:     # Closed before the speech ended: the command was cut
+            truncated += 1
+        latencies.append(overlapping[-1][1] - end)
+    return {"commands": len(labels), "missed": missed, "truncated": truncated, "latencies": latencies}
+
+
+def evaluate(recordings, configurations=CONFIGURATIONS):
+    """
+    :param recordings: {name: (raw PCM frames, labels)}
+    :return: {configuration: summary dict}, per recording details included
+    """
+    report = {}
+    for config_name, options in configurations.items():
+        totals = {"commands": 0, "missed": 0, "truncated": 0, "forced_endpoints": 0, "latencies": []}
+        per_recording = {}
+        for name, (frames, labels) in recordings.items():
+            detected, forced = detect(frames, **options)
+            result = score(labels, detected)
+            result["forced_endpoints"] = forced
+            per_recording[name] = result
+            for key in ("commands", "missed", "truncated", "forced_endpoints"):
+                totals[key] += result[key]
+            totals["latencies"] += result["latencies"]
+
+        latencies = totals.pop("latencies")
+        summary = dict(totals)
+        summary["truncation_rate"] = totals["truncated"] / totals["commands"] if totals["commands"] else 0.0
+        if latencies:
+            summary.update(latency_mean=float(numpy.mean(latencies)),
+                           latency_p50=float(numpy.percentile(latencies, 50)),
+                           latency_p95=float(numpy.percentile(latencies, 95)))
+        summary["recordings"] = per_recording
+        report[config_name] = summary
+    return report
+
+
+def print_report(report):
+    for config_name, summary in report.items():
+        line = (f"{config_name:<10} {summary['commands']:4d} commands  {summary['missed']:3d} missed  "
+                f"truncation {summary['truncation_rate'] * 100:5.1f}%  {summary['forced_endpoints']:3d} forced")
+        if "latency_p50" in summary:
+            line += (f"  latency mean {summary['latency_mean']:.2f}s  p50 {summary['latency_p50']:.2f}s"
+                     f"  p95 {summary['latency_p95']:.2f}s")
+        print(line)
+        for name, result in summary["recordings"].items():
+            latencies = ", ".join(f"{latency:.2f}s" for latency in result["latencies"])
+            print(f"    {name:<20} latency [{latencies}]  truncated {result['truncated']}  missed {result['missed']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the fixed and adaptive endpointers on labelled audio.")
+    parser.add_argument("manifest", nargs="?", help='JSON labels {"file.wav": [[start, end], ...]}')
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.manifest:
+        recordings = load_manifest(args.manifest)
+    else:
+        recordings = {name: generate_scenario(parts, seed) for seed, (name, parts) in enumerate(SCENARIOS.items())}
+
+    report = evaluate(recordings)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as wf:
+            json.dump(report, wf, indent=2)
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Bounded LRU cache of comprehension results. Voice commands repeat a lot, so the
+# same utterance should not be tokenized, stemmed and classified every time.
+# Lookups happen at two levels:
+#   1. normalized text (lowercased, wake word and punctuation stripped) - no tokenizing at all
+#   2. stemmed token tuple - catches different wordings with the same encoding
+# The cache clears itself when its fingerprint (model + intents.json) changes.
+
+import threading
+from collections import OrderedDict
+from wake_word import WakeWordMatcher
+
+
+RESULT_CACHE_SIZE = 1024    # Entries per key level
+
+
+class CacheStats:
+    def __init__(self):
+        self.text_hits      = 0
+        self.token_hits     = 0
+        self.misses         = 0
+        self.evictions      = 0
+        self.invalidations  = 0
+
+
+    @property
+    def hit_ratio(self):
+        lookups = self.text_hits + self.token_hits + self.misses
+        return (self.text_hits + self.token_hits) / lookups if lookups else 0.0
+
+
+    def as_dict(self):
+        stats = dict(vars(self))
+        stats["hit_ratio"] = self.hit_ratio
+        return stats
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+
+    def put(self, key, value):
+        """
+        :return: True if an entry had to be evicted
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            return True
+        return False
+
+
+    def clear(self):
+        self.entries.clear()
+
+
+class IntentResultCache:
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, matcher=None):
+        """
+        :param maxsize: maximum entries per key level (0 disables caching)
+        :param matcher: WakeWordMatcher used to strip the wake word
+        """
+        self.matcher        = matcher if matcher is not None else WakeWordMatcher()
+        self.by_text        = LRUCache(maxsize)
+        self.by_tokens      = LRUCache(maxsize)
+        self.enabled        = maxsize > 0
+        self.fingerprint    = None
+        self.lock           = threading.Lock()
+        self.stats          = CacheStats()
+
+
+    def normalize(self, text):
+        return self.matcher.strip(text.lower()).strip(" .,!?")
+
+
+    def validate(self, fingerprint):
+        """
+        Drop every entry if the model or training data changed since the last call.
+        :param fingerprint: any hashable value identifying the model and intents version
+        """
+        with self.lock:
+            if fingerprint != self.fingerprint:
+                if self.fingerprint is not None:
+                    self.stats.invalidations += 1
+                self.by_text.clear()
+                self.by_tokens.clear()
+                self.fingerprint = fingerprint
+
+
+    def get_text(self, normalized_text):
+        if not self.enabled:
+            return None
+        with self.lock:
+            result = self.by_text.get(normalized_text)
+            if result is not None:
+                self.stats.text_hits += 1
+            return result
+
+
+    def get_tokens(self, normalized_text, tokens):
+        """
+        Token-level lookup after a text miss; a hit is also remembered under the text key.
+        """
+        if not self.enabled:
+            return None
+        with self.lock:
+            result = self.by_tokens.get(tuple(tokens))
+            if result is None:
+                self.stats.misses += 1
+                return None
+            self.stats.token_hits += 1
+            self.stats.evictions += self.by_text.put(normalized_text, result)
+            return result
+
+
+    def put(self, normalized_text, tokens, result):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.stats.evictions += self.by_text.put(normalized_text, result)
+            self.stats.evictions += self.by_tokens.put(tuple(tokens), result)
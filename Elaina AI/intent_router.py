@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Tiered comprehension: the compiled static rules (static_comprehend_text.py) answer
+# the commands they recognize; only the rest reach the neural network, behind an
+# LRU result cache (intent_cache.py). Every decision is counted so the static
+# tier's hit ratio can be monitored.
+
+import os
+from collections import namedtuple
+from utils import metrics
+from static_comprehend_text import StaticComprehender
+from intent_cache import IntentResultCache, RESULT_CACHE_SIZE
+from neural_network.featurizer import BagOfWordsFeaturizer, as_featurizer, tokenize
+from neural_network.train_neural_net import comprehend_token_batch, load_inference_model, DATA_FILE_ABSPATH
+
+
+STATIC_TIER = "static"
+NEURAL_TIER = "neural"
+
+# tag: intent (None if not understood), slots: extracted values (static tier only),
+# confidence: 1.0 for rule matches, model probability otherwise, tier: which tier decided
+RoutedIntent = namedtuple("RoutedIntent", ["tag", "slots", "confidence", "tier"])
+
+
+class TierStats:
+    def __init__(self):
+        self.static_hits    = 0     # Answered by the rules
+        self.neural_hits    = 0     # Answered by the model above CONFIDENCE_THRESHOLD
+        self.neural_unknown = 0     # Reached the model, but below CONFIDENCE_THRESHOLD
+
+
+    @property
+    def total(self):
+        return self.static_hits + self.neural_hits + self.neural_unknown
+
+
+    @property
+    def static_hit_ratio(self):
+        return self.static_hits / self.total if self.total else 0.0
+
+
+    def as_dict(self):
+        stats = dict(vars(self))
+        stats["static_hit_ratio"] = self.static_hit_ratio
+        return stats
+
+
+class IntentRouter:
+    def __init__(self, trained_model, words, labels, static_comprehender=None, cache_size=RESULT_CACHE_SIZE):
+        """
+        :param trained_model: model with a tflearn-style predict() (see load_inference_model)
+        :param words: BagOfWordsFeaturizer, or the patterns words list
+        :param labels: all labels
+        :param static_comprehender: rule tier (StaticComprehender with the constants.py rules by default)
+        :param cache_size: entries of the neural tier result cache (0 disables it)
+        """
+        self.trained_model  = trained_model
+        self.featurizer     = as_featurizer(words)
+        self.labels         = labels
+        self.static         = static_comprehender if static_comprehender is not None else StaticComprehender()
+        self.cache          = IntentResultCache(cache_size)
+        self.stats          = TierStats()
+
+
+    def fingerprint(self):
+        """
+        Identifies the model and intents.json version the cached results belong to.
+        """
+        try:
+            data_stat = os.stat(DATA_FILE_ABSPATH)
+            data_version = (data_stat.st_mtime_ns, data_stat.st_size)
+        except OSError:
+            data_version = None
+        return id(self.trained_model), id(self.featurizer), data_version
+
+
+    def comprehend(self, input_text):
+        return self.comprehend_batch([input_text])[0]
+
+
+    def comprehend_static(self, input_text):
+        """
+        Rule tier only, no model call (e.g. for partial transcripts).
+        :return: RoutedIntent, or None when no rule matches
+        """
+        static_intent = self.static.comprehend(input_text)
+        if static_intent is None:
+            return None
+        result = RoutedIntent(static_intent.tag, static_intent.slots, 1.0, STATIC_TIER)
+        self.count(result)
+        return result
+
+
+    def comprehend_batch(self, texts):
+        """
+        :param texts: list of user input texts
+        :return: list of RoutedIntent, in input order
+        """
+        self.cache.validate(self.fingerprint())
+
+        results = [None] * len(texts)
+        neural = []     # (index, normalized text, stemmed tokens) left for the model
+
+        for i, text in enumerate(texts):
+            static_intent = self.static.comprehend(text)
+            if static_intent is not None:
+                results[i] = RoutedIntent(static_intent.tag, static_intent.slots, 1.0, STATIC_TIER)
+                continue
+
+            normalized = self.cache.normalize(text)
+            cached = self.cache.get_text(normalized)
+            if cached is None:
+                tokens = tokenize(normalized)
+                cached = self.cache.get_tokens(normalized, tokens)
+            if cached is None:
+                neural.append((i, normalized, tokens))
+            else:
+                results[i] = cached
+
+        with metrics.span("model.predict"):
+            predictions = comprehend_token_batch(self.trained_model, [tokens for _, _, tokens in neural],
+                                                 self.featurizer, self.labels)
+        for (i, normalized, tokens), prediction in zip(neural, predictions):
+            results[i] = RoutedIntent(prediction.tag, {}, prediction.confidence, NEURAL_TIER)
+            self.cache.put(normalized, tokens, results[i])
+
+        for result in results:
+            self.count(result)
+        return results
+
+
+    def count(self, result):
+        if result.tier == STATIC_TIER:
+            self.stats.static_hits += 1
+        elif result.tag is None:
+            self.stats.neural_unknown += 1
+        else:
+            self.stats.neural_hits += 1
+
+
+def load_router():
+    """
+    Load the inference model and one featurizer (tokenizer resources warmed up) behind a router.
+    """
+    trained_model, words, labels = load_inference_model()    # NumPy model, TensorFlow only if (re)export is needed
+    featurizer = BagOfWordsFeaturizer(words)    # Shared by every model call
+    featurizer.transform("warm up")             # Loads the tokenizer resources before the first command
+    return IntentRouter(trained_model, featurizer, labels)    # Static rules first, then the model
@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Load generator for voice_server.py: replays WAV files as concurrent client
+# sessions and reports how turn latency grows with the number of clients.
+# Usage (from this directory, with the server running):
+#   python load_generator.py recordings/*.wav --clients 1,4,16,64
+#   python load_generator.py some.wav --clients 8 --fast --json results.json
+
+import sys
+import json
+import time
+import wave
+import bisect
+import asyncio
+import argparse
+import numpy
+from voice_server import SERVER_HOST, SERVER_PORT, BYTES_PER_SECOND
+from record_audio import CHUNK, CHANNELS, RATE
+from vad import SAMPLE_WIDTH
+
+
+SEND_SIZE = CHUNK * CHANNELS * SAMPLE_WIDTH     # Bytes sent per write (one capture chunk)
+
+
+def load_wav(filename):
+    """
+    :return: raw PCM frames of a WAV file in the server's format
+    """
+    with wave.open(filename, "rb") as wf:
+        if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (RATE, CHANNELS, SAMPLE_WIDTH):
+            raise ValueError(f"{filename}: expected {RATE} Hz, {CHANNELS} channel(s), {SAMPLE_WIDTH * 8}-bit PCM")
+        return wf.readframes(wf.getnframes())
+
+
+async def open_connection(host, port, unix_path):
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def run_client(frames, host, port, unix_path, realtime):
+    """
+    Stream one recording and collect the server's answers.
+    :return: dict with the responses, per-utterance latencies and errors
+    """
+    result = {"responses": [], "latencies": [], "error": None}
+    try:
+        reader, writer = await open_connection(host, port, unix_path)
+    except OSError as e:
+        result["error"] = repr(e)
+        return result
+
+    greeting = json.loads(await reader.readline() or b'{"error": "connection closed"}')
+    if "error" in greeting:
+        result["error"] = greeting["error"]
+        writer.close()
+        return result
+
+    sent = [0]                      # Bytes sent so far ...
+    sent_at = [time.perf_counter()] # ... and when
+
+    async def send():
+        start = sent_at[0]
+        try:
+            for offset in range(0, len(frames), SEND_SIZE):
+                writer.write(frames[offset:offset + SEND_SIZE])
+                await writer.drain()
+                sent.append(min(offset + SEND_SIZE, len(frames)))
+                sent_at.append(time.perf_counter())
+                if realtime:
+                    await asyncio.sleep(max(0.0, start + sent[-1] / BYTES_PER_SECOND - time.perf_counter()))
+            if writer.can_write_eof():
+                writer.write_eof()
+        except ConnectionError:
+            pass    # Refused or dropped by the server, the reader reports why
+
+    sender = asyncio.create_task(send())
+    try:
+        async for line in reader:
+            response = json.loads(line)
+            # Latency from the moment the server had the whole utterance to the answer
+            end_byte = int(response["end_offset"] * BYTES_PER_SECOND)
+            index = min(bisect.bisect_left(sent, end_byte), len(sent_at) - 1)
+            result["latencies"].append(time.perf_counter() - sent_at[index])
+            result["responses"].append(response)
+        await sender
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        result["error"] = repr(e)
+        sender.cancel()
+    finally:
+        writer.close()
+    return result
+
+
+async def run_level(recordings, clients, host, port, unix_path, realtime):
+    """
+    Run clients sessions at once, cycling through the recordings.
+    """
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_client(recordings[i % len(recordings)], host, port, unix_path, realtime)
+                                     for i in range(clients)))
+    wall = time.perf_counter() - start
+
+    latencies = [latency for result in results for latency in result["latencies"]]
+    errors = [result["error"] for result in results if result["error"] is not None]
+    audio_seconds = sum(len(recordings[i % len(recordings)]) for i in range(clients)) / BYTES_PER_SECOND
+    level = {
+        "clients": clients,
+        "failed_sessions": len(errors),
+        "errors": sorted(set(errors)),
+        "responses": len(latencies),
+        "understood": sum(1 for result in results for response in result["responses"] if response["intent"]),
+        "wall_seconds": wall,
+        "audio_seconds": audio_seconds,
+        "realtime_factor": audio_seconds / wall if wall else 0.0,
+    }
+    if latencies:
+        p50, p95, p99 = numpy.percentile(latencies, [50, 95, 99])
+        level.update(latency_p50=p50, latency_p95=p95, latency_p99=p99, latency_max=max(latencies))
+    return level
+
+
+def print_level(level):
+    line = (f"{level['clients']:5d} clients  {level['responses']:5d} responses  "
+            f"{level['failed_sessions']:3d} failed  x{level['realtime_factor']:6.1f} realtime")
+    if "latency_p50" in level:
+        line += (f"  latency p50 {level['latency_p50'] * 1000:7.1f} ms  p95 {level['latency_p95'] * 1000:7.1f} ms"
+                 f"  p99 {level['latency_p99'] * 1000:7.1f} ms")
+    print(line)
+    for error in level["errors"]:
+        print(f"      {error}")
+
+
+async def run_load(recordings, levels, host=SERVER_HOST, port=SERVER_PORT, unix_path=None, realtime=True):
+    report = []
+    for clients in levels:
+        level = await run_level(recordings, clients, host, port, unix_path, realtime)
+        print_level(level)
+        report.append(level)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay WAV files against voice_server.py.")
+    parser.add_argument("wav_files", nargs="+", help="16 kHz mono 16-bit recordings")
+    parser.add_argument("--clients", default="1,2,4,8,16,32",
+                        help="comma separated numbers of concurrent sessions to run, one level after another")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--unix", help="connect to this Unix socket path instead of TCP")
+    parser.add_argument("--fast", action="store_true", help="send as fast as possible instead of in real time")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    recordings = [load_wav(filename) for filename in args.wav_files]
+    levels = [int(clients) for clients in args.clients.split(",")]
+    report = asyncio.run(run_load(recordings, levels, args.host, args.port, args.unix, not args.fast))
+
+    if args.json:
+        with open(args.json, "w") as wf:
+            json.dump(report, wf, indent=2)
+    sys.exit(0 if all(level["failed_sessions"] == 0 for level in report) else 1)
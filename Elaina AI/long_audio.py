@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Long-audio transcription: a WAV file of any length is streamed block by block
+# through an Endpointer, which cuts it at silences (speech running on for longer
+# than MAX_SEGMENT_LENGTH is cut there). Segments are recognized concurrently on
+# the AsyncRecognizer pool and reported in order with their timestamps. The noise
+# floor is calibrated from the quietest chunks of the first CALIBRATION_LOOKAHEAD
+# seconds, which are then fed like the rest of the file, so speech at the very
+# start is transcribed too. At most MAX_PENDING_SEGMENTS segments are held at
+# once: reading the file waits for the oldest one, so memory stays flat however
+# long the recording is, and a failed segment only loses its own words.
+# Usage (from this directory):
+#   python long_audio.py meeting.wav
+#   python long_audio.py lecture.wav --workers 8 --json > lecture.jsonl
+
+import json
+import math
+import wave
+import time
+import argparse
+import itertools
+import numpy
+from collections import deque, namedtuple
+from concurrent.futures import wait
+from endpointer import Endpointer
+from stt_backends import AsyncRecognizer, frames_to_audio_data, get_backend, MAX_WORKERS
+from utils.helper import eprint
+from vad import SAMPLE_WIDTH, SAMPLE_DTYPE, block_rms, block_view
+from record_audio import CHUNK, RATE
+
+
+# ==================================
+# ======| Long Audio Presets |======
+# ==================================
+
+READ_CHUNKS             = 16    # Chunks read from the file at a time
+MAX_SEGMENT_LENGTH      = 30    # Seconds of continuous speech before a segment is cut anyway
+SEGMENT_DEADLINE        = 30    # Seconds a segment may take to be recognized (queueing included)
+MAX_PENDING_SEGMENTS    = MAX_WORKERS * 2   # Segments held (recognizing or waiting to be reported)
+CALIBRATION_LOOKAHEAD   = 10    # Seconds read ahead to estimate the noise floor
+CALIBRATION_PERCENTILE  = 10    # Percentile of the chunk rms taken as the noise floor
+
+
+# start / end: seconds from the beginning of the file, text: None when not understood
+TranscriptSegment = namedtuple("TranscriptSegment", ["index", "start", "end", "text"])
+
+
+def read_mono_blocks(wf, frames_per_block):
+    """
+    Read a 16-bit WAV block by block, mixed down to mono.
+    :param wf: wave.Wave_read
+    :return: generator of mono PCM bytes
+    """
+    channels = wf.getnchannels()
+    while True:
+        data = wf.readframes(frames_per_block)
+        if not data:
+            return
+        if channels > 1:
+            samples = numpy.frombuffer(data, dtype=SAMPLE_DTYPE).reshape(-1, channels)
+            data = samples.mean(axis=1).astype(SAMPLE_DTYPE).tobytes()
+        yield data
+
+
+def transcribe_long_audio(wav_file, recognizer, max_pending=MAX_PENDING_SEGMENTS,
+                          max_segment_length=MAX_SEGMENT_LENGTH, deadline=SEGMENT_DEADLINE):
+    """
+    Transcribe a WAV file of any length segment by segment.
+    :param wav_file: path or file object of a 16-bit PCM WAV (any sample rate, mixed down to mono)
+    :param recognizer: AsyncRecognizer the segments are recognized on
+    :param max_pending: segments held at once (bounds memory and the recognizer queue)
+    :param max_segment_length: seconds of speech after which a segment is cut without a pause
+    :param deadline: seconds a segment may take to be recognized
+    :return: generator of TranscriptSegment, in order, as soon as each one is recognized
+    """
+    with wave.open(wav_file, "rb") as wf:
+        if wf.getsampwidth() != SAMPLE_WIDTH:
+            raise ValueError(f"{wf.getsampwidth() * 8}-bit audio is not supported (16-bit PCM only)")
+
+        # Chunks keep the duration they have at the capture rate, so the VAD presets still apply
+        rate = wf.getframerate()
+        chunk = max(1, round(CHUNK * rate / RATE))
+        bytes_per_second = rate * SAMPLE_WIDTH
+        endpointer = Endpointer(chunk=chunk, channels=1,
+                                max_utterance_frames=math.ceil(max_segment_length * rate / chunk))
+
+        pending = deque()   # (index, start, end, RecognitionRequest), oldest first
+        index = 0
+
+        def submit(frames):
+            nonlocal index
+            end = endpointer.chunks_fed * chunk / rate
+            start = end - len(frames) / bytes_per_second
+            request = recognizer.submit(frames_to_audio_data(frames, rate), deadline)
+            pending.append((index, start, end, request))
+            index += 1
+
+        def report(index, start, end, request):
+            wait([request.future], timeout=max(0.0, request.deadline_at - time.monotonic()))
+            return TranscriptSegment(index, round(start, 3), round(end, 3), request.result())
+
+        # Calibrate on a look-ahead, then feed it like the rest of the file
+        blocks = read_mono_blocks(wf, chunk * READ_CHUNKS)
+        lookahead = list(itertools.islice(blocks, math.ceil(CALIBRATION_LOOKAHEAD * rate / (chunk * READ_CHUNKS))))
+        energy = block_rms(block_view(b''.join(lookahead), chunk))
+        if len(energy):
+            endpointer.calibrate([numpy.percentile(energy, CALIBRATION_PERCENTILE)])
+
+        for data in itertools.chain(lookahead, blocks):
+            # Chunk by chunk: a finished segment then ends at the chunk just fed
+            block = memoryview(data)
+            for offset in range(0, len(block), endpointer.chunk_bytes):
+                for frames in endpointer.feed(block[offset:offset + endpointer.chunk_bytes]):
+                    submit(frames)
+
+            # Report finished segments, and wait for the oldest one while too many are held
+            while pending and (pending[0][3].done() or len(pending) >= max_pending):
+                yield report(*pending.popleft())
+
+        for frames in endpointer.flush():
+            submit(frames)
+        while pending:
+            yield report(*pending.popleft())
+
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+
+
+def transcribe_wav(wav_file, backend=None, workers=MAX_WORKERS):
+    """
+    Whole transcript of a long WAV file.
+    :param backend: SpeechBackend (the configured default if None)
+    :return: the recognized segments joined with spaces (None if nothing was understood)
+    """
+    recognizer = AsyncRecognizer(backend, max_workers=workers)
+    try:
+        texts = [segment.text for segment in transcribe_long_audio(wav_file, recognizer, max_pending=workers * 2)
+                 if segment.text]
+    finally:
+        recognizer.shutdown()
+    return " ".join(texts) or None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe a long WAV recording segment by segment.")
+    parser.add_argument("wav_file")
+    parser.add_argument("--backend", help="speech-to-text backend (see stt_backends.BACKENDS)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="concurrent recognitions")
+    parser.add_argument("--max-segment-length", type=float, default=MAX_SEGMENT_LENGTH,
+                        help="seconds of speech after which a segment is cut without a pause")
+    parser.add_argument("--json", action="store_true", help="one JSON line per segment")
+    args = parser.parse_args()
+
+    recognizer = AsyncRecognizer(get_backend(args.backend), max_workers=args.workers)
+    start = time.perf_counter()
+    n_segments = n_failed = 0
+    try:
+        for segment in transcribe_long_audio(args.wav_file, recognizer, args.workers * 2, args.max_segment_length):
+            n_segments += 1
+            n_failed += segment.text is None
+            if args.json:
+                print(json.dumps(segment._asdict()), flush=True)
+            else:
+                print(f"[{format_timestamp(segment.start)} - {format_timestamp(segment.end)}] {segment.text or ''}",
+                      flush=True)
+    finally:
+        recognizer.shutdown()
+
+    eprint(f"{n_segments} segments in {time.perf_counter() - start:.1f}s ({n_failed} not understood)", dev=True)
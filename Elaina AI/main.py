@@ -29,37 +29,107 @@ import os
 import re
 import sys
 import time
-from record_audio import run_recorder
-from audio_to_text import wav_to_text
-from neural_network.train_neural_net import create_and_train_neural_network, comprehend_text
-from utils.helper import eprint
+from collections import deque
+from capture_service import CaptureService
+from stt_backends import AsyncRecognizer
+from intent_router import load_router
+from wake_word import WakeWordSpotter
+from streaming import StreamingSession, run_streaming
+from utils.helper import eprint, uprint
+from utils import metrics
 from constants import *
 
+POLL_INTERVAL = 0.05    # Seconds to wait for audio before checking on pending recognitions
+STREAMING = os.environ.get("ELAINA_STREAMING", "0") == "1"    # Recognize segments while the user speaks
 
-def run_elaina():
-    trained_model, words, labels = create_and_train_neural_network(force_train=False, force_encode=False)
-    time.sleep(3)
 
-    while True:
-        recorded = run_recorder()
-        if recorded == True:
-            input_text = wav_to_text()
+def handle_text(input_text, router, spotter, trace_id=None):
+    """
+    Act on one recognized utterance.
+    :param trace_id: trace of the utterance (see utils/metrics.py)
+    """
+    if input_text == None:
+        print("Cannot understand your input...")
+        return
 
-            if input_text == None:
-                print("Cannot understand your input...")
-                continue
+    uprint(input_text)
 
-            # If name elaina is found
-            for idx, name in enumerate(AI_NAME_ALT):
-                
-                if input_text.lower().find(name) != -1:
-                    output = comprehend_text(trained_model, input_text, words, labels)
-                    print(output)
-                    break
+    # If name elaina is found
+    if spotter.confirm(input_text):
+        with metrics.span("comprehend", trace_id):
+            output = router.comprehend(input_text)
+        print_intent(output)
+    else:
+        print(input_text.lower())
+        eprint("Text does not contain Elaina, skipping...", dev=True)
 
-                if idx == len(AI_NAME_ALT) - 1:
-                    print(input_text.lower())
-                    eprint("Text does not contain Elaina, skipping...", dev=True)
+
+def print_intent(output):
+    if output.slots:
+        print(output.tag, output.slots)
+    else:
+        print(output.tag)
+
+
+def print_partial(partial):
+    eprint(f"... {partial.text}", dev=True)
+
+
+def print_turn_intent(turn):
+    uprint(turn.text)
+    print_intent(turn.intent)
+    eprint(f"Intent after {turn.latency:.2f}s ({'partial' if turn.early else 'final'} transcript)", dev=True)
+
+
+def run_elaina(source=None, backend=None, streaming=STREAMING):
+    """
+    :param source: audio source (see CaptureService), the microphone by default
+    :param backend: speech-to-text backend (see stt_backends.py), STT_BACKEND by default
+    :param streaming: recognize utterance segments while the user is still speaking (see streaming.py)
+    """
+    if metrics.enabled:
+        metrics.start_exporters()
+
+    # Background noise calibration runs on the capture thread while the model loads
+    capture = CaptureService(source, stream_segments=streaming).start()
+
+    router = load_router()      # Static rules first, then the model
+
+    recognizer = AsyncRecognizer(backend)
+    spotter = WakeWordSpotter()     # Drops clicks, coughs, long chatter and (with pocketsphinx) speech without the wake word
+    capture.ready.wait()
+    eprint("Ready", user=True)
+
+    if streaming:
+        session = StreamingSession(recognizer, router, spotter, on_partial=print_partial, on_intent=print_turn_intent)
+        run_streaming(capture, session, POLL_INTERVAL)
+        eprint(f"Streaming turns: {session.as_dict()}", dev=True)
+    else:
+        pending = deque()   # Recognitions in capture order
+        while True:
+            utterance = capture.get_utterance(timeout=POLL_INTERVAL)
+            if utterance is not None:
+                if spotter.screen(utterance, capture.rms_threshold):
+                    pending.append(recognizer.submit(utterance))
+            elif capture.finished.is_set() and capture.utterances.empty() and not pending:
+                break   # Audio source closed and everything handled
+
+            # Handle finished (or overdue) recognitions without waiting on slow ones
+            while pending and (pending[0].done() or pending[0].expired()):
+                request = pending.popleft()
+                if request.expired():
+                    eprint("Recognition timed out, skipping...", dev=True)
+                handle_text(request.result(), router, spotter, request.trace_id)
+                # End of capture to intent (the capture stages are traced separately)
+                metrics.observe("turn.after_capture", time.monotonic() - request.submitted_at, request.trace_id)
+
+    recognizer.shutdown()
+    capture.stop()
+    eprint(f"Wake word stage: {spotter.stats.as_dict()}", dev=True)
+    eprint(f"Comprehension tiers: {router.stats.as_dict()}", dev=True)
+    eprint(f"Result cache: {router.cache.stats.as_dict()}", dev=True)
+    if metrics.enabled:
+        metrics.write_metrics()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Content-addressed cache for training artifacts (encoded data, trained models).
+# Artifacts live in cache/<key>/ where the key hashes everything they depend on:
+# the intents.json bytes, the tokenizer/stemmer version and the network
+# hyperparameters. Any change produces a new key, so stale artifacts are never
+# loaded, and an unchanged setup skips encoding and training entirely.
+# Entries sharing a tokenizer and hyperparameters form a family; the most recent
+# complete entry of each family is recorded so that an edited intents.json can be
+# trained incrementally from it (see incremental.py).
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from importlib import metadata
+
+
+CACHE_DIR_ABSPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+KEY_LENGTH = 16     # Hex characters of the sha256 used as directory name
+
+
+def package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "missing"
+
+
+def compute_cache_key(data_file, tokenizer_version, hyperparameters):
+    """
+    :param data_file: path of intents.json
+    :param tokenizer_version: string identifying the tokenization/stemming pipeline
+    :param hyperparameters: JSON-serializable dict of network/training settings
+    """
+    digest = hashlib.sha256()
+    with open(data_file, "rb") as rf:
+        digest.update(rf.read())
+    digest.update(tokenizer_version.encode())
+    digest.update(json.dumps(hyperparameters, sort_keys=True).encode())
+    return digest.hexdigest()[:KEY_LENGTH]
+
+
+def compute_family_key(tokenizer_version, hyperparameters):
+    """
+    Same as compute_cache_key without the intents.json content.
+    """
+    digest = hashlib.sha256()
+    digest.update(tokenizer_version.encode())
+    digest.update(json.dumps(hyperparameters, sort_keys=True).encode())
+    return digest.hexdigest()[:KEY_LENGTH]
+
+
+class ArtifactCache:
+    def __init__(self, key, root=CACHE_DIR_ABSPATH, family=None):
+        """
+        :param key: cache key from compute_cache_key
+        :param root: directory holding one sub-directory per key
+        :param family: family key from compute_family_key (needed by mark_latest)
+        """
+        self.key = key
+        self.root = root
+        self.dir = os.path.join(root, key)
+        self.family = family
+
+
+    @classmethod
+    def latest(cls, family, root=CACHE_DIR_ABSPATH):
+        """
+        The entry last marked complete for a family, or None.
+        """
+        try:
+            with open(os.path.join(root, f"latest-{family}.json")) as rf:
+                key = json.load(rf)["key"]
+        except (OSError, ValueError, KeyError):
+            return None
+        cache = cls(key, root, family)
+        return cache if os.path.isdir(cache.dir) else None
+
+
+    def mark_latest(self):
+        """
+        Record this entry as the most recent complete one of its family.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".latest.", suffix=".json")
+        with os.fdopen(fd, "w") as wf:
+            json.dump({"key": self.key}, wf)
+        os.replace(tmp_path, os.path.join(self.root, f"latest-{self.family}.json"))
+
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+
+    def has(self, name):
+        return os.path.exists(self.path(name))
+
+
+    def write_path(self, name, write_function):
+        """
+        Atomically create a file artifact: write_function(temporary path) writes the file,
+        which is renamed into place once complete.
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.dir, prefix=f".{name}.", suffix=os.path.splitext(name)[1])
+        os.close(fd)
+        try:
+            write_function(tmp_path)
+            os.replace(tmp_path, self.path(name))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+    def write_file(self, name, write_function):
+        """
+        Atomically create a file artifact: write_function(binary file object) writes its content.
+        """
+        def write(path):
+            with open(path, "wb") as wf:
+                write_function(wf)
+        self.write_path(name, write)
+
+
+    def write_directory(self, name, write_function):
+        """
+        Atomically create a directory artifact (for multi-file checkpoints):
+        write_function(temporary directory path) fills a directory that is renamed into place.
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.dir, prefix=f".{name}.")
+        try:
+            write_function(tmp_dir)
+            if os.path.exists(self.path(name)):     # Replaced by a forced rebuild
+                shutil.rmtree(self.path(name))
+            os.rename(tmp_dir, self.path(name))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
@@ -0,0 +1,239 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import re
+import functools
+import numpy
+
+# NLTK is imported and its tokenizer data checked on first use rather than at import
+# time, so importing this module stays cheap and works on offline hosts.
+NLTK_TOKENIZER_RESOURCES = ["punkt", "punkt_tab"]   # punkt_tab is required by nltk >= 3.8.2
+
+TOKENIZER           = os.environ.get("ELAINA_TOKENIZER", "regex")  # "regex" (built-in) or "nltk" (word_tokenize)
+STEM_CACHE_SIZE     = 4096      # Distinct words whose stems are remembered
+
+# Bump whenever tokenize()/stem_tokens() change, so cached encodings are rebuilt
+TOKENIZER_VERSIONS = {
+    "nltk"  : "word_tokenize+lancaster/1",
+    "regex" : "regex+lancaster/1",
+}
+TOKENIZER_VERSION = TOKENIZER_VERSIONS[TOKENIZER]
+
+# Follows nltk.word_tokenize on short commands: contractions are split the Treebank
+# way ("don't" -> "do" "n't", "I'm" -> "I" "'m", "gonna" -> "gon" "na"), times,
+# decimals and abbreviations stay whole, every other punctuation mark is its own token.
+TOKEN_PATTERN = re.compile(r"""
+      [A-Za-z]+(?=n't\b)           # "do" of "don't", "ca" of "can't"
+    | n't\b
+    | '(?:s|re|ve|ll|d|m)\b
+    | (?:can(?=not\b)|gon(?=na\b)|wan(?=na\b)|got(?=ta\b))
+    | \d+(?:[.:,]\d+)*[A-Za-z]*    # 7:30, 2.5, 1,000, 10:45pm
+    | \w+(?:[-.]\w+)*              # words, hyphenated words, a.m
+    | \.\.\.
+    | [^\w\s]
+""", re.VERBOSE | re.IGNORECASE)
+
+stemmer = None
+nltk_word_tokenize = None
+
+
+def get_stemmer():
+    global stemmer
+    if stemmer is None:
+        from nltk.stem.lancaster import LancasterStemmer
+        stemmer = LancasterStemmer()
+    return stemmer
+
+
+def get_word_tokenize():
+    """
+    nltk.word_tokenize, downloading the punkt tokenizer data only if it is missing.
+    """
+    global nltk_word_tokenize
+    if nltk_word_tokenize is None:
+        import nltk
+        try:
+            nltk.word_tokenize("ready")
+        except LookupError:
+            for resource in NLTK_TOKENIZER_RESOURCES:
+                nltk.download(resource, quiet=True)
+        nltk_word_tokenize = nltk.word_tokenize
+    return nltk_word_tokenize
+
+
+def regex_word_tokenize(sentence):
+    return TOKEN_PATTERN.findall(sentence)
+
+
+class TextNormalizer:
+    def __init__(self, tokenizer=TOKENIZER, stem_cache_size=STEM_CACHE_SIZE):
+        """
+        Tokenization and stemming shared by training and inference. Commands reuse
+        a small vocabulary, so stems are memoized in a bounded LRU cache.
+        :param tokenizer: "regex" (built-in, no NLTK data needed) or "nltk" (nltk.word_tokenize)
+        :param stem_cache_size: distinct words whose stems are remembered
+        """
+        if tokenizer not in TOKENIZER_VERSIONS:
+            raise ValueError(f"Unknown tokenizer {tokenizer!r}, expected one of {sorted(TOKENIZER_VERSIONS)}")
+        self.tokenizer  = tokenizer
+        self.version    = TOKENIZER_VERSIONS[tokenizer]
+        self.stem       = functools.lru_cache(maxsize=stem_cache_size)(self.stem_word)
+
+
+    @staticmethod
+    def stem_word(word):
+        return get_stemmer().stem(word.lower())
+
+
+    def word_tokenize(self, sentence):
+        if self.tokenizer == "regex":
+            return regex_word_tokenize(sentence)
+        return get_word_tokenize()(sentence)
+
+
+    def stem_tokens(self, tokens):
+        """
+        Stem (and lowercase) already tokenized words.
+        """
+        stem = self.stem
+        return [stem(word) for word in tokens]
+
+
+    def tokenize(self, sentence):
+        """
+        Tokenize and stem a sentence the same way for training and inference.
+        :param sentence: raw text
+        :return: list of stemmed tokens
+        """
+        return self.stem_tokens(self.word_tokenize(sentence))
+
+
+    def cache_info(self):
+        return self.stem.cache_info()
+
+
+normalizer = TextNormalizer()
+
+
+def stem_tokens(tokens):
+    return normalizer.stem_tokens(tokens)
+
+
+def word_tokenize(sentence):
+    return normalizer.word_tokenize(sentence)
+
+
+def tokenize(sentence):
+    return normalizer.tokenize(sentence)
+
+
+class BagOfWordsFeaturizer:
+    def __init__(self, words):
+        """
+        Bag-of-words encoder over a fixed vocabulary. Built once and shared by
+        training (encode_training_data) and inference (bag_of_words) so both
+        encode sentences identically.
+        :param words: vocabulary of stemmed words (column order of the encoding)
+        """
+        self.words = list(words)
+        self.index = {w: i for i, w in enumerate(self.words)}   # word -> column
+
+
+    def __len__(self):
+        return len(self.words)
+
+
+    def token_indices(self, tokens):
+        """
+        Columns set by a list of stemmed tokens (out-of-vocabulary tokens are ignored).
+        """
+        index = self.index
+        return sorted({index[t] for t in tokens if t in index})
+
+
+    def transform_tokens(self, tokens, dtype=numpy.float32):
+        """
+        Encode one list of stemmed tokens.
+        :return: 1D numpy array of length len(words)
+        """
+        row = numpy.zeros(len(self.words), dtype=dtype)
+        row[self.token_indices(tokens)] = 1
+        return row
+
+
+    def transform(self, sentence, dtype=numpy.float32):
+        """
+        Encode one raw sentence.
+        :return: 1D numpy array of length len(words)
+        """
+        return self.transform_tokens(tokenize(sentence), dtype)
+
+
+    def transform_token_batch(self, token_lists, sparse=False, dtype=numpy.float32):
+        """
+        Encode many lists of stemmed tokens at once.
+        :param token_lists: iterable of stemmed token lists
+        :param sparse: return a scipy.sparse CSR matrix instead of a dense array (needs scipy)
+        :return: (n_sentences, len(words)) matrix
+        """
+        indptr  = [0]
+        indices = []
+        for tokens in token_lists:
+            indices.extend(self.token_indices(tokens))
+            indptr.append(len(indices))
+
+        indptr  = numpy.asarray(indptr, dtype=numpy.int64)
+        indices = numpy.asarray(indices, dtype=numpy.int64)
+        shape   = (len(indptr) - 1, len(self.words))
+
+        if sparse:
+            from scipy.sparse import csr_matrix
+            data = numpy.ones(len(indices), dtype=dtype)
+            return csr_matrix((data, indices, indptr), shape=shape)
+
+        matrix = numpy.zeros(shape, dtype=dtype)
+        rows = numpy.repeat(numpy.arange(shape[0]), numpy.diff(indptr))
+        matrix[rows, indices] = 1
+        return matrix
+
+
+    def transform_batch(self, sentences, sparse=False, dtype=numpy.float32):
+        """
+        Encode many raw sentences at once.
+        :param sentences: iterable of raw text
+        :param sparse: return a scipy.sparse CSR matrix instead of a dense array (needs scipy)
+        :return: (n_sentences, len(words)) matrix
+        """
+        return self.transform_token_batch((tokenize(s) for s in sentences), sparse, dtype)
+
+
+def as_featurizer(words):
+    """
+    Accept either a BagOfWordsFeaturizer or a plain vocabulary list.
+    """
+    return words if isinstance(words, BagOfWordsFeaturizer) else BagOfWordsFeaturizer(words)
@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Incremental retraining: when intents.json changes, the previous complete cache
+# entry of the same tokenizer/hyperparameter family is diffed against the new
+# intents. Its vocabulary and labels are grown in place (existing columns keep
+# their order, words no longer used are dropped, new ones are appended), the
+# exported weights are rearranged to match, and the network is fine-tuned from
+# there for a few hundred epochs instead of being trained from scratch.
+# Removing an intent falls back to a full training, as does a missing predecessor.
+
+import numpy
+from collections import namedtuple
+
+try:
+    from neural_network.artifact_cache import ArtifactCache
+    from neural_network.numpy_model import NumpyModel, NUMPY_MODEL_NAME
+    from neural_network.training_driver import train_model
+    from neural_network import train_neural_net as tnn
+except ImportError:     # Run as a script from inside neural_network/
+    from artifact_cache import ArtifactCache
+    from numpy_model import NumpyModel, NUMPY_MODEL_NAME
+    from training_driver import train_model
+    import train_neural_net as tnn
+
+
+FINE_TUNE_EPOCHS    = 500       # Max epochs of the warm-started fine-tuning
+FINE_TUNE_PATIENCE  = 30        # Early stopping patience while fine-tuning
+NEW_WEIGHT_SCALE    = 0.01      # Std of the random weights of new words / labels
+MAX_CHANGED_FRACTION = 0.5      # Above this fraction of changed patterns, train from scratch
+INIT_SEED           = 0         # Seed of the new weights
+
+# added / removed: [(pattern, tag), ...], new_labels / removed_labels: [tag, ...]
+IntentDiff = namedtuple("IntentDiff", ["added", "removed", "new_labels", "removed_labels"])
+
+
+def current_patterns():
+    """
+    (pattern, tag) of every pattern in intents.json, in encoding order.
+    """
+    return [(pattern, intent['tag']) for intent in tnn.load_intents()['intents'] for pattern in intent['patterns']]
+
+
+def diff_intents(previous, current):
+    """
+    :param previous: [(pattern, tag), ...] of the earlier encoding
+    :param current: [(pattern, tag), ...] of intents.json
+    :return: IntentDiff
+    """
+    previous = [tuple(p) for p in previous]
+    current = [tuple(p) for p in current]
+    previous_set, current_set = set(previous), set(current)
+    previous_tags, current_tags = {tag for _, tag in previous}, {tag for _, tag in current}
+
+    return IntentDiff(added=[p for p in current if p not in previous_set],
+                      removed=[p for p in previous if p not in current_set],
+                      new_labels=sorted(current_tags - previous_tags),
+                      removed_labels=sorted(previous_tags - current_tags))
+
+
+def expand_model(numpy_model, words, labels, scale=NEW_WEIGHT_SCALE, seed=INIT_SEED):
+    """
+    Rearrange the first layer rows and last layer columns of a model for a new
+    vocabulary and label list. Words and labels the model already knows keep their
+    weights, words it no longer needs are dropped, new ones get small random weights.
+    :param words: new vocabulary (see train_neural_net.grow_vocabulary)
+    :param labels: new labels
+    :return: (weights, biases) lists, same layout as NumpyModel
+    """
+    rng = numpy.random.default_rng(seed)
+    weights = [w.copy() for w in numpy_model.weights]
+    biases = [b.copy() for b in numpy_model.biases]
+
+    def remap(old, new, shape):
+        """
+        :return: index of every new entry in old (-1 for new ones), and random weights to fill those with
+        """
+        position = {entry: i for i, entry in enumerate(old)}
+        index = numpy.array([position.get(entry, -1) for entry in new], dtype=numpy.intp)
+        return index, rng.normal(0, scale, shape).astype(numpy.float32)
+
+    index, fresh = remap(numpy_model.words, words, (len(words), weights[0].shape[1]))
+    weights[0] = numpy.where((index >= 0)[:, None], weights[0][index], fresh)
+
+    index, fresh = remap(numpy_model.labels, labels, (weights[-1].shape[0], len(labels)))
+    weights[-1] = numpy.where(index >= 0, weights[-1][:, index], fresh)
+    biases[-1] = numpy.where(index >= 0, biases[-1][index], 0).astype(numpy.float32)
+    return weights, biases
+
+
+def train_incrementally(cache, quiet=False):
+    """
+    Fine-tune the family's latest model on the current intents.json and store the
+    result (encoded data, tflearn model, report) in cache.
+    :param cache: ArtifactCache of the current intents.json (see get_artifact_cache)
+    :return: (trained_model, words, labels), or None when a full training is needed
+    """
+    previous = ArtifactCache.latest(cache.family, cache.root) if cache.family else None
+    if previous is None or previous.key == cache.key:
+        return None
+    if not (previous.has(tnn.TRAINED_DATA) and previous.has(NUMPY_MODEL_NAME)):
+        return None
+
+    vocabulary = tnn.load_vocabulary(previous)
+    if "patterns" not in vocabulary:    # Encoded before patterns were recorded
+        return None
+
+    diff = diff_intents(vocabulary["patterns"], current_patterns())
+    if diff.removed_labels:
+        print(f"Intents removed ({', '.join(diff.removed_labels)}): full retraining")
+        return None
+    n_changed = len(diff.added) + len(diff.removed)
+    if n_changed > MAX_CHANGED_FRACTION * max(len(vocabulary["patterns"]), 1):
+        print(f"{n_changed} patterns changed: full retraining")
+        return None
+
+    print(f"Incremental retraining from {previous.key}: {len(diff.added)} patterns added, "
+          f"{len(diff.removed)} removed, {len(diff.new_labels)} new intents")
+
+    # Grow the previous vocabulary / labels: earlier columns keep their order, stale words are dropped
+    training, output, words, labels = tnn.encode_training_data(cache, vocabulary["words"], vocabulary["labels"])
+
+    # Warm start from the previous weights, rearranged for the new words and labels
+    weights, biases = expand_model(NumpyModel.load(previous.path(NUMPY_MODEL_NAME)), words, labels)
+    model = tnn.build_neural_network(len(words), len(labels))
+    for layer, weight, bias in zip(model.dense_layers, weights, biases):
+        model.set_weights(layer.W, weight)
+        model.set_weights(layer.b, bias)
+
+    report = train_model(model, numpy.asarray(training), numpy.asarray(output), max_epochs=FINE_TUNE_EPOCHS,
+                         batch_size=tnn.BATCH_SIZE, patience=FINE_TUNE_PATIENCE, quiet=quiet)
+    tnn.save_trained_model(model, report, cache)
+    return model, words, labels
+
+
+if __name__ == "__main__":
+    numpy_model, words, labels = tnn.load_inference_model()
+    print(f"{len(words)} words, {len(labels)} intents")
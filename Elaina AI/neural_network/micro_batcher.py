@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+MAX_BATCH_SIZE  = 32        # Requests per forward pass
+MAX_WAIT        = 0.005     # Seconds to wait for more requests after the first one
+
+
+class MicroBatcher:
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT):
+        """
+        Collects concurrent comprehension requests for up to max_wait seconds and
+        serves them with one batched call. All model calls happen on the batcher's
+        own thread.
+
+            batcher = MicroBatcher(lambda texts: comprehend_batch(model, texts, featurizer, labels))
+            result = batcher.comprehend("elaina open chrome")
+
+        :param predict_batch: callable taking a list of texts and returning one result per text
+        :param max_batch_size: maximum requests per batch
+        :param max_wait: seconds to wait for more requests once the first one arrived
+        """
+        self.predict_batch  = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait       = max_wait
+
+        self.requests       = queue.Queue()
+        self.batches        = 0     # Batches served
+        self.served         = 0     # Requests served
+        self.thread         = threading.Thread(target=self.run, name="elaina-batcher", daemon=True)
+        self.thread.start()
+
+
+    def submit(self, text):
+        """
+        Queue a text for comprehension.
+        :return: concurrent.futures.Future resolving to the predict_batch result for the text
+        """
+        future = Future()
+        self.requests.put((text, future))
+        return future
+
+
+    def comprehend(self, text, timeout=None):
+        """
+        Blocking comprehension of a single text.
+        """
+        return self.submit(text).result(timeout)
+
+
+    async def comprehend_async(self, text):
+        """
+        Comprehension of a single text from asyncio code.
+        """
+        return await asyncio.wrap_future(self.submit(text))
+
+
+    def mean_batch_size(self):
+        return self.served / self.batches if self.batches else 0.0
+
+
+    def stop(self):
+        self.requests.put(None)
+        self.thread.join()
+
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            first = self.requests.get()
+            if first is None:
+                break
+
+            # Gather whatever else arrives within max_wait
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            self.serve(batch)
+
+
+    def serve(self, batch):
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = self.predict_batch([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+        self.batches += 1
+        self.served += len(batch)
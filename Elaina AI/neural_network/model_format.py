@@ -0,0 +1,311 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Versioned single-file format for the intent classifier, loaded by memory-mapping.
+# One file holds the vocabulary, the labels and the layer weights (no TensorFlow
+# graph or optimizer state), optionally quantized:
+#   float32     exact copy of the exported NumPy model
+#   float16     half the size, weights rounded to half precision
+#   int8        a quarter of the size, symmetric per-output-column scales
+# Layout: MAGIC, uint32 format version, uint32 header length, JSON header (shapes,
+# activations, array offsets, words, labels), then the arrays, DATA_ALIGNMENT aligned.
+#
+# Compare every dtype with the float32 tflearn model (from the "Elaina AI" directory):
+#   python -m neural_network.model_format
+#   python -m neural_network.model_format --reference numpy --json report.json
+
+import os
+import sys
+import json
+import time
+import struct
+import numpy
+
+try:
+    from neural_network.numpy_model import ACTIVATIONS
+except ImportError:     # Run as a script from inside neural_network/
+    from numpy_model import ACTIVATIONS
+
+
+MAGIC           = b"ELAINANN"
+FORMAT_VERSION  = 1
+DATA_ALIGNMENT  = 64        # Byte alignment of every array in the file
+DTYPES          = ("float32", "float16", "int8")
+INT8_RANGE      = 127       # Symmetric int8 quantization: [-127, 127]
+
+PREFIX = struct.Struct("<8sII")     # magic, format version, header length
+
+
+def model_file_name(dtype):
+    """
+    Artifact name of the model file for a dtype (see artifact_cache.py).
+    """
+    return f"elaina_model.{dtype}.bin"
+
+
+# ===============================
+# ======| Quantization |=========
+# ===============================
+
+def quantize(weight, dtype):
+    """
+    :param weight: (n_in, n_out) float32 matrix
+    :return: (stored weight, per-column float32 scales or None)
+    """
+    if dtype == "float32":
+        return numpy.asarray(weight, dtype=numpy.float32), None
+    if dtype == "float16":
+        return numpy.asarray(weight, dtype=numpy.float16), None
+    if dtype == "int8":
+        scale = numpy.abs(weight).max(axis=0) / INT8_RANGE
+        scale[scale == 0] = 1.0
+        quantized = numpy.clip(numpy.rint(weight / scale), -INT8_RANGE, INT8_RANGE).astype(numpy.int8)
+        return quantized, scale.astype(numpy.float32)
+    raise ValueError(f"Unknown model dtype: {dtype} (expected one of {', '.join(DTYPES)})")
+
+
+# ===============================
+# ======| Mapped Model |=========
+# ===============================
+
+class MappedModel:
+    def __init__(self, weights, scales, biases, activations, words, labels, dtype):
+        """
+        Forward pass over (possibly quantized) weights. predict() matches NumpyModel.predict.
+        float32 weights are used straight from the memory map. float16 / int8 weights are
+        dequantized to float32 once, on the first predict(): the file stays small on disk and
+        loads without reading the weights, but a model that serves requests then holds a
+        float32 copy of them (a few KiB for this classifier) instead of converting every call.
+        :param scales: per-layer per-column scales (None entries unless int8)
+        """
+        self.weights        = weights
+        self.scales         = scales
+        self.biases         = biases
+        self.activations    = activations
+        self.words          = words
+        self.labels         = labels
+        self.dtype          = dtype
+        self.float_weights  = None  # float32 weights with the scales applied, built by the first predict()
+
+
+    def dequantize(self):
+        """
+        :return: float32 weights of every layer (the mapped arrays themselves for float32 files)
+        """
+        if self.float_weights is None:
+            float_weights = []
+            for weight, scale in zip(self.weights, self.scales):
+                weight = weight.astype(numpy.float32, copy=False)
+                float_weights.append(weight * scale if scale is not None else weight)
+            self.float_weights = float_weights
+        return self.float_weights
+
+
+    def predict(self, inputs):
+        """
+        Forward pass.
+        :param inputs: (n_samples, n_words) array, or a list of bag-of-words rows
+        :return: (n_samples, n_labels) array of probabilities
+        """
+        x = numpy.atleast_2d(numpy.asarray(inputs, dtype=numpy.float32))
+        for weight, bias, activation in zip(self.dequantize(), self.biases, self.activations):
+            x = ACTIVATIONS[activation](x @ weight + bias)
+        return x
+
+
+def save_model(numpy_model, path, dtype="float32"):
+    """
+    Write a NumpyModel in the model file format.
+    :param path: file path or writable binary file object
+    :param dtype: weight storage type, one of DTYPES (biases stay float32)
+    """
+    arrays = []     # Arrays in file order
+    layers = []
+    offset = 0
+
+    def place(array):
+        nonlocal offset
+        array = numpy.ascontiguousarray(array)
+        start = offset
+        arrays.append((start, array))
+        offset = -(-(start + array.nbytes) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+        return start
+
+    for weight, bias, activation in zip(numpy_model.weights, numpy_model.biases, numpy_model.activations):
+        stored, scale = quantize(weight, dtype)
+        layers.append({"activation": activation,
+                       "shape": list(stored.shape),
+                       "weight": place(stored),
+                       "scale": place(scale) if scale is not None else None,
+                       "bias": place(numpy.asarray(bias, dtype=numpy.float32))})
+
+    header = json.dumps({"dtype": dtype, "layers": layers,
+                         "words": list(numpy_model.words or []), "labels": list(numpy_model.labels or [])}).encode()
+    data_start = -(-(PREFIX.size + len(header)) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+    def write(wf):
+        wf.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        wf.write(header)
+        position = PREFIX.size + len(header)
+        for start, array in arrays:
+            wf.write(b"\0" * (data_start + start - position))
+            wf.write(array.tobytes())
+            position = data_start + start + array.nbytes
+
+    if hasattr(path, "write"):
+        write(path)
+    else:
+        with open(path, "wb") as wf:
+            write(wf)
+
+
+def load_model(path):
+    """
+    Memory-map a model file.
+    :return: MappedModel
+    """
+    with open(path, "rb") as rf:
+        magic, version, header_length = PREFIX.unpack(rf.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an Elaina model file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has model format version {version}, this version reads {FORMAT_VERSION}")
+        header = json.loads(rf.read(header_length))
+
+    data_start = -(-(PREFIX.size + header_length) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+    mapped = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+
+    def array(start, dtype, shape):
+        dtype = numpy.dtype(dtype)
+        count = int(numpy.prod(shape))
+        begin = data_start + start
+        return mapped[begin:begin + count * dtype.itemsize].view(dtype).reshape(shape)
+
+    weights, scales, biases, activations = [], [], [], []
+    for layer in header["layers"]:
+        n_in, n_out = layer["shape"]
+        weights.append(array(layer["weight"], header["dtype"], (n_in, n_out)))
+        scales.append(array(layer["scale"], numpy.float32, (n_out,)) if layer["scale"] is not None else None)
+        biases.append(array(layer["bias"], numpy.float32, (n_out,)))
+        activations.append(layer["activation"])
+    return MappedModel(weights, scales, biases, activations, header["words"], header["labels"], header["dtype"])
+
+
+# ===============================
+# ======| Comparison |===========
+# ===============================
+
+def time_predict(model, inputs, repeat):
+    """
+    :return: median seconds per predict() call
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(inputs)
+        times.append(time.perf_counter() - start)
+    return float(numpy.median(times))
+
+
+def compare_models(reference, numpy_model, training, output, directory, repeat=200, reference_load_time=None):
+    """
+    Accuracy and latency of every dtype against a float32 reference model.
+    :param reference: float32 model the others are compared with (tflearn.DNN or NumpyModel)
+    :param numpy_model: exported float32 NumpyModel the model files are written from
+    :param training: bag-of-words rows to evaluate on
+    :param output: one-hot labels of the rows
+    :param directory: where the model files are written
+    :param reference_load_time: seconds the reference took to load (None if unknown)
+    :return: list of result dicts, the reference first
+    """
+    training = numpy.asarray(training, dtype=numpy.float32)
+    targets = numpy.asarray(output).argmax(axis=1)
+    expected = numpy.asarray(reference.predict(training))
+
+    def evaluate(name, model, size, load_time):
+        probabilities = numpy.asarray(model.predict(training))
+        return {"model": name,
+                "size_bytes": size,
+                "load_ms": load_time * 1000 if load_time is not None else None,
+                "accuracy": float((probabilities.argmax(axis=1) == targets).mean()),
+                "agreement": float((probabilities.argmax(axis=1) == expected.argmax(axis=1)).mean()),
+                "max_abs_diff": float(numpy.abs(probabilities - expected).max()),
+                "single_us": time_predict(model, training[:1], repeat) * 1e6,
+                "batch_us": time_predict(model, training, repeat) * 1e6}
+
+    results = [evaluate(f"reference ({type(reference).__name__})", reference, None, reference_load_time)]
+    for dtype in DTYPES:
+        path = os.path.join(directory, model_file_name(dtype))
+        save_model(numpy_model, path, dtype)
+        start = time.perf_counter()
+        model = load_model(path)
+        load_time = time.perf_counter() - start
+        results.append(evaluate(dtype, model, os.path.getsize(path), load_time))
+    return results
+
+
+def print_results(results, n_rows):
+    print(f"{n_rows} patterns")
+    for r in results:
+        size = f"{r['size_bytes'] / 1024:8.1f} KiB" if r["size_bytes"] is not None else " " * 12
+        load = f"{r['load_ms']:7.2f} ms" if r["load_ms"] is not None else " " * 10
+        print(f"{r['model']:<24} {size}  load {load}  accuracy {r['accuracy']:6.1%}  "
+              f"agreement {r['agreement']:6.1%}  max |diff| {r['max_abs_diff']:.1e}  "
+              f"predict 1 row {r['single_us']:7.1f} us  all rows {r['batch_us']:8.1f} us")
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    from neural_network.numpy_model import NumpyModel
+    from neural_network.train_neural_net import create_and_train_neural_network, load_encoded_data, \
+        load_inference_model, get_artifact_cache
+
+    parser = argparse.ArgumentParser(description="Compare the quantized model files with the float32 model.")
+    parser.add_argument("--reference", choices=("tflearn", "numpy"), default="tflearn",
+                        help="float32 model compared against (numpy: the exported NumPy model, no TensorFlow)")
+    parser.add_argument("--repeat", type=int, default=200, help="predict() calls timed per model")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.reference == "tflearn":     # Graph + checkpoint files (trains first if the cache has no model)
+        reference, words, labels = create_and_train_neural_network()
+        numpy_model = NumpyModel.from_tflearn(reference, words, labels)
+    else:
+        numpy_model = load_inference_model(model_dtype=None)[0]
+        reference = numpy_model
+    load_time = time.perf_counter() - start
+
+    training, output, _, _ = load_encoded_data(get_artifact_cache())
+    with tempfile.TemporaryDirectory() as directory:
+        results = compare_models(reference, numpy_model, training, output, directory, args.repeat, load_time)
+    print_results(results, len(training))
+
+    if args.json:
+        with open(args.json, "w") as wf:
+            json.dump(results, wf, indent=2)
+    sys.exit(0 if all(r["agreement"] == 1.0 for r in results if r["model"] == "float32") else 1)
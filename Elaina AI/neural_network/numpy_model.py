@@ -0,0 +1,171 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Framework-free inference for the intent classifier. The trained network is only a
+# few small fully connected layers, so once its weights are exported to an .npz file
+# a NumPy forward pass replaces TensorFlow/tflearn at runtime.
+#
+# Export to the artifact cache (and parity check against tflearn) from the "Elaina AI" directory:
+#   python -m neural_network.numpy_model
+
+import os
+import sys
+import numpy
+
+
+NUMPY_MODEL_NAME = "elaina_model.npz"   # Stored in the artifact cache (see artifact_cache.py)
+
+PARITY_TOLERANCE = 1e-5     # Max absolute probability difference accepted by check_parity
+
+
+# ===============================
+# ======| Activations |==========
+# ===============================
+
+def softmax(x):
+    exp = numpy.exp(x - x.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+ACTIVATIONS = {
+    "linear"    : lambda x: x,
+    "relu"      : lambda x: numpy.maximum(x, 0),
+    "sigmoid"   : lambda x: 1 / (1 + numpy.exp(-x)),
+    "tanh"      : numpy.tanh,
+    "softmax"   : softmax
+}
+
+
+# ===============================
+# ======| NumPy Model |==========
+# ===============================
+
+class NumpyModel:
+    def __init__(self, weights, biases, activations, words=None, labels=None):
+        """
+        Feed-forward network evaluated with NumPy. predict() matches tflearn.DNN.predict.
+        :param weights: list of (n_in, n_out) float32 matrices, one per layer
+        :param biases: list of (n_out,) float32 vectors, one per layer
+        :param activations: list of activation names (see ACTIVATIONS), one per layer
+        :param words: vocabulary the model was trained on (optional)
+        :param labels: output labels (optional)
+        """
+        self.weights        = [numpy.asarray(w, dtype=numpy.float32) for w in weights]
+        self.biases         = [numpy.asarray(b, dtype=numpy.float32) for b in biases]
+        self.activations    = list(activations)
+        self.words          = words
+        self.labels         = labels
+
+
+    def predict(self, inputs):
+        """
+        Forward pass.
+        :param inputs: (n_samples, n_words) array, or a list of bag-of-words rows
+        :return: (n_samples, n_labels) array of probabilities
+        """
+        x = numpy.atleast_2d(numpy.asarray(inputs, dtype=numpy.float32))
+        for weight, bias, activation in zip(self.weights, self.biases, self.activations):
+            x = ACTIVATIONS[activation](x @ weight + bias)
+        return x
+
+
+    @classmethod
+    def from_tflearn(cls, trained_model, words, labels):
+        """
+        Copy the weights out of a tflearn model built by build_neural_network.
+        :param trained_model: tflearn.DNN with dense_layers
+        """
+        try:
+            from neural_network.train_neural_net import HIDDEN_ACTIVATION, OUTPUT_ACTIVATION
+        except ImportError:     # Run as a script from inside neural_network/
+            from train_neural_net import HIDDEN_ACTIVATION, OUTPUT_ACTIVATION
+
+        layers = trained_model.dense_layers
+        weights = [trained_model.get_weights(layer.W) for layer in layers]
+        biases  = [trained_model.get_weights(layer.b) for layer in layers]
+        activations = [HIDDEN_ACTIVATION] * (len(layers) - 1) + [OUTPUT_ACTIVATION]
+        return cls(weights, biases, activations, words, labels)
+
+
+    def save(self, path):
+        """
+        :param path: .npz path or writable binary file object
+        """
+        arrays = {}
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"W{i}"] = weight
+            arrays[f"b{i}"] = bias
+
+        numpy.savez_compressed(path,
+                               activations=numpy.array(self.activations),
+                               words=numpy.array(self.words if self.words is not None else []),
+                               labels=numpy.array(self.labels if self.labels is not None else []),
+                               **arrays)
+
+
+    @classmethod
+    def load(cls, path):
+        with numpy.load(path) as npz:
+            activations = [str(a) for a in npz["activations"]]
+            weights     = [npz[f"W{i}"] for i in range(len(activations))]
+            biases      = [npz[f"b{i}"] for i in range(len(activations))]
+            words       = [str(w) for w in npz["words"]]
+            labels      = [str(l) for l in npz["labels"]]
+        return cls(weights, biases, activations, words, labels)
+
+
+# ===============================
+# ======| Export / Parity |======
+# ===============================
+
+def check_parity(trained_model, numpy_model, inputs, tolerance=PARITY_TOLERANCE):
+    """
+    Compare the NumPy forward pass with tflearn on the same inputs.
+    :return: (passed, max absolute difference, fraction of rows with the same argmax)
+    """
+    expected = numpy.asarray(trained_model.predict(inputs))
+    actual = numpy_model.predict(inputs)
+
+    max_diff = float(numpy.abs(expected - actual).max()) if len(expected) else 0.0
+    same_argmax = float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()) if len(expected) else 1.0
+    return max_diff <= tolerance and same_argmax == 1.0, max_diff, same_argmax
+
+
+if __name__ == "__main__":
+    from neural_network.train_neural_net import create_and_train_neural_network, load_encoded_data, get_artifact_cache
+
+    trained_model, words, labels = create_and_train_neural_network()
+    numpy_model = NumpyModel.from_tflearn(trained_model, words, labels)
+
+    cache = get_artifact_cache()
+    cache.write_file(NUMPY_MODEL_NAME, numpy_model.save)
+    print(f"Exported to {cache.path(NUMPY_MODEL_NAME)} ({os.path.getsize(cache.path(NUMPY_MODEL_NAME))} bytes)")
+
+    # Parity check on every training pattern
+    training = numpy.asarray(load_encoded_data(cache)[0], dtype=numpy.float32)
+    passed, max_diff, same_argmax = check_parity(trained_model, numpy_model, training)
+    print(f"Parity: max |diff| = {max_diff:.2e}, same prediction on {same_argmax:.1%} of patterns")
+    sys.exit(0 if passed else 1)
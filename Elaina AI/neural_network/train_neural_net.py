@@ -25,37 +25,93 @@
 # SOFTWARE.
 
 
-import nltk
-nltk.download('punkt')
-from nltk.stem.lancaster import LancasterStemmer
-stemmer = LancasterStemmer()
-
+try:
+    from neural_network.featurizer import BagOfWordsFeaturizer, as_featurizer, stem_tokens, tokenize, word_tokenize
+    from neural_network.featurizer import TOKENIZER_VERSION
+    from neural_network.numpy_model import NumpyModel, NUMPY_MODEL_NAME
+    from neural_network.model_format import load_model, save_model, model_file_name
+    from neural_network.artifact_cache import ArtifactCache, compute_cache_key, compute_family_key, package_version
+    from neural_network.training_driver import train_model, save_report, VALIDATION_SPLIT, PATIENCE, SPLIT_SEED
+except ImportError:     # Run as a script from inside neural_network/
+    from featurizer import BagOfWordsFeaturizer, as_featurizer, stem_tokens, tokenize, word_tokenize
+    from featurizer import TOKENIZER_VERSION
+    from numpy_model import NumpyModel, NUMPY_MODEL_NAME
+    from model_format import load_model, save_model, model_file_name
+    from artifact_cache import ArtifactCache, compute_cache_key, compute_family_key, package_version
+    from training_driver import train_model, save_report, VALIDATION_SPLIT, PATIENCE, SPLIT_SEED
+
+# tensorflow and tflearn are imported inside build_neural_network: they take seconds
+# to import and are only needed once a model is built.
 import os
 import numpy
-import tflearn
-import tensorflow
 import json
-import pickle
+from collections import namedtuple
 
 
 CONFIDENCE_THRESHOLD = 0.95
 
+HIDDEN_LAYERS       = [8, 16, 8]    # Neurons per fully connected hidden layer
+HIDDEN_ACTIVATION   = "linear"      # tflearn.fully_connected default
+OUTPUT_ACTIVATION   = "softmax"
+N_EPOCH             = 10000         # max number of times to feed the model the same data (early stopping usually ends sooner)
+BATCH_SIZE          = 8             # number of batch per training run
+N_THREADS           = os.cpu_count() or 1   # TensorFlow threads used for training
+INCREMENTAL_TRAINING = True         # Fine-tune the previous model after intents.json edits (see incremental.py)
+TOP_K = 3   # Alternatives returned by comprehend_batch
+MODEL_DTYPE = os.environ.get("ELAINA_MODEL_DTYPE", "float32")   # Served model file: float32, float16 or int8
+
+# tag: best label (None if below CONFIDENCE_THRESHOLD), confidence: its probability,
+# alternatives: [(label, probability), ...] for the top_k labels
+IntentResult = namedtuple("IntentResult", ["tag", "confidence", "alternatives"])
+
 
 
 DATA_FILE_NAME = "intents.json"
 DATA_FILE_ABSPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), DATA_FILE_NAME)
 
+# Artifact names inside the artifact cache (see artifact_cache.py)
+DL_MODEL_DIR = "training_model"
 DL_MODEL_NAME = "elaina_model.tflearn"
-DL_MODEL_ABSPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"training_models/{DL_MODEL_NAME}")
+TRAINED_DATA = "elaina_data.json"           # Vocabulary, labels and the encoded (pattern, tag) pairs
+TRAINING_INPUTS = "training_inputs.npy"     # uint8 bag-of-words matrix, one row per pattern
+TRAINING_OUTPUTS = "training_outputs.npy"   # uint8 one-hot tags, one row per pattern
+TRAINING_REPORT = "training_report.json"
 
-TRAINED_DATA = "elaina_data.pickle"
-TRAINED_DATA_ABSPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"trained_data/{TRAINED_DATA}")
+ENCODE_BLOCK_ROWS = 4096    # Patterns encoded per block while writing the training matrix
 
-with open(DATA_FILE_ABSPATH) as file:
-    data = json.load(file)
+data = None     # intents.json, loaded on first use by load_intents()
 
 
-def encode_training_data():
+def load_intents():
+    """
+    Parse intents.json once, on first use.
+    """
+    global data
+    if data is None:
+        with open(DATA_FILE_ABSPATH) as file:
+            data = json.load(file)
+    return data
+
+
+def encode_training_data(cache=None, base_words=None, base_labels=None):
+    """
+    Encode intents.json into the artifact cache and return the encoded data. The
+    bag-of-words matrix is written block by block straight into a uint8 .npy file
+    and returned memory-mapped, so it is never held in memory as a whole.
+    :param cache: ArtifactCache to write to (the current one if None)
+    :param base_words: vocabulary of an earlier encoding to grow: its columns keep their
+                       order, words no longer in intents.json are dropped and new words are
+                       appended. If None, the order already stored in the cache entry is kept
+                       (so a re-encode matches the model trained on it), else it is sorted
+    :param base_labels: labels of an earlier encoding to grow the same way
+    :return: training (memory-mapped uint8 matrix), output (memory-mapped uint8 one-hot), words, labels
+    """
+    if cache is None:
+        cache = get_artifact_cache()
+    if base_words is None and cache.has(TRAINED_DATA):
+        stored = load_vocabulary(cache)
+        base_words, base_labels = stored["words"], stored["labels"]
+
     # =====================================
     # ======| READING TRAINING DATA |======
     # =====================================
@@ -66,6 +122,7 @@ def encode_training_data():
 
     docs_x  = []     # List of all patterns tokenized into words
     docs_y  = []     # List of tags corresponding to the pattern in docs_x
+    patterns = []    # (pattern, tag) of every row, recorded to diff later edits against
 
     # Explanation:
     # docs_x = [pattern1, pattern2, pattern3]  
@@ -74,13 +131,14 @@ def encode_training_data():
     #    tag1    = "greetings"
     # Tags can have duplciates. They simply correspond to the pattern
 
-    for intent in data['intents']:
+    for intent in load_intents()['intents']:
         for pattern in intent['patterns']:
 
-            wrds = nltk.word_tokenize(pattern)
+            wrds = word_tokenize(pattern)
             words.extend(wrds)
             docs_x.append(wrds)
             docs_y.append(intent['tag'])
+            patterns.append((pattern, intent['tag']))
 
         # Load all labels
         if intent['tag'] not in labels:
@@ -89,173 +147,297 @@ def encode_training_data():
     # Stem words and remove duplicate words
     # Stem will remove prefix, suffix or infix for word 
     #   EX: stem([plays, playing, play]) -> [play, play, play]
-    words = [stemmer.stem(w.lower()) for w in words if w != "?"]
+    words = stem_tokens([w for w in words if w != "?"])
     words = sorted(list(set(words)))
 
     labels = sorted(labels)
 
+    # Incremental encoding: earlier columns keep their order, stale ones are dropped, new ones are appended
+    if base_words is not None:
+        words = grow_vocabulary(base_words, words)
+    if base_labels is not None:
+        labels = grow_vocabulary(base_labels, labels)
+
 
 
     # ================================
     # ======| ONE-HOT ENCODING |======
     # ================================
 
-    training    = []    # List of bags
-    output      = []    # List of outputs
+    featurizer = BagOfWordsFeaturizer(words)
+    label_index = {label: i for i, label in enumerate(labels)}
+
+    # Generate one-hot on the patterns (one row per pattern, order matters)
+    def write_training(path):
+        training = numpy.lib.format.open_memmap(path, mode="w+", dtype=numpy.uint8, shape=(len(docs_x), len(words)))
+        for start in range(0, len(docs_x), ENCODE_BLOCK_ROWS):
+            block = [stem_tokens(doc) for doc in docs_x[start:start + ENCODE_BLOCK_ROWS]]
+            training[start:start + len(block)] = featurizer.transform_token_batch(block, dtype=numpy.uint8)
+        training.flush()
 
-    out_empty = [0 for _ in range(len(labels))]
+    # Generate one-hot based on the tags
+    def write_output(path):
+        output = numpy.lib.format.open_memmap(path, mode="w+", dtype=numpy.uint8, shape=(len(docs_y), len(labels)))
+        output[numpy.arange(len(docs_y)), [label_index[tag] for tag in docs_y]] = 1
+        output.flush()
 
-    for x, doc in enumerate(docs_x):
-        bag = []    # One-Hot Encoded Bag (order matters)
-        wrds = [stemmer.stem(w) for w in doc]
+    cache.write_path(TRAINING_INPUTS, write_training)
+    cache.write_path(TRAINING_OUTPUTS, write_output)
+    # Written last: its presence marks the encoded data as complete
+    vocabulary = {"words": words, "labels": labels, "patterns": patterns}
+    cache.write_file(TRAINED_DATA, lambda wf: wf.write(json.dumps(vocabulary).encode()))
 
-        # Generate one-hot on the patterns
-        for w in words:
-            if w in wrds:
-                bag.append(1)
-            else:
-                bag.append(0)
+    return load_encoded_data(cache)
 
-        # Generate one-hot based on the tags
-        output_row = out_empty[:]
-        output_row[labels.index(docs_y[x])] = 1
 
-        training.append(bag)
-        output.append(output_row)
+def grow_vocabulary(base, current):
+    """
+    :param base: words (or labels) of an earlier encoding, in column order
+    :param current: words of the current intents.json
+    :return: base without the entries missing from current, followed by the new entries of current
+    """
+    current_set, base_set = set(current), set(base)
+    return [w for w in base if w in current_set] + [w for w in current if w not in base_set]
+
+
+def load_vocabulary(cache):
+    """
+    Vocabulary stored with the encoded data of a cache entry.
+    :return: {"words": [...], "labels": [...], "patterns": [(pattern, tag), ...]} ("patterns" may be missing)
+    """
+    with open(cache.path(TRAINED_DATA)) as rf:
+        return json.load(rf)
 
-        try:
-            with open(TRAINED_DATA_ABSPATH, "wb") as wf:
-                pickle.dump(words, labels, training, output, wf)
-        except:
-            pass
 
-    return training, output, words, labels
+def load_encoded_data(cache):
+    """
+    Memory-map the encoded training data of a cache entry.
+    :return: training (uint8 matrix), output (uint8 one-hot), words, labels
+    """
+    vocabulary = load_vocabulary(cache)
+    training = numpy.load(cache.path(TRAINING_INPUTS), mmap_mode="r")
+    output = numpy.load(cache.path(TRAINING_OUTPUTS), mmap_mode="r")
+    return training, output, vocabulary["words"], vocabulary["labels"]
 
 
-def create_neural_network(training_data, output_data, force_train):
+def get_artifact_cache():
+    """
+    Artifact cache for the current intents.json, tokenizer and hyperparameters.
+    """
+    hyperparameters = {
+        "hidden_layers"     : HIDDEN_LAYERS,
+        "hidden_activation" : HIDDEN_ACTIVATION,
+        "output_activation" : OUTPUT_ACTIVATION,
+        "n_epoch"           : N_EPOCH,
+        "batch_size"        : BATCH_SIZE,
+        "validation_split"  : VALIDATION_SPLIT,
+        "patience"          : PATIENCE,
+        "split_seed"        : SPLIT_SEED
+    }
+    tokenizer_version = f"{TOKENIZER_VERSION}/nltk-{package_version('nltk')}"
+    return ArtifactCache(compute_cache_key(DATA_FILE_ABSPATH, tokenizer_version, hyperparameters),
+                         family=compute_family_key(tokenizer_version, hyperparameters))
+
+
+def create_neural_network(training_data, output_data, force_train, cache=None, quiet=False, n_threads=N_THREADS):
     """
     Create neural network model for training. Based on One-hot Encoded data.
     :param training_data: Out-hot encoded input data
     :param output_data: One-hot encoded output data
+    :param force_train: Train even if the cache already holds a trained model
+    :param cache: ArtifactCache the trained model is loaded from / saved to
+    :param quiet: Hide tflearn's per-step training output
+    :param n_threads: TensorFlow threads used for training
     """
     
+    # Reformat into numpy arrays for training (no copy: memory-mapped data stays on disk)
+    training    = numpy.asarray(training_data)  # np.array of bags
+    output      = numpy.asarray(output_data)    # np.array of outputs
+
+    model = build_neural_network(len(training[0]), len(output[0]), n_threads)
+
+    if cache is None:
+        cache = get_artifact_cache()
+
+    # Fit data 
+    if force_train == False and cache.has(DL_MODEL_DIR):    # Load the model trained for this exact setup
+        model.load(os.path.join(cache.path(DL_MODEL_DIR), DL_MODEL_NAME))
+    
+    else: # Train model (fit data, early stopping on held-out patterns) and store it in the cache
+        report = train_model(model, training, output, max_epochs=N_EPOCH, batch_size=BATCH_SIZE, quiet=quiet)
+        save_trained_model(model, report, cache)
+
+    return model
+
+
+def build_neural_network(training_row_length, output_row_length, n_threads=N_THREADS):
+    """
+    Build the (untrained) tflearn network.
+    :param training_row_length: vocabulary size
+    :param output_row_length: number of labels
+    """
+
     # ================================
     # ======| NEURAL NETWORK |========
     # ================================
 
-    # Reformat into numpy arrays for training
-    training    = numpy.array(training_data)    # np.array of bags
-    output      = numpy.array(output_data)      # np.array of outputs
+    import tflearn
+    import tensorflow
 
     tensorflow.compat.v1.reset_default_graph()
+    tflearn.init_graph(num_cores=n_threads)
 
     # Input Layer
-    training_row_length = len(training[0])
     net = tflearn.input_data(shape=[None, training_row_length])
 
-    # Hidden Layer (fully connected with 8 neurons)
-    net = tflearn.fully_connected(net, 8)
-    net = tflearn.fully_connected(net, 16)
-    net = tflearn.fully_connected(net, 8)
+    # Hidden Layers (fully connected with 8, 16 and 8 neurons)
+    dense_layers = []
+    for n_units in HIDDEN_LAYERS:
+        net = tflearn.fully_connected(net, n_units, activation=HIDDEN_ACTIVATION)
+        dense_layers.append(net)
 
     # Output Layer (softwax activation [output highest neuron probability])
-    output_row_length = len(output[0])
-    net = tflearn.fully_connected(net, output_row_length, activation="softmax")    
+    net = tflearn.fully_connected(net, output_row_length, activation=OUTPUT_ACTIVATION)
+    dense_layers.append(net)
 
     # Create neural network model
     net = tflearn.regression(net)
     model = tflearn.DNN(net)
+    model.dense_layers = dense_layers   # Layer handles for exporting the weights (numpy_model.py)
+    return model
 
-    # Fit data 
-    n_epoch     = 10000      # number of times to feed the model the same data
-    batch_size  = 8         # number of batch per training run
-    show_metric = True      # basically verbose training
-    
-    if force_train == False:
-        try:    # Try to load model if exists
-            model.load(DL_MODEL_ABSPATH)
-        except: # If model does not exist, train model (fit data)
-            model.fit(training, output, n_epoch=n_epoch, batch_size=batch_size, show_metric=show_metric)
-            model.save(DL_MODEL_ABSPATH)
-    
-    else: # Force train the model
-        model.fit(training, output, n_epoch=n_epoch, batch_size=batch_size, show_metric=show_metric)
-        model.save(DL_MODEL_ABSPATH)
 
-    return model
+def save_trained_model(model, report, cache):
+    """
+    Store a freshly trained tflearn model and its TrainingReport in the cache.
+    """
+    print(report)
+    cache.write_directory(DL_MODEL_DIR, lambda model_dir: model.save(os.path.join(model_dir, DL_MODEL_NAME)))
+    cache.write_file(TRAINING_REPORT, lambda wf: save_report(report, wf))
 
 
 def bag_of_words(s, words):
-    bag = [0 for _ in range(len(words))]
-    
-    s_words = nltk.word_tokenize(s)
-    s_words = [stemmer.stem(word.lower()) for word in s_words]
-    
-    for se in s_words:
-        for i, w in enumerate(words):
-            if w == se:
-                bag[i] = 1
-    
-    return numpy.array(bag)            
+    """
+    Bag-of-words encoding of a sentence.
+    :param s: sentence
+    :param words: BagOfWordsFeaturizer, or the patterns words list
+    """
+    return as_featurizer(words).transform(s)
 
 
-def create_and_train_neural_network(force_encode=False, force_train=False):
+def create_and_train_neural_network(force_encode=False, force_train=False, quiet=False):
     """
     Elaina neural network driver.
     1. Encode Training Data
     2. Create Neural Network
     
     :param force_train: Train new model regardless whether it already exist or not
+    :param quiet: Hide tflearn's per-step training output
     :return: The NL trained model
     """
     
+    cache = get_artifact_cache()
+
     # =====| DATA ENCODE |=====
-    if force_encode == True:  # Force to reencode all data
-        training_data = encode_training_data()
-        input_training_data  = training_data[0]
-        output_training_data = training_data[1]
-        words                = training_data[2]  # all the words from patterns
-        labels               = training_data[3]
+    if force_encode == False and cache.has(TRAINED_DATA):    # Load encoded data if already exists
+        input_training_data, output_training_data, words, labels = load_encoded_data(cache)
     
-    else: # Not forced to reencode all data
-        try:    # Load encoded data if already exists
-            with open(TRAINED_DATA_ABSPATH, "rb") as rf:
-                words, labels, training, output = pickle.load(rf)
-                
-            input_training_data  = training
-            output_training_data = output
-        except: # Encode data if those data does not exist yet 
-            training_data = encode_training_data()
-            input_training_data  = training_data[0]
-            output_training_data = training_data[1]
-            words                = training_data[2]  # all the words from patterns
-            labels               = training_data[3]
+    else: # Encode data (forced, or not encoded for this setup yet)
+        input_training_data, output_training_data, words, labels = encode_training_data(cache)
     
     # =====| MODEL TRAINING |=====
-    trained_model = create_neural_network(input_training_data, output_training_data, force_train)
+    trained_model = create_neural_network(input_training_data, output_training_data, force_train, cache, quiet)
     return trained_model, words, labels
 
 
+def load_inference_model(force_export=False, incremental=INCREMENTAL_TRAINING, model_dtype=MODEL_DTYPE):
+    """
+    Load the classifier for serving. Memory-maps the model file (see model_format.py) from the
+    artifact cache when present; otherwise converts the exported NumPy model, or builds/loads
+    the tflearn model once and exports it.
+    :param force_export: Re-export even if the cache already holds a NumPy model
+    :param incremental: After an intents.json edit, fine-tune the previous model instead of
+                        training from scratch (falls back to a full training when not possible)
+    :param model_dtype: weights of the served model file (float32, float16 or int8); None serves
+                        the float32 NumpyModel itself
+    :return: (model, words, labels), the model has the same predict() as tflearn.DNN
+    """
+    cache = get_artifact_cache()
+    if force_export == False and model_dtype is not None and cache.has(model_file_name(model_dtype)):
+        model = load_model(cache.path(model_file_name(model_dtype)))
+        return model, model.words, model.labels
+
+    if force_export == False and cache.has(NUMPY_MODEL_NAME):
+        numpy_model = NumpyModel.load(cache.path(NUMPY_MODEL_NAME))
+    else:
+        trained = None
+        if incremental and not cache.has(DL_MODEL_DIR):
+            try:
+                from neural_network.incremental import train_incrementally
+            except ImportError:     # Run as a script from inside neural_network/
+                from incremental import train_incrementally
+            trained = train_incrementally(cache)
+
+        trained_model, words, labels = trained or create_and_train_neural_network()
+        numpy_model = NumpyModel.from_tflearn(trained_model, words, labels)
+        cache.write_file(NUMPY_MODEL_NAME, numpy_model.save)
+        cache.mark_latest()
+
+    if model_dtype is None:
+        return numpy_model, numpy_model.words, numpy_model.labels
+
+    cache.write_file(model_file_name(model_dtype), lambda wf: save_model(numpy_model, wf, model_dtype))
+    model = load_model(cache.path(model_file_name(model_dtype)))
+    return model, model.words, model.labels
+
+
+def comprehend_batch(trained_model, texts, words, labels, top_k=TOP_K):
+    """
+    Comprehend many user texts with a single forward pass.
+    :param texts: list of user input texts
+    :param words: BagOfWordsFeaturizer, or the patterns words list
+    :param labels: all labels
+    :param top_k: number of alternatives to return per text
+    :return: list of IntentResult (tag is None when the best confidence is below CONFIDENCE_THRESHOLD)
+    """
+    return comprehend_token_batch(trained_model, [tokenize(text) for text in texts], words, labels, top_k)
+
+
+def comprehend_token_batch(trained_model, token_lists, words, labels, top_k=TOP_K):
+    """
+    Same as comprehend_batch, for texts that are already tokenized and stemmed (see featurizer.tokenize).
+    :param token_lists: list of stemmed token lists
+    """
+    if len(token_lists) == 0:
+        return []
+
+    # Predict output (one row of probabilities per text)
+    features = as_featurizer(words).transform_token_batch(token_lists)
+    results = numpy.asarray(trained_model.predict(features))
+
+    # Select outputs with the highest probabilities
+    ranked = numpy.argsort(-results, axis=1)[:, :top_k]
+
+    intents = []
+    for row, indices in zip(results, ranked):
+        alternatives = [(labels[i], float(row[i])) for i in indices]
+        tag, confidence = alternatives[0]
+
+        # Check prediction confidence
+        if confidence <= CONFIDENCE_THRESHOLD:
+            tag = None
+        intents.append(IntentResult(tag, confidence, alternatives))
+    return intents
+
+
 def comprehend_text(trained_model, input_text, words, labels):
     """
     Comprehend user texts and outputs the corresponding tag. Returns None if input cannot be understood.
     :param input_text: User input text to understand
-    :words: patters words list
+    :words: BagOfWordsFeaturizer, or the patterns words list
     :labels: all labels
     """
-    # Predict output
-    results = trained_model.predict([bag_of_words(input_text, words)])
-    print(results)
-    
-    # Select output with the highest probability
-    result_index = numpy.argmax(results)
-    tag = labels[result_index]
-    
-    # Check prediction confidence
-    if results[0][result_index] > CONFIDENCE_THRESHOLD:
-        return tag
-    else:
-        return None
+    return comprehend_batch(trained_model, [input_text], words, labels)[0].tag
 
 if __name__ == "__main__":
     trained_model, words, labels = create_and_train_neural_network(force_encode=True, force_train=True)
@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Training driver for the tflearn intent model: held-out validation split, early
+# stopping on validation loss (restoring the best weights), optional silencing of
+# tflearn's per-step console output, and a timing/accuracy report at the end.
+
+import os
+import sys
+import time
+import json
+import contextlib
+import numpy
+
+
+VALIDATION_SPLIT    = 0.15      # Fraction of every tag's patterns held out for validation
+PATIENCE            = 100       # Epochs without validation loss improvement before stopping
+MIN_DELTA           = 1e-4      # Smallest validation loss decrease counted as an improvement
+SPLIT_SEED          = 0         # Seed of the held-out split
+
+
+class TrainingReport:
+    def __init__(self, epochs_run, wall_time, n_train, n_validation, train_accuracy,
+                 validation_accuracy, best_validation_loss, stopped_early):
+        self.epochs_run             = epochs_run
+        self.wall_time              = wall_time
+        self.n_train                = n_train
+        self.n_validation           = n_validation
+        self.train_accuracy         = train_accuracy
+        self.validation_accuracy    = validation_accuracy
+        self.best_validation_loss   = best_validation_loss
+        self.stopped_early          = stopped_early
+
+
+    @property
+    def samples_per_second(self):
+        return self.epochs_run * self.n_train / self.wall_time if self.wall_time else 0.0
+
+
+    def as_dict(self):
+        report = dict(vars(self))
+        report["samples_per_second"] = self.samples_per_second
+        return report
+
+
+    def __str__(self):
+        stop = "early stop" if self.stopped_early else "epoch limit"
+        validation = (f", validation accuracy {self.validation_accuracy:.1%} (best loss {self.best_validation_loss:.4f})"
+                      if self.n_validation else "")
+        return (f"Trained {self.epochs_run} epochs ({stop}) in {self.wall_time:.1f}s, "
+                f"{self.samples_per_second:,.0f} samples/s, train accuracy {self.train_accuracy:.1%}{validation}")
+
+
+def split_holdout(output, validation_split=VALIDATION_SPLIT, seed=SPLIT_SEED):
+    """
+    Stratified train/validation split: every tag keeps at least one training pattern.
+    :param output: one-hot tags, one row per pattern
+    :return: (train indices, validation indices)
+    """
+    rng = numpy.random.default_rng(seed)
+    tags = numpy.asarray(output).argmax(axis=1)
+
+    train, validation = [], []
+    for tag in numpy.unique(tags):
+        indices = rng.permutation(numpy.flatnonzero(tags == tag))
+        n_validation = min(int(len(indices) * validation_split), len(indices) - 1)
+        validation.extend(indices[:n_validation])
+        train.extend(indices[n_validation:])
+    return numpy.sort(train), numpy.sort(validation)
+
+
+def accuracy(model, inputs, output):
+    if len(inputs) == 0:
+        return 0.0
+    predicted = numpy.asarray(model.predict(inputs)).argmax(axis=1)
+    return float((predicted == numpy.asarray(output).argmax(axis=1)).mean())
+
+
+def make_early_stopping(model, patience, min_delta):
+    """
+    tflearn callback that stops fit() once the validation loss stops improving and
+    remembers the weights of the best epoch.
+    """
+    import tflearn
+
+    class EarlyStopping(tflearn.callbacks.Callback):
+        def __init__(self):
+            self.best_loss      = float("inf")
+            self.best_weights   = None
+            self.stale_epochs   = 0
+            self.epochs_run     = 0
+            self.stopped_early  = False
+
+
+        def on_epoch_end(self, training_state):
+            self.epochs_run = training_state.epoch
+            loss = training_state.val_loss
+            if loss is None:
+                return
+
+            if loss < self.best_loss - min_delta:
+                self.best_loss = loss
+                self.best_weights = [model.get_weights(v) for layer in model.dense_layers for v in (layer.W, layer.b)]
+                self.stale_epochs = 0
+            else:
+                self.stale_epochs += 1
+                if self.stale_epochs >= patience:
+                    self.stopped_early = True
+                    raise StopIteration     # Ends tflearn's training loop
+
+
+        def restore_best(self):
+            if self.best_weights is None:
+                return
+            variables = [v for layer in model.dense_layers for v in (layer.W, layer.b)]
+            for variable, value in zip(variables, self.best_weights):
+                model.set_weights(variable, value)
+
+    return EarlyStopping()
+
+
+def train_model(model, training, output, max_epochs, batch_size, validation_split=VALIDATION_SPLIT,
+                patience=PATIENCE, min_delta=MIN_DELTA, quiet=False):
+    """
+    Fit a tflearn model built by build_neural_network.
+    :param training: bag-of-words matrix (may be memory-mapped)
+    :param output: one-hot tags
+    :param max_epochs: upper bound on epochs
+    :param batch_size: training batch size
+    :param validation_split: fraction held out per tag for early stopping (0 disables early stopping)
+    :param patience: epochs without improvement before stopping
+    :param quiet: suppress tflearn's per-step console output
+    :return: TrainingReport
+    """
+    train_idx, val_idx = split_holdout(output, validation_split)
+    train_x, train_y = training[train_idx], output[train_idx]
+    val_x, val_y = training[val_idx], output[val_idx]
+
+    early_stopping = make_early_stopping(model, patience, min_delta)
+    validation_set = (val_x, val_y) if len(val_idx) else None
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+        try:
+            model.fit(train_x, train_y, n_epoch=max_epochs, batch_size=batch_size, validation_set=validation_set,
+                      show_metric=not quiet, snapshot_step=None, callbacks=early_stopping)
+        except StopIteration:
+            pass
+    wall_time = time.perf_counter() - start
+
+    early_stopping.restore_best()
+    return TrainingReport(epochs_run=early_stopping.epochs_run or max_epochs,
+                          wall_time=wall_time,
+                          n_train=len(train_idx),
+                          n_validation=len(val_idx),
+                          train_accuracy=accuracy(model, train_x, train_y),
+                          validation_accuracy=accuracy(model, val_x, val_y),
+                          best_validation_loss=early_stopping.best_loss,
+                          stopped_early=early_stopping.stopped_early)
+
+
+def save_report(report, wf):
+    wf.write(json.dumps(report.as_dict(), indent=2).encode())
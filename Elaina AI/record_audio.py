@@ -25,24 +25,73 @@
 # SOFTWARE.
 
 
-import pyaudio
 import math
-import struct
 import wave
-import time
 import os
+import time
+import itertools
 from utils.helper import eprint
+from utils import metrics
+from audio_sources import open_source
+from audio_buffers import RingBuffer, CaptureBuffer
+from vad import VoiceActivityDetector, AdaptiveHangover, NoiseFloorTracker, SAMPLE_WIDTH, block_rms, block_view
+import vad
 
 # =============================
 # ======| Audio Presets |======
 # =============================
 
-SHORT_NORMALIZE = (1.0/32768.0)
+SHORT_NORMALIZE = vad.SHORT_NORMALIZE
 CHUNK = 1024
-FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 16000
 TIMEOUT_LENGTH = 1
+CALIBRATION_LENGTH = 1
+
+TIMEOUT_FRAMES      = math.ceil(TIMEOUT_LENGTH * RATE / CHUNK)      # chunks of silence that end a recording
+CALIBRATION_FRAMES  = math.ceil(CALIBRATION_LENGTH * RATE / CHUNK)  # chunks read to calibrate the noise floor
+
+
+# =============================
+# ===| Endpointing Presets |===
+# =============================
+
+ADAPTIVE_TIMEOUT        = True  # Shorten the silence tail for commands spoken in one go (see vad.AdaptiveHangover)
+MIN_TIMEOUT_LENGTH      = 0.3   # Shortest silence tail (seconds), TIMEOUT_LENGTH is the longest
+MIN_SPEECH_LENGTH       = 0.6   # Speech heard before the tail may shrink (covers a pause after the wake word)
+PAUSE_FACTOR            = 1.5   # Silence tail relative to the longest pause between words so far
+MAX_UTTERANCE_LENGTH    = 10    # Recordings are cut after this many seconds (None for no limit)
+INITIAL_CAPTURE_FRAMES  = 64    # Capture store size in chunks when recordings have no length limit (grows)
+NOISE_MARGIN            = 15    # rms above the noise floor that counts as speech
+NOISE_ADAPT_RATE        = 0.05  # Weight of every silent chunk in the noise floor average
+NOISE_RISE_RATE         = 0.01  # Weight of near-floor chunks louder than the floor inside speech (pauses only)
+NOISE_FALL_RATE         = 0.2   # Weight of quieter-than-floor chunks inside speech
+NOISE_RELEVEL_LENGTH    = 2     # Seconds without a pause before a length-limit cut takes the level for noise
+NOISE_RELEVEL_PERCENTILE = 95   # Percentile of that stretch the noise floor moves to
+
+MIN_TIMEOUT_FRAMES      = math.ceil(MIN_TIMEOUT_LENGTH * RATE / CHUNK)
+MIN_SPEECH_FRAMES       = math.ceil(MIN_SPEECH_LENGTH * RATE / CHUNK)
+MAX_UTTERANCE_FRAMES    = math.ceil(MAX_UTTERANCE_LENGTH * RATE / CHUNK) if MAX_UTTERANCE_LENGTH else None
+NOISE_RELEVEL_FRAMES    = math.ceil(NOISE_RELEVEL_LENGTH * RATE / CHUNK)
+
+
+def make_hangover(adaptive=ADAPTIVE_TIMEOUT):
+    """
+    Hangover policy for a VoiceActivityDetector (None for the fixed TIMEOUT_LENGTH).
+    """
+    if not adaptive:
+        return None
+    return AdaptiveHangover(MIN_TIMEOUT_FRAMES, TIMEOUT_FRAMES, MIN_SPEECH_FRAMES, PAUSE_FACTOR)
+
+
+def make_noise_tracker(adaptive=ADAPTIVE_TIMEOUT):
+    """
+    Noise floor tracker; without adaptive endpointing the floor is frozen during speech.
+    """
+    if not adaptive:
+        return NoiseFloorTracker(NOISE_MARGIN, NOISE_ADAPT_RATE, rise_rate=0.0, fall_rate=0.0)
+    return NoiseFloorTracker(NOISE_MARGIN, NOISE_ADAPT_RATE, NOISE_RISE_RATE, NOISE_FALL_RATE,
+                             NOISE_RELEVEL_FRAMES, NOISE_RELEVEL_PERCENTILE)
 
 
 # =============================
@@ -53,6 +102,9 @@ recording_file_name     = "user_audio.wav"
 recording_dir_name      = "audio_recordings"
 recording_dir_abspath   = os.path.join(os.path.dirname(os.path.abspath(__file__)), recording_dir_name)
 
+ARCHIVE_RECORDINGS      = False     # Also save every utterance to its own .wav (debugging / archival only)
+archive_counter         = itertools.count()
+
 
 # ==============================
 # ======| Recorder Class |======
@@ -65,85 +117,117 @@ class Recorder:
         Function for measuring the rms (loudness) of the frame.
         :param frame: recorded frame
         """
-        swidth = 2
-        count = len(frame) / swidth
-        format = "%dh" % (count)
-        shorts = struct.unpack(format, frame)
-
-        sum_squares = 0.0
-        for sample in shorts:
-            n = sample * SHORT_NORMALIZE
-            sum_squares += n * n
-        rms = math.pow(sum_squares / count, 0.5)
-
-        return rms * 1000
+        return vad.rms(frame)
 
 
-    def __init__(self):
+    def __init__(self, source=None):
         """
         Recorder initialization function.
+        :param source: audio input; None for the microphone, a .wav path, raw PCM bytes,
+                       or any object with read(num_frames)/close() (see audio_sources.py)
         """
-        self.rms_threshold      = 10    # The threshold for rms (to start recording)
-        self.audio_buffer       = []    # Head audio buffer frames list
         self.audio_buffer_len   = 10    # Head buffer frames count (increase to add a longer buffer)
-        
-        self.p = pyaudio.PyAudio()
-        self.stream = self.p.open(format=FORMAT,
-                                  channels=CHANNELS,
-                                  rate=RATE,
-                                  input=True,
-                                  output=True,
-                                  frames_per_buffer=CHUNK)
+        self.chunk_bytes        = CHUNK * CHANNELS * SAMPLE_WIDTH
+        self.audio_buffer       = RingBuffer(self.audio_buffer_len * self.chunk_bytes)  # Head audio buffer
+
+        # The rms threshold (to start recording) lives in the VAD, see rms_threshold below
+        self.vad = VoiceActivityDetector(rms_threshold=10, hangover_frames=TIMEOUT_FRAMES, chunk=CHUNK,
+                                         adaptive_hangover=make_hangover())
+        self.noise = make_noise_tracker()   # Set up by calibrate_background_noise
+
+        self.stream = open_source(source, RATE, CHANNELS, CHUNK)
+
+
+    @property
+    def rms_threshold(self):
+        return self.vad.rms_threshold
+
+
+    @rms_threshold.setter
+    def rms_threshold(self, value):
+        self.vad.rms_threshold = value
         
 
     def record(self):
         """
-        Record audio by a given number of frames.
+        Record audio until the VAD hangover (at most TIMEOUT_LENGTH seconds of silence)
+        has passed, or for at most MAX_UTTERANCE_LENGTH seconds.
+        :return: the recorded PCM frames (pre-roll included), a memoryview of the capture store
         """
         print('[Elaina] Sound detected, recording beginning')
-        rec = []
-        current = time.time()
-        end = time.time() + TIMEOUT_LENGTH
+        frames = MAX_UTTERANCE_FRAMES if MAX_UTTERANCE_FRAMES is not None else INITIAL_CAPTURE_FRAMES
+        rec = CaptureBuffer(self.audio_buffer.capacity + frames * self.chunk_bytes,
+                            growable=MAX_UTTERANCE_FRAMES is None)
+        for view in self.audio_buffer.views():
+            rec.write(view)
+        self.audio_buffer.clear()
 
-        while current <= end:
-            data = self.stream.read(CHUNK)
-            if self.rms(data) >= self.rms_threshold: 
-                end = time.time() + TIMEOUT_LENGTH
+        n_frames = 0
+        trace_id = metrics.new_trace_id()
+        started_at = last_voice_at = time.perf_counter()
 
-            current = time.time()
-            rec.append(data)
-        self.write(b''.join(self.audio_buffer + rec))
+        while self.vad.is_active():
+            if MAX_UTTERANCE_FRAMES is not None and n_frames >= MAX_UTTERANCE_FRAMES:
+                metrics.count("forced_endpoints")
+                if self.noise.relevel():
+                    self.rms_threshold = self.noise.threshold
+                break
+            try:
+                data = self.stream.read(CHUNK)
+            except EOFError:
+                break
+            energy, _, voiced = self.vad.analyze(data)
+            self.vad.apply_hangover(voiced)
+            self.track_noise(energy, in_speech=True)
+            rec.write(data)
+            n_frames += 1
+            if trace_id is not None and voiced[-1:].any():
+                last_voice_at = time.perf_counter()
+
+        if trace_id is not None:
+            # The endpoint tail is the silence waited for (VAD hangover) before the recording ends
+            now = time.perf_counter()
+            metrics.observe("capture.utterance", now - started_at, trace_id)
+            metrics.observe("capture.endpoint_tail", now - last_voice_at, trace_id)
+            metrics.count("utterances")
+
+        recording = rec.view()
+        if ARCHIVE_RECORDINGS:
+            archive_recording(recording)
+        return metrics.tag(recording, trace_id)
 
 
     def buffer_audio_frames(self, audio_input):
         """
-        Creates buffer
+        Keeps the last audio_buffer_len chunks (pre-roll), overwriting the oldest one.
         """
-        if self.audio_buffer_len == 0:
-            return
-        
-        if len(self.audio_buffer) == self.audio_buffer_len:
-            self.audio_buffer.pop(0)
-            
-        self.audio_buffer.append(audio_input)
+        self.audio_buffer.write(audio_input)
 
 
     def listen(self, once=False):
         """
         Listens on audio for recording (if rms > threshold).
         :param once: only listen to and record one audio input (don't loop)
+        :return: the recorded PCM frames with once=True, None when the source runs out
         """
         eprint("Listening", user=True)
+        self.vad.reset()
         while True:
-            input = self.stream.read(CHUNK)
+            try:
+                input = self.stream.read(CHUNK)
+            except EOFError:
+                return None
             self.buffer_audio_frames(input)
-            rms_val = self.rms(input)
-            if rms_val > self.rms_threshold:
-                self.record()
+            energy, _, voiced = self.vad.analyze(input)
+            if not self.vad.apply_hangover(voiced)[-1:].any():
+                self.track_noise(energy, in_speech=False)
+            else:
+                recording = self.record()
+                self.vad.reset()
                 
                 # Only listen for 1 audio input, then breaks
                 if once == True:
-                    return True
+                    return recording
 
     
     def calibrate_background_noise(self):
@@ -151,16 +235,30 @@ class Recorder:
         Function for calibrating the background noise to set the rms threshold.
         """
         eprint("Calibrating background noises...", user=True)
-        s = time.time()
-        rmss = []
-        while True:
-            if time.time() - s > 1:
-                break
-            input = self.stream.read(CHUNK)
-            rmss.append(self.rms(input))
-            self.rms_threshold = sum(rmss) / len(rmss)
-            
-        self.rms_threshold += 15
+        try:
+            with metrics.span("capture.calibration"):
+                data = self.stream.read(CHUNK * CALIBRATION_FRAMES)
+        except EOFError:
+            return
+        rmss = block_rms(block_view(data, CHUNK))
+        if len(rmss) == 0:
+            return
+
+        self.noise.calibrate(rmss)
+        self.rms_threshold = self.noise.threshold
+
+
+    def track_noise(self, energy, in_speech):
+        """
+        Keep following the background noise after calibration.
+        """
+        if self.noise.floor is None or len(energy) == 0:
+            return
+        if in_speech:
+            self.noise.update_speech(energy)
+        else:
+            self.noise.update_silence(energy)
+        self.rms_threshold = self.noise.threshold
         
 
     def write(self, recording):
@@ -168,23 +266,51 @@ class Recorder:
         Helper function for writing the audio file recorded (.wav)
         :param recording: list of audio frames
         """
+        write_wav(recording)
+
+
+    def close(self):
+        """
+        Release the audio source.
+        """
+        self.stream.close()
+
+
+def write_wav(recording, filename=None):
+    """
+    Write raw PCM frames recorded with the audio presets above to a .wav file.
+    :param recording: raw audio frames
+    :param filename: output path (defaults to audio_recordings/user_audio.wav)
+    """
+    if filename is None:
         filename = os.path.join(recording_dir_abspath, recording_file_name)
 
-        wf = wave.open(filename, 'wb')
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(self.p.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(recording)
-        wf.close()
-        
-        eprint(f'Written to file: {filename}', dev=True)
+    wf = wave.open(filename, 'wb')
+    wf.setnchannels(CHANNELS)
+    wf.setsampwidth(SAMPLE_WIDTH)
+    wf.setframerate(RATE)
+    wf.writeframes(recording)
+    wf.close()
+
+    eprint(f'Written to file: {filename}', dev=True)
+
+
+def archive_recording(recording):
+    """
+    Debug/archival sink: save an utterance under a unique name so overlapping
+    utterances never overwrite each other. Not needed for recognition.
+    :param recording: raw audio frames
+    """
+    filename = f"user_audio_{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{next(archive_counter)}.wav"
+    write_wav(recording, os.path.join(recording_dir_abspath, filename))
 
 
-def run_recorder():
-    a = Recorder()
+def run_recorder(source=None):
+    a = Recorder(source)
     a.calibrate_background_noise()
     print(a.rms_threshold)
     ret = a.listen(once=True)
+    a.close()
     
     return ret
     
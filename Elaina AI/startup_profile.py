@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Reports how long each import and initialization phase of Elaina's startup takes.
+# Usage (from this directory):
+#   python startup_profile.py                      # imports + model, no audio device
+#   python startup_profile.py --source some.wav    # also time capture calibration on a file
+#   python startup_profile.py --json
+
+import sys
+import time
+import json
+import argparse
+import importlib
+
+
+# Imported in dependency order: each entry is charged only for what was not loaded yet
+PROFILED_IMPORTS = [
+    "numpy",
+    "speech_recognition",
+    "utils.helper",
+    "vad",
+    "audio_sources",
+    "capture_service",
+    "stt_backends",
+    "neural_network.featurizer",
+    "neural_network.train_neural_net",
+    "nltk",
+    "tensorflow",
+    "tflearn",
+]
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.phases = []    # [(name, seconds, error)]
+
+
+    def run(self, name, function, *args, **kwargs):
+        """
+        Time one phase. Failures are recorded instead of aborting the profile.
+        """
+        start = time.perf_counter()
+        result, error = None, None
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.phases.append((name, time.perf_counter() - start, error))
+        return result
+
+
+    def report(self):
+        width = max(len(name) for name, _, _ in self.phases)
+        total = sum(seconds for _, seconds, _ in self.phases)
+        for name, seconds, error in self.phases:
+            line = f"{name:<{width}}  {seconds * 1000:10.1f} ms"
+            if error:
+                line += f"  FAILED ({error})"
+            print(line)
+        print(f"{'total':<{width}}  {total * 1000:10.1f} ms")
+
+
+    def as_dict(self):
+        return [{"phase": name, "seconds": seconds, "error": error} for name, seconds, error in self.phases]
+
+
+def profile_startup(source=None, skip_model=False):
+    timer = PhaseTimer()
+
+    for module in PROFILED_IMPORTS:
+        timer.run(f"import {module}", importlib.import_module, module)
+
+    if not skip_model:
+        from neural_network.featurizer import BagOfWordsFeaturizer
+        from neural_network.train_neural_net import load_intents, load_inference_model
+
+        timer.run("load intents.json", load_intents)
+        loaded = timer.run("load inference model", load_inference_model)
+        if loaded is not None:
+            featurizer = BagOfWordsFeaturizer(loaded[1])
+            timer.run("tokenizer warm-up", featurizer.transform, "warm up")
+
+    if source is not None:
+        from capture_service import CaptureService
+
+        def calibrate():
+            capture = CaptureService(source).start()
+            capture.ready.wait()
+            capture.stop()
+
+        timer.run("capture calibration", calibrate)
+
+    return timer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time Elaina's startup phases.")
+    parser.add_argument("--source", help="WAV file to calibrate capture on (the device is not opened otherwise)")
+    parser.add_argument("--skip-model", action="store_true", help="only profile imports")
+    parser.add_argument("--json", action="store_true", help="print the phases as JSON")
+    args = parser.parse_args()
+
+    timer = profile_startup(args.source, args.skip_model)
+    if args.json:
+        json.dump(timer.as_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        timer.report()
@@ -1,5 +1,82 @@
 import re
+from collections import namedtuple
+from constants import CONST_INTENT_ALARM, CONST_INTENT_OPENAPP, AI_NAME_ALT
+
+# Rule-based fast path ahead of the neural network. All rule patterns are compiled
+# into one combined regex at import; the first rule that matches decides the intent
+# and its slots (app name, alarm time) without calling the model. A rule has to be
+# the whole command: it starts right after the (optional) wake word and ends on a
+# word boundary, so "restart computer" or "reopen tabs" are left to the model.
+
+# Slot placeholders inside the constants.py patterns: (placeholder, slot name, regex)
+SLOT_PLACEHOLDERS = [
+    ("X",           "time", r"\d{1,2}(?:[: ]\d{2})?(?: ?[ap]\.? ?m\.?)?"),
+    ("[a-zA-Z ]+",  "app",  r"[a-zA-Z ]+"),
+    ("[a-zA-Z]+",   "app",  r"[a-zA-Z]+")
+]
+
+# (tag, patterns), tags match intents.json
+STATIC_RULES = [
+    ("alarm",   CONST_INTENT_ALARM),
+    ("open",    CONST_INTENT_OPENAPP)
+]
+
+StaticIntent = namedtuple("StaticIntent", ["tag", "slots"])
+
+
+def compile_rule(pattern, group):
+    """
+    Turn the first slot placeholder of a rule pattern into a named group.
+    :return: (regex source, slot name or None)
+    """
+    for placeholder, slot, slot_regex in SLOT_PLACEHOLDERS:
+        if placeholder in pattern:
+            return pattern.replace(placeholder, f"(?P<{group}_{slot}>{slot_regex})", 1), slot
+    return pattern, None
+
+
+def clean_slot(slot, value):
+    value = " ".join(value.split())
+    if slot == "app" and value.lower().startswith("the "):
+        value = value[4:]
+    return value
+
+
+class StaticComprehender:
+    def __init__(self, rules=STATIC_RULES, wake_words=AI_NAME_ALT):
+        """
+        :param rules: list of (tag, [regex patterns]) pairs, tried in order
+        :param wake_words: wake word variants allowed in front of the command
+        """
+        self.rules = {}     # group name -> (tag, slot name)
+        alternatives = []
+        for tag, patterns in rules:
+            for pattern in patterns:
+                group = f"r{len(self.rules)}"
+                source, slot = compile_rule(pattern, group)
+                self.rules[group] = (tag, slot)
+                alternatives.append(f"(?P<{group}>{source})")
+
+        wake = "|".join(re.escape(word) for word in sorted(wake_words, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?:(?:{wake})\b[\s,]*)?(?:{'|'.join(alternatives)})\b", re.IGNORECASE)
+
+
+    def comprehend(self, input_text):
+        """
+        :return: StaticIntent(tag, slots), or None when no rule matches
+        """
+        match = self.pattern.match(input_text.strip().rstrip(".!?"))
+        if match is None:
+            return None
+
+        tag, slot = self.rules[match.lastgroup]     # The rule group closes last
+        slots = {}
+        if slot is not None:
+            slots[slot] = clean_slot(slot, match.group(f"{match.lastgroup}_{slot}"))
+        return StaticIntent(tag, slots)
+
+
+static_comprehender = StaticComprehender()
 
 def static_comprehend_text(input_text):
-    pass
-    
\ No newline at end of file
+    return static_comprehender.comprehend(input_text)
@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Streaming recognition: the capture service (stream_segments=True) cuts every
+# utterance into segments at short pauses while the user is still speaking. Each
+# segment goes to the recognizer as soon as it is captured, the transcript grows
+# segment by segment, and the static rules run on every stable partial (all
+# leading segments recognized, wake word followed by a command). A rule match
+# with all its slots filled decides the turn early: it no longer waits for the
+# end-of-speech timeout, the last ASR call and classification back to back.
+# Anything else ("elaina open" before "chrome" is recognized) waits for the whole
+# transcript, since a later segment may still change the intent or fill a slot.
+
+import time
+from collections import namedtuple
+from utils.helper import eprint
+
+
+# partial: transcript of the recognized leading segments, final: True once the whole utterance is in
+Partial = namedtuple("Partial", ["utterance_id", "text", "final"])
+
+# early: True if the intent was decided before the utterance was fully recognized,
+# latency: seconds from the end of the first segment to the decision
+TurnIntent = namedtuple("TurnIntent", ["utterance_id", "text", "intent", "early", "latency"])
+
+
+class StreamingTurn:
+    def __init__(self, utterance_id):
+        """
+        Recognition state of one utterance.
+        """
+        self.utterance_id   = utterance_id
+        self.requests       = {}        # segment index -> RecognitionRequest
+        self.texts          = []        # transcripts of the leading recognized segments
+        self.next_index     = 0         # first segment still waiting for its transcript
+        self.segment_count  = None      # known once the final segment arrived
+        self.received       = 0         # highest segment index seen + 1
+        self.intent         = None
+        self.rejected       = False     # dropped by the wake word screen on its first segment
+        self.started_at     = time.monotonic()
+
+
+    @property
+    def partial(self):
+        return " ".join(text for text in self.texts if text)
+
+
+    @property
+    def complete(self):
+        return self.segment_count is not None and self.next_index >= self.segment_count
+
+
+class StreamingSession:
+    def __init__(self, recognizer, router, spotter, on_partial=None, on_intent=None):
+        """
+        :param recognizer: AsyncRecognizer the segments are submitted to
+        :param router: IntentRouter, its static rules run on stable partials, the whole router on
+                       final transcripts
+        :param spotter: WakeWordSpotter screening the first segment of every utterance (its matcher
+                        decides whether a partial is addressed to Elaina)
+        :param on_partial: callback(Partial) for every new partial transcript
+        :param on_intent: callback(TurnIntent) once per utterance that reaches comprehension
+        """
+        self.recognizer = recognizer
+        self.router     = router
+        self.spotter    = spotter
+        self.on_partial = on_partial
+        self.on_intent  = on_intent
+        self.turns      = {}    # utterance id -> StreamingTurn, in capture order
+
+        self.early_intents = 0
+        self.final_intents = 0
+
+
+    def feed(self, segment, rms_threshold=None):
+        """
+        Start recognizing a captured Segment right away.
+        :param rms_threshold: current speech threshold of the capture; the first segment of an
+                              utterance (where the wake word is) is screened with it (None skips the screen)
+        """
+        turn = self.turns.get(segment.utterance_id)
+        if turn is None:
+            self.close()    # Earlier utterances are over, even if their final segment was dropped
+            turn = self.turns[segment.utterance_id] = StreamingTurn(segment.utterance_id)
+            turn.rejected = rms_threshold is not None and not self.spotter.screen(segment.frames, rms_threshold)
+
+        if turn.rejected:
+            if segment.final:
+                del self.turns[segment.utterance_id]
+            return
+
+        # Segments dropped by a full capture queue (see CaptureService.publish) count as not understood
+        for index in range(turn.received, segment.index):
+            turn.requests[index] = None
+        turn.received = max(turn.received, segment.index + 1)
+
+        if segment.frames:
+            turn.requests[segment.index] = self.recognizer.submit(segment.frames)
+        if segment.final:
+            turn.segment_count = segment.index + (1 if segment.frames else 0)
+
+
+    def poll(self):
+        """
+        Collect finished (or overdue) segment recognitions in order and act on new partials.
+        """
+        for utterance_id in list(self.turns):
+            turn = self.turns[utterance_id]
+            previous = turn.partial
+            updated = False
+            while turn.next_index in turn.requests:
+                request = turn.requests[turn.next_index]
+                if request is None:
+                    eprint("Segment dropped, skipping...", dev=True)
+                    text = None
+                elif request.done() or request.expired():
+                    if request.expired():
+                        eprint("Segment recognition timed out, skipping...", dev=True)
+                    text = request.result()
+                else:
+                    break
+                turn.texts.append(text)
+                del turn.requests[turn.next_index]
+                turn.next_index += 1
+                updated = True
+
+            if self.on_partial is not None and (turn.partial != previous or turn.complete):
+                self.on_partial(Partial(utterance_id, turn.partial, turn.complete))
+
+            if updated and turn.intent is None and not turn.complete:
+                self.try_early(turn)
+
+            if turn.complete:
+                self.finish(turn)
+                del self.turns[utterance_id]
+
+
+    def try_early(self, turn):
+        """
+        Run the static rules on a stable partial; commit to a match whose slots are all filled.
+        A model decision is never taken on a partial: the rest of the utterance could change it.
+        """
+        partial = turn.partial
+        if not self.spotter.matcher.contains(partial) or not self.spotter.matcher.strip(partial):
+            return  # Not addressed to Elaina (yet), or nothing but the wake word so far
+
+        intent = self.router.comprehend_static(partial)
+        if intent is not None and all(intent.slots.values()):
+            turn.intent = intent
+            self.early_intents += 1
+            self.emit(turn, partial, intent, early=True)
+
+
+    def finish(self, turn):
+        transcript = turn.partial if any(text is not None for text in turn.texts) else None
+        if not self.spotter.confirm(transcript):
+            if transcript is not None:
+                eprint("Text does not contain Elaina, skipping...", dev=True)
+            return
+
+        if turn.intent is None:
+            turn.intent = self.router.comprehend(transcript)
+            self.final_intents += 1
+            self.emit(turn, transcript, turn.intent, early=False)
+
+
+    def emit(self, turn, text, intent, early):
+        if self.on_intent is not None:
+            self.on_intent(TurnIntent(turn.utterance_id, text, intent, early, time.monotonic() - turn.started_at))
+
+
+    def close(self):
+        """
+        No more segments will arrive for the turns in progress: end them with what they received.
+        """
+        for utterance_id in list(self.turns):
+            turn = self.turns[utterance_id]
+            if turn.rejected:
+                del self.turns[utterance_id]
+            elif turn.segment_count is None:
+                turn.segment_count = turn.received
+
+
+    @property
+    def idle(self):
+        return not self.turns
+
+
+    def as_dict(self):
+        return {"early_intents": self.early_intents, "final_intents": self.final_intents}
+
+
+def run_streaming(capture, session, poll_interval=0.05):
+    """
+    Feed the segments of a running CaptureService(stream_segments=True) into a session
+    until the audio source is exhausted and every turn is handled.
+    """
+    while True:
+        segment = capture.get_segment(timeout=poll_interval)
+        if segment is not None:
+            session.feed(segment, capture.rms_threshold)
+        elif capture.finished.is_set() and capture.segments.empty():
+            session.close()     # The last final segment may have been dropped
+            if session.idle:
+                break
+        session.poll()
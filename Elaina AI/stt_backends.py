@@ -0,0 +1,313 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import os
+import time
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import speech_recognition as sr
+from utils.helper import uprint
+from utils import metrics
+from vad import SAMPLE_WIDTH
+from record_audio import RATE
+
+
+# ==============================
+# ======| Backend Presets |=====
+# ==============================
+
+STT_BACKEND             = os.environ.get("ELAINA_STT_BACKEND", "google")    # "google" or "standin"
+RECOGNITION_DEADLINE    = 8     # Seconds before a pending recognition is given up on
+OPERATION_TIMEOUT       = 5     # Seconds a single backend request may take (network timeout)
+REQUEST_RETRIES         = 1     # Extra attempts after a failed request (network errors only)
+RETRY_DELAY             = 0.2   # Seconds between attempts
+MAX_WORKERS             = 4     # Concurrent recognitions
+KEYWORD_SENSITIVITY     = 0.8   # pocketsphinx keyword spotting sensitivity (0 to 1)
+
+
+def frames_to_audio_data(frames, rate=RATE, sample_width=SAMPLE_WIDTH):
+    """
+    Wrap captured PCM frames for recognition without copying them.
+    :param frames: raw mono PCM audio (bytes, bytearray or memoryview)
+    :param rate: sample rate (Hz)
+    :param sample_width: bytes per sample
+    """
+    return sr.AudioData(memoryview(frames), rate, sample_width)
+
+
+def as_audio_data(audio):
+    if isinstance(audio, sr.AudioData):
+        return audio
+    return frames_to_audio_data(audio)
+
+
+# ==============================
+# ======| Backends |============
+# ==============================
+
+class RecognitionError(Exception):
+    """
+    The recognition service could not be reached (network, quota, timeout): unlike
+    unintelligible audio, trying again later may succeed.
+    """
+
+
+class SpeechBackend:
+    """
+    Speech-to-text backend interface. recognize() and transcribe() are blocking and
+    thread-safe. recognize() returns the transcript, or None when the audio could not
+    be understood or the service could not be reached; transcribe() raises
+    RecognitionError in the latter case, for callers that retry (see bulk_transcribe.py).
+    """
+    name = "base"
+
+    def transcribe(self, audio):
+        """
+        :param audio: sr.AudioData, or raw PCM frames captured with the default presets
+        :return: transcript, or None when the audio could not be understood
+        :raises RecognitionError: when the service could not be reached
+        """
+        raise NotImplementedError
+
+
+    def recognize(self, audio):
+        """
+        Same as transcribe(), with service failures reported as None.
+        """
+        try:
+            return self.transcribe(audio)
+        except RecognitionError as e:
+            uprint(f"Recognition failed: {e}", dev=True)
+            return None
+
+
+class GoogleBackend(SpeechBackend):
+    name = "google"
+
+    def __init__(self, language="en-US", key=None, operation_timeout=OPERATION_TIMEOUT,
+                 retries=REQUEST_RETRIES, retry_delay=RETRY_DELAY):
+        """
+        Google Web Speech API through speech_recognition. One recognizer is reused for every request.
+        :param language: recognition language
+        :param key: API key (None for the default key)
+        :param operation_timeout: seconds a single request may take
+        :param retries: extra attempts after a network error
+        :param retry_delay: seconds between attempts
+        """
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = operation_timeout
+        self.language       = language
+        self.key            = key
+        self.retries        = retries
+        self.retry_delay    = retry_delay
+
+
+    def transcribe(self, audio):
+        audio = as_audio_data(audio)
+        for attempt in range(self.retries + 1):
+            try:
+                return self.recognizer.recognize_google(audio, key=self.key, language=self.language)
+            except sr.UnknownValueError:        # Speech was unintelligible, retrying won't help
+                return None
+            except sr.RequestError as e:        # Network / quota error (includes timeouts)
+                uprint(f"Recognition request failed ({attempt + 1}/{self.retries + 1}): {e}", dev=True)
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay)
+                else:
+                    raise RecognitionError(str(e)) from e
+
+
+class StandInBackend(SpeechBackend):
+    name = "standin"
+
+    def __init__(self, transcripts=None, default_text="elaina what time is it", latency=0.0):
+        """
+        Deterministic offline backend for local and load testing. Audio registered with
+        add_transcript() returns its transcript; any other audio returns default_text.
+        :param transcripts: dict of {raw PCM bytes: transcript}
+        :param default_text: transcript for unregistered audio (None to simulate unintelligible audio)
+        :param latency: simulated seconds per request
+        """
+        self.transcripts    = {}
+        self.default_text   = default_text
+        self.latency        = latency
+        for frames, text in (transcripts or {}).items():
+            self.add_transcript(frames, text)
+
+
+    @staticmethod
+    def fingerprint(frames):
+        return hashlib.sha1(frames).hexdigest()
+
+
+    def add_transcript(self, frames, text):
+        self.transcripts[self.fingerprint(frames)] = text
+
+
+    def transcribe(self, audio):
+        if self.latency:
+            time.sleep(self.latency)
+        frames = audio.frame_data if isinstance(audio, sr.AudioData) else audio
+        return self.transcripts.get(self.fingerprint(frames), self.default_text)
+
+
+class SphinxKeywordBackend(SpeechBackend):
+    name = "sphinx-keywords"
+
+    def __init__(self, keywords, sensitivity=KEYWORD_SENSITIVITY):
+        """
+        Offline keyword spotting with pocketsphinx (optional dependency). Cheap enough to run
+        before the full recognizer; returns the keywords heard ("" when none).
+        :param keywords: words to listen for (e.g. AI_NAME_ALT)
+        :param sensitivity: detection sensitivity, 0 to 1
+        """
+        self.recognizer         = sr.Recognizer()
+        self.keyword_entries    = [(keyword, sensitivity) for keyword in keywords]
+
+
+    def transcribe(self, audio):
+        try:
+            return self.recognizer.recognize_sphinx(as_audio_data(audio), keyword_entries=self.keyword_entries)
+        except sr.UnknownValueError:    # No keyword heard
+            return ""
+        except sr.RequestError as e:    # pocketsphinx missing or misconfigured: no opinion (None from recognize)
+            raise RecognitionError(f"Keyword spotting unavailable: {e}") from e
+
+
+BACKENDS = {
+    GoogleBackend.name          : GoogleBackend,
+    StandInBackend.name         : StandInBackend,
+    SphinxKeywordBackend.name   : SphinxKeywordBackend
+}
+
+def get_backend(name=None, **kwargs):
+    """
+    Create a speech backend by name (defaults to STT_BACKEND).
+    """
+    return BACKENDS[name or STT_BACKEND](**kwargs)
+
+
+# ==============================
+# ======| Async Execution |=====
+# ==============================
+
+class RecognitionRequest:
+    def __init__(self, future, deadline, trace_id=None):
+        """
+        A recognition running on the worker pool.
+        :param future: concurrent.futures.Future resolving to the transcript (or None)
+        :param deadline: seconds after submission before the request is given up on
+        :param trace_id: trace of the utterance (see utils/metrics.py)
+        """
+        self.future         = future
+        self.submitted_at   = time.monotonic()
+        self.deadline_at    = self.submitted_at + deadline
+        self.trace_id       = trace_id
+
+
+    def done(self):
+        return self.future.done()
+
+
+    def expired(self):
+        return not self.future.done() and time.monotonic() > self.deadline_at
+
+
+    def result(self):
+        """
+        Transcript of a finished request (None if it expired, failed or was not understood).
+        """
+        if not self.future.done():
+            self.future.cancel()
+            metrics.count("asr_timeouts")
+            return None
+        try:
+            return self.future.result()
+        except Exception as e:
+            uprint(f"Recognition failed: {e!r}", dev=True)
+            return None
+
+
+class AsyncRecognizer:
+    def __init__(self, backend=None, max_workers=MAX_WORKERS, deadline=RECOGNITION_DEADLINE):
+        """
+        Runs a backend on a thread pool so slow recognition never blocks the caller.
+        :param backend: SpeechBackend (defaults to get_backend())
+        :param max_workers: concurrent recognitions
+        :param deadline: default seconds before a recognition is given up on
+        """
+        self.backend    = backend if backend is not None else get_backend()
+        self.deadline   = deadline
+        self.executor   = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="elaina-stt")
+
+
+    def submit(self, audio, deadline=None):
+        """
+        Start recognizing audio in the background.
+        :return: RecognitionRequest
+        """
+        future = self.executor.submit(self.run_backend, audio)
+        return RecognitionRequest(future, self.deadline if deadline is None else deadline, metrics.trace_of(audio))
+
+
+    async def recognize(self, audio, deadline=None):
+        """
+        Recognize audio from asyncio code.
+        :return: transcript, or None on failure or when the deadline passes
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self.executor, self.run_backend, audio),
+                                          self.deadline if deadline is None else deadline)
+        except asyncio.TimeoutError:
+            uprint("Recognition deadline exceeded", dev=True)
+            metrics.count("asr_timeouts")
+            return None
+        except Exception as e:  # Counted in asr_failures by run_backend
+            uprint(f"Recognition failed: {e!r}", dev=True)
+            return None
+
+
+    def run_backend(self, audio):
+        """
+        One backend call (on a worker thread), traced as the asr.recognize stage.
+        """
+        try:
+            with metrics.span("asr.recognize", metrics.trace_of(audio)):
+                text = self.backend.recognize(audio)
+        except Exception:
+            metrics.count("asr_failures")
+            raise
+        if text is None:
+            metrics.count("asr_failures")
+        return text
+
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
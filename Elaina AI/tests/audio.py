@@ -0,0 +1,10 @@
+from audio_sources import SyntheticSource
+
+
+def synthetic_pcm(pattern, rate=16000, seed=0):
+    """
+    Raw 16-bit mono PCM of a SyntheticSource pattern, e.g. [(1, 30), (0.5, 4000), (1, 30)]
+    (low amplitudes stand in for background noise, high ones for speech).
+    """
+    n_samples = sum(int(seconds * rate) for seconds, _ in pattern)
+    return SyntheticSource(pattern, rate=rate, seed=seed).read(n_samples)
@@ -0,0 +1,30 @@
+import wave
+import pytest
+from audio_sources import WavSource, open_source
+from capture_service import CaptureService
+from audio import synthetic_pcm
+
+
+def wav(path, rate=16000, channels=1):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(synthetic_pcm([(0.5, 30)], rate=rate) * channels)
+    return str(path)
+
+
+def test_reads_a_matching_file(tmp_path):
+    source = open_source(wav(tmp_path / "ok.wav"), 16000, 1, 1024)
+    assert len(source.read(1024)) == 2048
+    source.close()
+
+
+@pytest.mark.parametrize("rate, channels", [(44100, 1), (16000, 2)])
+def test_rejects_other_formats(tmp_path, rate, channels):
+    path = wav(tmp_path / "other.wav", rate, channels)
+    with pytest.raises(ValueError, match="expected 16000 Hz, 1 channel"):
+        open_source(path, 16000, 1, 1024)
+    with pytest.raises(ValueError):
+        CaptureService(path)
+    WavSource(path).close()     # No expectations: any format
@@ -0,0 +1,60 @@
+import json
+import bulk_transcribe
+from bulk_transcribe import bulk_transcribe as run_bulk, load_checkpoint, transcribe_file
+from record_audio import write_wav
+from stt_backends import RecognitionError, SpeechBackend, StandInBackend
+from audio import synthetic_pcm
+
+
+class OfflineBackend(SpeechBackend):
+    def transcribe(self, audio):
+        raise RecognitionError("network unreachable")
+
+
+def make_archive(directory, n_files):
+    for i in range(n_files):
+        write_wav(synthetic_pcm([(0.5, 4000)], seed=i), str(directory / f"utterance_{i}.wav"))
+
+
+def read_records(path):
+    with open(path) as rf:
+        return [json.loads(line) for line in rf]
+
+
+def test_request_errors_are_reported(tmp_path, monkeypatch):
+    make_archive(tmp_path, 1)
+    path = str(tmp_path / "utterance_0.wav")
+
+    monkeypatch.setattr(bulk_transcribe, "worker_backend", OfflineBackend())
+    _, text, duration, error = transcribe_file(path)
+    assert text is None and duration is None
+    assert "network unreachable" in error
+
+    monkeypatch.setattr(bulk_transcribe, "worker_backend", StandInBackend(default_text=None))
+    assert transcribe_file(path) == (path, None, 0.5, None)    # Not understood: done, not retried
+
+
+def test_checkpoint_skips_done_files_and_retries_errors(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"file": "a.wav", "text": "hi"}) + "\n"
+                      + json.dumps({"file": "b.wav", "text": None, "error": "RecognitionError: offline"}) + "\n"
+                      + '{"file": "c.wav", "te')    # Cut short by an interruption
+    assert load_checkpoint(str(output)) == {"a.wav"}
+    assert output.read_text().endswith("\n")
+
+
+def test_resume(tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    make_archive(archive, 3)
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"file": "utterance_0.wav", "text": "done already", "duration": 0.5}) + "\n"
+                      + json.dumps({"file": "utterance_1.wav", "text": None, "error": "RecognitionError"}) + "\n")
+
+    writer = run_bulk(str(archive), str(output), workers=1, backend="standin", classify=False)
+    assert (writer.written, writer.failed) == (2, 0)
+
+    records = read_records(output)
+    retried = [r["file"] for r in records[2:]]
+    assert sorted(retried) == ["utterance_1.wav", "utterance_2.wav"]
+    assert load_checkpoint(str(output)) == {"utterance_0.wav", "utterance_1.wav", "utterance_2.wav"}
@@ -0,0 +1,37 @@
+import queue
+from capture_service import CaptureService
+from audio import synthetic_pcm
+
+
+class LateQueue(queue.Queue):
+    """
+    The producer publishes its last item and finishes while the consumer's wait runs out.
+    """
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    def get(self, block=True, timeout=None):
+        if block and not self.service.finished.is_set():
+            self.put(b"last utterance")
+            self.service.finished.set()
+            raise queue.Empty
+        return super().get(block, timeout)
+
+
+def test_last_utterance_is_not_lost_when_the_source_ends():
+    for timeout in (None, 0.01):
+        service = CaptureService(synthetic_pcm([(0.1, 30)]))
+        service.utterances = LateQueue(service)
+        assert service.get_utterance(timeout) == b"last utterance"
+        assert service.get_utterance(timeout) is None
+
+
+def test_captures_every_utterance():
+    pattern = [(1.5, 30)] + [(0.6, 4000), (1.5, 30)] * 3
+    service = CaptureService(synthetic_pcm(pattern)).start()
+    utterances = []
+    while (utterance := service.get_utterance()) is not None:
+        utterances.append(utterance)
+    service.stop()
+    assert len(utterances) == 3
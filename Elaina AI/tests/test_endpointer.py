@@ -0,0 +1,52 @@
+from endpointer import Endpointer
+from audio import synthetic_pcm
+
+SECONDS_PER_CHUNK = 1024 / 16000
+
+
+def utterances(pattern, **options):
+    endpointer = Endpointer(**options)
+    frames = synthetic_pcm(pattern)
+    found = []
+    for offset in range(0, len(frames) - endpointer.chunk_bytes + 1, endpointer.chunk_bytes):
+        if endpointer.feed(frames[offset:offset + endpointer.chunk_bytes]):
+            found.append((endpointer.onset_chunk * SECONDS_PER_CHUNK, endpointer.chunks_fed * SECONDS_PER_CHUNK))
+    if endpointer.flush():
+        found.append((endpointer.onset_chunk * SECONDS_PER_CHUNK, endpointer.chunks_fed * SECONDS_PER_CHUNK))
+    return found, endpointer
+
+
+def test_short_command():
+    found, _ = utterances([(1.5, 10), (0.4, 3000), (0.2, 10), (0.3, 3000), (2, 10)])
+    assert len(found) == 1
+    start, end = found[0]
+    assert 1.4 < start < 1.6 and 2.4 < end < 3.6
+
+
+def test_continuous_speech_is_one_utterance():
+    found, endpointer = utterances([(1.5, 10), (14, 3000), (2, 10)], max_utterance_frames=None)
+    assert len(found) == 1 and found[0][1] > 15.5
+    assert endpointer.noise_floor < 1.0
+
+
+def test_quieter_trailing_words_are_kept():
+    found, _ = utterances([(1.5, 10), (2.5, 3000), (0.2, 10), (1.2, 1000), (2, 10)])
+    assert len(found) == 1 and found[0][1] > 5.4
+
+
+def test_length_limit_cuts_speech():
+    pattern = [(1.5, 10), (1.5, 3000), (0.2, 10), (1.5, 3000), (0.2, 10), (1.5, 3000), (1, 10)]
+    found, endpointer = utterances(pattern, max_utterance_frames=32)
+    assert len(found) == 3 and endpointer.forced_endpoints == 2
+    assert found[0][1] == found[1][0] and found[1][1] == found[2][0]     # The speech goes on in the next one
+
+
+def test_noisy_room_ends_at_the_length_limit():
+    found, endpointer = utterances([(1.5, 10), (0.5, 3000), (0.2, 10), (0.6, 3000), (15, 800), (2, 10)])
+    assert endpointer.forced_endpoints == 1
+    assert len(found) == 1      # The floor moved above the noise instead of recording it again
+
+
+def test_fixed_mode_freezes_the_floor():
+    found, endpointer = utterances([(1.5, 10), (2, 3000), (2, 10)], adaptive=False)
+    assert len(found) == 1 and endpointer.noise.rise_rate == 0.0
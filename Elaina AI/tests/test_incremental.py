@@ -0,0 +1,87 @@
+import json
+import numpy
+from neural_network import train_neural_net as tnn
+from neural_network.artifact_cache import ArtifactCache
+from neural_network.incremental import diff_intents, expand_model
+from neural_network.numpy_model import NumpyModel
+
+
+INTENTS = {"intents": [
+    {"tag": "weather", "patterns": ["is it raining", "what is the weather"]},
+    {"tag": "greeting", "patterns": ["hello there", "good morning"]},
+]}
+
+
+def use_intents(monkeypatch, intents):
+    monkeypatch.setattr(tnn, "data", intents)
+
+
+def test_diff_intents():
+    previous = [("hello", "greeting"), ("bye", "goodbye")]
+    current = [("hello", "greeting"), ("what time is it", "time")]
+    diff = diff_intents(previous, current)
+    assert diff.added == [("what time is it", "time")]
+    assert diff.removed == [("bye", "goodbye")]
+    assert diff.new_labels == ["time"] and diff.removed_labels == ["goodbye"]
+
+
+def test_grow_vocabulary():
+    assert tnn.grow_vocabulary(["b", "a", "c"], ["a", "b", "d"]) == ["b", "a", "d"]
+
+
+def test_expand_model_keeps_known_weights():
+    rng = numpy.random.default_rng(0)
+    weights = [rng.normal(size=(3, 4)).astype(numpy.float32), rng.normal(size=(4, 2)).astype(numpy.float32)]
+    biases = [numpy.zeros(4, numpy.float32), numpy.array([0.5, -0.5], numpy.float32)]
+    model = NumpyModel(weights, biases, ["linear", "softmax"], ["a", "b", "c"], ["x", "y"])
+
+    new_weights, new_biases = expand_model(model, ["c", "a", "d"], ["x", "y", "z"])
+    first, last = new_weights[0], new_weights[-1]
+    assert first.shape == (3, 4) and last.shape == (4, 3)
+    assert numpy.array_equal(first[0], weights[0][2]) and numpy.array_equal(first[1], weights[0][0])
+    assert numpy.abs(first[2]).max() < 0.1                 # New word: small random weights
+    assert numpy.array_equal(last[:, :2], weights[1])
+    assert new_biases[-1].tolist() == [0.5, -0.5, 0.0]
+
+
+def test_reencode_keeps_the_stored_order(tmp_path, monkeypatch):
+    use_intents(monkeypatch, INTENTS)
+    cache = ArtifactCache("entry", root=str(tmp_path))
+    _, _, words, labels = tnn.encode_training_data(cache)
+    assert words == sorted(words)
+
+    # The checkpoint of this entry was trained on a grown (unsorted) vocabulary
+    vocabulary = tnn.load_vocabulary(cache)
+    vocabulary["words"], vocabulary["labels"] = words[::-1], labels[::-1]
+    (tmp_path / "entry" / tnn.TRAINED_DATA).write_text(json.dumps(vocabulary))
+
+    training, output, reencoded, relabeled = tnn.encode_training_data(cache)
+    assert reencoded == words[::-1] and relabeled == labels[::-1]
+    assert training[0].tolist() == tnn.bag_of_words("is it raining", reencoded).tolist()
+    assert output[0, relabeled.index("weather")] == 1
+
+
+def test_incremental_encoding_prunes_removed_words(tmp_path, monkeypatch):
+    use_intents(monkeypatch, INTENTS)
+    previous = ArtifactCache("previous", root=str(tmp_path))
+    _, _, words, labels = tnn.encode_training_data(previous)
+
+    edited = {"intents": [
+        {"tag": "weather", "patterns": ["is it raining", "will it snow"]},
+        {"tag": "greeting", "patterns": ["hello there", "good morning"]},
+    ]}
+    use_intents(monkeypatch, edited)
+    _, _, fresh, _ = tnn.encode_training_data(ArtifactCache("fresh", root=str(tmp_path)))
+    training, _, grown, _ = tnn.encode_training_data(ArtifactCache("current", root=str(tmp_path)), words, labels)
+    kept = [w for w in words if w in fresh]
+    assert len(kept) < len(words)                           # "what the weather" is gone
+    assert grown == kept + [w for w in fresh if w not in words]
+    assert training.shape == (4, len(grown))
+
+
+def test_latest_entry_of_a_family(tmp_path):
+    assert ArtifactCache.latest("family", str(tmp_path)) is None
+    cache = ArtifactCache("key", root=str(tmp_path), family="family")
+    cache.write_file("artifact", lambda wf: wf.write(b"x"))
+    cache.mark_latest()
+    assert ArtifactCache.latest("family", str(tmp_path)).key == "key"
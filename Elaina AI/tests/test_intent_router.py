@@ -0,0 +1,72 @@
+import numpy
+from intent_router import IntentRouter, STATIC_TIER, NEURAL_TIER
+from intent_cache import IntentResultCache, LRUCache
+
+WORDS = ["what", "tim", "is", "it", "weath", "today"]
+LABELS = ["time", "weather"]
+
+
+class CountingModel:
+    """
+    Answers "time" with 0.99 for every row, counting the rows it is asked about.
+    """
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, features):
+        self.rows += len(features)
+        return numpy.tile([0.99, 0.01], (len(features), 1))
+
+
+def test_static_rules_skip_the_model():
+    model = CountingModel()
+    router = IntentRouter(model, WORDS, LABELS)
+    result = router.comprehend("elaina open chrome")
+    assert (result.tag, result.slots, result.tier) == ("open", {"app": "chrome"}, STATIC_TIER)
+    assert model.rows == 0
+    assert router.stats.static_hits == 1
+
+
+def test_neural_results_are_cached():
+    model = CountingModel()
+    router = IntentRouter(model, WORDS, LABELS)
+    first = router.comprehend("elaina what time is it")
+    again = router.comprehend_batch(["Elaina, what time is it?", "what time is it"])
+    assert first.tag == "time" and first.tier == NEURAL_TIER
+    assert again == [first, first]
+    assert model.rows == 1
+    assert router.cache.stats.text_hits == 2
+
+
+def test_cache_is_dropped_when_the_model_changes(monkeypatch):
+    model = CountingModel()
+    router = IntentRouter(model, WORDS, LABELS)
+    router.comprehend("elaina what time is it")
+    monkeypatch.setattr(router, "fingerprint", lambda: "new model")
+    router.comprehend("elaina what time is it")
+    assert model.rows == 2
+    assert router.cache.stats.invalidations == 1
+
+
+def test_cache_disabled():
+    model = CountingModel()
+    router = IntentRouter(model, WORDS, LABELS, cache_size=0)
+    router.comprehend_batch(["what time is it", "what time is it"])
+    assert model.rows == 2
+
+
+def test_lru_eviction():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    assert cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+
+
+def test_token_level_hit():
+    cache = IntentResultCache(8)
+    cache.put("what time is it", ("what", "tim"), "result")
+    assert cache.get_text("whats the time") is None
+    assert cache.get_tokens("whats the time", ("what", "tim")) == "result"
+    assert cache.get_text("whats the time") == "result"
@@ -0,0 +1,40 @@
+from long_audio import transcribe_long_audio, transcribe_wav
+from record_audio import write_wav
+from stt_backends import AsyncRecognizer, StandInBackend
+from audio import synthetic_pcm
+
+
+def long_wav(tmp_path, pattern):
+    path = str(tmp_path / "long.wav")
+    write_wav(synthetic_pcm(pattern), path)
+    return path
+
+
+def segments(path):
+    recognizer = AsyncRecognizer(StandInBackend(default_text="hello"), max_workers=2)
+    try:
+        return list(transcribe_long_audio(path, recognizer, max_pending=4))
+    finally:
+        recognizer.shutdown()
+
+
+def test_speech_at_the_start_of_the_file(tmp_path):
+    found = segments(long_wav(tmp_path, [(1.5, 4000), (2, 30), (1, 4000), (2, 30)]))
+    assert len(found) == 2
+    assert found[0].start == 0.0 and 1.5 <= found[0].end < 3.0
+    assert 2.8 < found[1].start <= 3.5 and 4.5 < found[1].end < 6.5     # Pre-roll included
+    assert [segment.index for segment in found] == [0, 1]
+
+
+def test_segments_are_timestamped_in_order(tmp_path):
+    pattern = [(1.5, 30)] + [(0.6, 4000), (1.5, 30)] * 5
+    found = segments(long_wav(tmp_path, pattern))
+    assert len(found) == 5
+    for i, segment in enumerate(found):
+        onset = 1.5 + i * 2.1
+        assert onset - 0.7 < segment.start <= onset and segment.end > onset + 0.6
+        assert segment.text == "hello"
+
+
+def test_transcript_of_a_silent_file(tmp_path):
+    assert transcribe_wav(long_wav(tmp_path, [(3, 30)]), StandInBackend(), workers=1) is None
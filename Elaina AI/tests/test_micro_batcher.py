@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import pytest
+from neural_network.micro_batcher import MicroBatcher
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+    release = threading.Event()
+
+    def predict_batch(texts):
+        release.wait(1)
+        calls.append(list(texts))
+        return [text.upper() for text in texts]
+
+    batcher = MicroBatcher(predict_batch, max_wait=0.05)
+    try:
+        futures = [batcher.submit(text) for text in ("a", "b", "c")]
+        release.set()
+        assert [future.result(1) for future in futures] == ["A", "B", "C"]
+        assert sum(len(call) for call in calls) == 3
+        assert len(calls) < 3
+    finally:
+        batcher.stop()
+
+
+def test_errors_reach_every_caller():
+    def predict_batch(texts):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(predict_batch)
+    try:
+        with pytest.raises(RuntimeError):
+            batcher.comprehend("a", timeout=1)
+    finally:
+        batcher.stop()
+
+
+def test_comprehend_async():
+    batcher = MicroBatcher(lambda texts: [len(text) for text in texts])
+
+    async def run():
+        return await asyncio.gather(*(batcher.comprehend_async(text) for text in ("a", "bb", "ccc")))
+
+    try:
+        assert asyncio.run(run()) == [1, 2, 3]
+    finally:
+        batcher.stop()
@@ -0,0 +1,63 @@
+import struct
+import numpy
+import pytest
+from neural_network.model_format import DTYPES, FORMAT_VERSION, MAGIC, load_model, save_model
+from neural_network.numpy_model import NumpyModel
+
+
+def small_model():
+    rng = numpy.random.default_rng(0)
+    dims = [12, 8, 16, 5]
+    weights = [rng.normal(0, 0.5, (a, b)).astype(numpy.float32) for a, b in zip(dims, dims[1:])]
+    biases = [rng.normal(0, 0.1, b).astype(numpy.float32) for b in dims[1:]]
+    return NumpyModel(weights, biases, ["linear", "linear", "softmax"], [f"w{i}" for i in range(12)], list("abcde"))
+
+
+def inputs():
+    return (numpy.random.default_rng(1).random((40, 12)) < 0.3).astype(numpy.float32)
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_round_trip(tmp_path, dtype):
+    model = small_model()
+    path = str(tmp_path / f"model.{dtype}.bin")
+    save_model(model, path, dtype)
+    mapped = load_model(path)
+
+    assert (mapped.words, mapped.labels, mapped.dtype) == (model.words, model.labels, dtype)
+    expected, probabilities = model.predict(inputs()), mapped.predict(inputs())
+    assert numpy.array_equal(probabilities.argmax(axis=1), expected.argmax(axis=1))
+    assert numpy.abs(probabilities - expected).max() < (1e-6 if dtype == "float32" else 0.05)
+
+
+def test_float32_weights_stay_mapped(tmp_path):
+    path = str(tmp_path / "model.bin")
+    save_model(small_model(), path, "float32")
+    mapped = load_model(path)
+    mapped.predict(inputs())
+    assert all(weight is mapped_weight for weight, mapped_weight in zip(mapped.dequantize(), mapped.weights))
+
+
+def test_quantized_weights_are_dequantized_once(tmp_path):
+    path = str(tmp_path / "model.bin")
+    save_model(small_model(), path, "int8")
+    mapped = load_model(path)
+    mapped.predict(inputs())
+    dequantized = mapped.dequantize()
+    mapped.predict(inputs())
+    assert mapped.dequantize() is dequantized
+    assert all(weight.dtype == numpy.float32 for weight in dequantized)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "model.bin"
+    save_model(small_model(), str(path), "float32")
+    data = path.read_bytes()
+
+    path.write_bytes(b"NOTMODEL" + data[8:])
+    with pytest.raises(ValueError, match="not an Elaina model file"):
+        load_model(str(path))
+
+    path.write_bytes(MAGIC + struct.pack("<I", FORMAT_VERSION + 1) + data[12:])
+    with pytest.raises(ValueError, match="format version"):
+        load_model(str(path))
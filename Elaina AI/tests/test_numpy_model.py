@@ -0,0 +1,41 @@
+import numpy
+import pytest
+from neural_network.numpy_model import NumpyModel, check_parity
+
+
+def small_model():
+    rng = numpy.random.default_rng(0)
+    dims = [6, 8, 4]
+    weights = [rng.normal(0, 0.5, (a, b)) for a, b in zip(dims, dims[1:])]
+    biases = [rng.normal(0, 0.1, b) for b in dims[1:]]
+    return NumpyModel(weights, biases, ["linear", "softmax"], list("abcdef"), ["w", "x", "y", "z"])
+
+
+def test_save_load_round_trip(tmp_path):
+    model = small_model()
+    path = tmp_path / "model.npz"
+    model.save(str(path))
+    loaded = NumpyModel.load(str(path))
+
+    inputs = numpy.eye(6, dtype=numpy.float32)
+    assert numpy.allclose(model.predict(inputs), loaded.predict(inputs))
+    assert loaded.words == model.words and loaded.labels == model.labels
+
+
+def test_predict_returns_probabilities():
+    probabilities = small_model().predict([[1, 0, 1, 0, 0, 0]])
+    assert probabilities.shape == (1, 4)
+    assert numpy.isclose(probabilities.sum(), 1.0)
+
+
+def test_parity_with_tflearn():
+    pytest.importorskip("tflearn")
+    from neural_network.train_neural_net import build_neural_network
+
+    rng = numpy.random.default_rng(0)
+    inputs = rng.integers(0, 2, (20, 12)).astype(numpy.float32)
+    tflearn_model = build_neural_network(12, 5, n_threads=1)
+    numpy_model = NumpyModel.from_tflearn(tflearn_model, None, None)
+
+    passed, max_diff, same_argmax = check_parity(tflearn_model, numpy_model, inputs)
+    assert passed, f"max |diff| {max_diff:.2e}, same prediction on {same_argmax:.1%}"
@@ -0,0 +1,29 @@
+import pytest
+from static_comprehend_text import StaticComprehender, StaticIntent
+
+comprehender = StaticComprehender()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("elaina open chrome", StaticIntent("open", {"app": "chrome"})),
+    ("Elaina, open Chrome.", StaticIntent("open", {"app": "Chrome"})),
+    ("elaina open the spotify application", StaticIntent("open", {"app": "spotify"})),
+    ("elaina start the music application", StaticIntent("open", {"app": "music"})),
+    ("elaina set an alarm at 7:30 am", StaticIntent("alarm", {"time": "7:30 am"})),
+    ("set alarm at 6", StaticIntent("alarm", {"time": "6"})),
+])
+def test_rules(text, expected):
+    assert comprehender.comprehend(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "elaina restart computer",
+    "elaina reopen tabs",
+    "elaina how do i start timer",
+    "elaina can you restart the timer",
+    "elaina openly speaking",
+    "elaina what time is it",
+    "tell elaina to open chrome",
+])
+def test_no_rule_inside_other_words_or_sentences(text):
+    assert comprehender.comprehend(text) is None
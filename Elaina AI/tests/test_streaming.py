@@ -0,0 +1,112 @@
+from endpointer import Segment
+from intent_router import RoutedIntent
+from static_comprehend_text import StaticComprehender
+from streaming import StreamingSession
+from wake_word import WakeWordSpotter
+
+
+class Request:
+    def __init__(self, text):
+        self.text = text
+
+    def done(self):
+        return True
+
+    def expired(self):
+        return False
+
+    def result(self):
+        return self.text
+
+
+class Recognizer:
+    """
+    Transcribes a segment to the text stored in its frames.
+    """
+    def submit(self, frames):
+        return Request(bytes(frames).decode())
+
+
+class Router:
+    """
+    Real static rules, a model that answers "time" for anything mentioning it and "open" otherwise.
+    """
+    static = StaticComprehender()
+
+    def comprehend_static(self, text):
+        intent = self.static.comprehend(text)
+        return RoutedIntent(intent.tag, intent.slots, 1.0, "static") if intent is not None else None
+
+    def comprehend(self, text):
+        return self.comprehend_static(text) or RoutedIntent("time" if "time" in text else "open", {}, 0.99, "neural")
+
+
+def session(intents):
+    return StreamingSession(Recognizer(), Router(), WakeWordSpotter(keyword_spotting=False),
+                            on_intent=intents.append)
+
+
+def test_turn_completes_in_order():
+    intents = []
+    s = session(intents)
+    s.feed(Segment(1, 0, b"elaina", False))
+    s.feed(Segment(1, 1, b"what time is it", True))
+    s.poll()
+    assert [intent.text for intent in intents] == ["elaina what time is it"]
+    assert s.idle
+
+
+def test_dropped_middle_segment_does_not_block_the_turn():
+    intents = []
+    s = session(intents)
+    s.feed(Segment(1, 0, b"elaina", False))
+    s.feed(Segment(1, 2, b"what time is it", True))     # Segment 1 was dropped
+    s.poll()
+    assert [intent.text for intent in intents] == ["elaina what time is it"]
+    assert s.idle
+
+
+def test_dropped_final_segment_is_closed_by_the_next_utterance():
+    intents = []
+    s = session(intents)
+    s.feed(Segment(1, 0, b"elaina what time is it", False))    # Final segment dropped
+    s.poll()
+    s.feed(Segment(2, 0, b"elaina what time is it now", True))
+    s.poll()
+    assert [intent.utterance_id for intent in intents] == [1, 2]
+    assert s.idle
+
+
+def test_close_ends_turns_at_the_end_of_the_stream():
+    intents = []
+    s = session(intents)
+    s.feed(Segment(1, 0, b"elaina", False))
+    s.feed(Segment(1, 1, b"what time is it", False))
+    s.poll()
+    assert not s.idle
+    s.close()
+    s.poll()
+    assert s.idle
+    assert len(intents) == 1
+
+
+def test_command_split_across_segments():
+    intents = []
+    s = session(intents)
+    s.feed(Segment(1, 0, b"elaina open", False))
+    s.poll()
+    assert intents == []        # The model would say "open", but the app is still to come
+    s.feed(Segment(1, 1, b"chrome", True))
+    s.poll()
+    assert [(i.intent.tag, i.intent.slots, i.early) for i in intents] == [("open", {"app": "chrome"}, False)]
+
+
+def test_complete_rule_match_is_decided_early():
+    intents = []
+    s = session(intents)
+    s.feed(Segment(1, 0, b"elaina open chrome", False))
+    s.poll()
+    assert [(i.intent.slots, i.early) for i in intents] == [({"app": "chrome"}, True)]
+    s.feed(Segment(1, 1, b"", True))
+    s.poll()
+    assert len(intents) == 1 and s.idle
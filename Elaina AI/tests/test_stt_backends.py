@@ -0,0 +1,51 @@
+import asyncio
+from stt_backends import AsyncRecognizer, RecognitionError, SpeechBackend, StandInBackend
+
+
+class BrokenBackend(SpeechBackend):
+    def transcribe(self, audio):
+        raise ValueError("corrupt audio")
+
+
+class OfflineBackend(SpeechBackend):
+    def transcribe(self, audio):
+        raise RecognitionError("network unreachable")
+
+
+def test_recognize_reports_failures_as_none():
+    for backend in (BrokenBackend(), OfflineBackend()):
+        recognizer = AsyncRecognizer(backend, max_workers=1)
+        try:
+            assert asyncio.run(recognizer.recognize(b"\0" * 2048)) is None
+        finally:
+            recognizer.shutdown()
+
+
+def test_both_apis_agree():
+    recognizer = AsyncRecognizer(BrokenBackend(), max_workers=1)
+    try:
+        request = recognizer.submit(b"\0" * 2048)
+        request.future.exception(timeout=5)
+        assert request.result() is None
+        assert asyncio.run(recognizer.recognize(b"\0" * 2048)) is None
+    finally:
+        recognizer.shutdown()
+
+
+def test_transcribe_raises_recognize_returns_none():
+    assert OfflineBackend().recognize(b"\0" * 2048) is None
+    assert StandInBackend(default_text="hi").recognize(b"\0" * 2048) == "hi"
+
+
+def test_wav_to_text_reuses_the_recognizer(tmp_path):
+    import audio_to_text
+    from record_audio import write_wav
+    from audio import synthetic_pcm
+
+    path = str(tmp_path / "utterance.wav")
+    write_wav(synthetic_pcm([(0.5, 3000)]), path)
+    backend = StandInBackend(default_text="what time is it")
+    assert audio_to_text.wav_to_text(path, backend) == "what time is it"
+    recognizer = audio_to_text.recognizer
+    assert audio_to_text.wav_to_text(path, backend) == "what time is it"
+    assert audio_to_text.recognizer is recognizer is not None
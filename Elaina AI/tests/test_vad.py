@@ -0,0 +1,44 @@
+from vad import NoiseFloorTracker, VoiceActivityDetector
+from audio import synthetic_pcm
+
+
+def tracker(**options):
+    noise = NoiseFloorTracker(margin=15, adapt_rate=0.05, rise_rate=0.01, fall_rate=0.2, **options)
+    noise.calibrate([1.0] * 16)
+    return noise
+
+
+def test_detector_hangover():
+    vad = VoiceActivityDetector(rms_threshold=20, hangover_frames=3)
+    active = vad.process(synthetic_pcm([(0.128, 3000), (0.384, 10)]))
+    assert active.tolist() == [True, True, True, True, True, False, False, False]
+
+
+def test_speech_does_not_raise_the_floor():
+    noise = tracker()
+    noise.update_speech([90.0] * 500)
+    assert noise.floor == 1.0
+
+
+def test_pauses_move_the_floor():
+    noise = tracker()
+    noise.update_speech([10.0] * 50)       # Near the floor: a pause with a bit more background
+    assert 1.0 < noise.floor < 10.0
+    noise.update_speech([0.5] * 50)
+    assert noise.floor < 1.0
+
+
+def test_relevel_needs_a_stretch_without_pauses():
+    noise = tracker(relevel_frames=8)
+    noise.update_speech([25.0] * 7 + [1.0] + [25.0] * 7)
+    assert not noise.relevel() and noise.floor < 2.0
+
+    noise.update_speech([25.0])
+    assert noise.relevel()
+    assert noise.floor == 25.0 and noise.threshold > 25.0
+
+
+def test_relevel_disabled_by_default():
+    noise = tracker()
+    noise.update_speech([25.0] * 100)
+    assert not noise.relevel()
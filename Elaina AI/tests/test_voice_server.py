@@ -0,0 +1,124 @@
+import time
+import json
+import asyncio
+from audio import synthetic_pcm
+from intent_router import RoutedIntent
+from stt_backends import AsyncRecognizer, StandInBackend
+from voice_server import VoiceServer, VoiceSession
+from wake_word import WakeWordSpotter
+
+MODEL_DELAY = 0.5
+
+
+class SlowRouter:
+    def comprehend_batch(self, texts):
+        time.sleep(MODEL_DELAY)
+        return [RoutedIntent("time", {}, 0.99, "neural") for _ in texts]
+
+
+class Writer:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, data):
+        self.lines.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+
+def test_slow_comprehension_does_not_block_the_event_loop():
+    async def run():
+        server = VoiceServer(SlowRouter(), AsyncRecognizer(StandInBackend()),
+                             WakeWordSpotter(keyword_spotting=False))
+        server.recognitions = asyncio.Semaphore(1)
+        session, writer = VoiceSession(1), Writer()
+        await session.utterances.put((synthetic_pcm([(0.2, 30), (1.5, 4000), (0.3, 30)]), 2.0))
+        await session.utterances.put(None)
+
+        # Largest delay seen by a ticker running next to the session
+        lag = 0.0
+        async def ticker():
+            nonlocal lag
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lag = max(lag, time.perf_counter() - start - 0.01)
+
+        ticking = asyncio.create_task(ticker())
+        await server.process_session(session, writer)
+        ticking.cancel()
+        await server.close()
+        return writer.lines, lag
+
+    lines, lag = asyncio.run(run())
+    assert [line["intent"] for line in lines] == ["time"]
+    assert lines[0]["latency"] >= MODEL_DELAY
+    assert lag < MODEL_DELAY / 2
+
+
+class FailingRouter:
+    def comprehend_batch(self, texts):
+        raise ValueError("model file corrupted")
+
+
+class Reader:
+    def __init__(self, data, size=8192):
+        self.blocks = [data[i:i + size] for i in range(0, len(data), size)]
+
+    async def read(self, n):
+        await asyncio.sleep(0)
+        return self.blocks.pop(0) if self.blocks else b""
+
+
+class ClosingWriter(Writer):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def commands(n):
+    return synthetic_pcm([(1.5, 30)] + [(0.6, 4000), (1.5, 30)] * n)
+
+
+def serve(server, data):
+    async def run():
+        server.recognitions = asyncio.Semaphore(server.max_pending_recognitions)
+        writer = ClosingWriter()
+        await asyncio.wait_for(server.handle_client(Reader(data), writer), 10)
+        await server.close()
+        return writer
+    return asyncio.run(run())
+
+
+def test_failing_utterances_do_not_stop_the_session():
+    server = VoiceServer(FailingRouter(), AsyncRecognizer(StandInBackend()), WakeWordSpotter(keyword_spotting=False),
+                         session_queue_size=1)
+    writer = serve(server, commands(4))
+    assert writer.closed and server.stats.active_sessions == 0
+    assert server.stats.failed_utterances == 4 and server.stats.recognitions == 4
+
+
+def test_session_closes_when_its_worker_dies():
+    class BrokenServer(VoiceServer):
+        async def process_session(self, session, writer):
+            raise RuntimeError("worker crashed")
+
+    server = BrokenServer(SlowRouter(), AsyncRecognizer(StandInBackend()), WakeWordSpotter(keyword_spotting=False),
+                          session_queue_size=1)
+    writer = serve(server, commands(4))
+    assert writer.closed and server.stats.active_sessions == 0
+
+
+def test_backend_errors_are_failed_recognitions():
+    class BrokenBackend(StandInBackend):
+        def transcribe(self, audio):
+            raise ValueError("decoder crashed")
+
+    server = VoiceServer(SlowRouter(), AsyncRecognizer(BrokenBackend()), WakeWordSpotter(keyword_spotting=False),
+                         session_queue_size=1)
+    writer = serve(server, commands(3))
+    assert writer.closed and server.stats.active_sessions == 0
+    assert server.stats.failed_recognitions == 3
+    assert [line["text"] for line in writer.lines[1:]] == [None, None, None]
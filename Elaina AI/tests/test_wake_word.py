@@ -0,0 +1,88 @@
+import importlib.util
+from audio import synthetic_pcm
+from record_audio import MAX_UTTERANCE_LENGTH
+from streaming import StreamingSession
+from endpointer import Segment
+import wake_word
+from wake_word import WakeWordMatcher, WakeWordSpotter, MAX_COMMAND_LENGTH
+
+THRESHOLD = 100     # rms threshold for the synthetic audio (noise ~30, speech ~4000)
+
+
+class KeywordBackend:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def recognize(self, audio):
+        self.calls += 1
+        return self.text
+
+
+def spotter(keyword_backend=None):
+    return WakeWordSpotter(keyword_backend=keyword_backend, keyword_spotting=False)
+
+
+def test_matcher():
+    matcher = WakeWordMatcher(["elaina", "elena"])
+    assert matcher.contains("Elaina what time is it")
+    assert not matcher.contains("helena said hi")
+    assert not matcher.contains(None)
+    assert matcher.strip("elaina open chrome") == "open chrome"
+
+
+def test_screen_rejects_clicks_and_accepts_commands():
+    assert not spotter().screen(synthetic_pcm([(0.2, 30), (0.1, 4000), (0.2, 30)]), THRESHOLD)
+    assert spotter().screen(synthetic_pcm([(0.2, 30), (1.5, 4000), (0.5, 30)]), THRESHOLD)
+
+
+def test_length_limit_matches_the_capture_limit():
+    assert MAX_COMMAND_LENGTH == MAX_UTTERANCE_LENGTH
+    # An utterance cut at the capture limit (plus its pre-roll) is too long to be a command
+    assert not spotter().screen(synthetic_pcm([(0.5, 30), (MAX_UTTERANCE_LENGTH, 4000)]), THRESHOLD)
+
+
+def test_keyword_backend():
+    command = synthetic_pcm([(0.2, 30), (1.5, 4000), (0.5, 30)])
+    assert not spotter(KeywordBackend("open the door")).screen(command, THRESHOLD)
+    assert spotter(KeywordBackend("elaina")).screen(command, THRESHOLD)
+    assert spotter(KeywordBackend(None)).screen(command, THRESHOLD)     # No opinion (backend unavailable)
+
+
+def test_keyword_spotting_by_default(monkeypatch):
+    created = []
+    monkeypatch.setattr(wake_word, "make_keyword_backend", lambda names: created.append(names) or "backend")
+    assert WakeWordSpotter().keyword_backend == "backend"
+    assert created
+
+
+def test_no_keyword_backend_without_pocketsphinx(monkeypatch):
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    assert wake_word.make_keyword_backend() is None
+
+
+def test_streaming_screens_the_first_segment():
+    class Recognizer:
+        submitted = 0
+
+        def submit(self, frames):
+            Recognizer.submitted += 1
+
+    session = StreamingSession(Recognizer(), router=None, spotter=spotter(KeywordBackend("hello")))
+    frames = synthetic_pcm([(0.2, 30), (1.5, 4000), (0.2, 30)])
+    session.feed(Segment(1, 0, frames, False), THRESHOLD)
+    session.feed(Segment(1, 1, frames, True), THRESHOLD)
+    assert Recognizer.submitted == 0
+    assert session.idle
+
+
+def test_stats_are_counted_from_many_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from wake_word import WakeWordStats
+
+    stats = WakeWordStats()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(8):
+            executor.submit(lambda: [stats.count("asr_calls") for _ in range(20000)])
+    assert stats.as_dict()["asr_calls"] == 160000
+    assert "lock" not in stats.as_dict()
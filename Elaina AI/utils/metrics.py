@@ -0,0 +1,292 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Per-stage latency tracing and metrics. Disabled by default: span() then hands
+# back a shared no-op context manager and count() returns immediately, so the
+# instrumentation can stay in the pipeline. Enable with ELAINA_METRICS=1 (or
+# enable()); ELAINA_METRICS_FILE and ELAINA_METRICS_PORT select the exporters
+# (Prometheus text format file / http://127.0.0.1:<port>/metrics), and
+# ELAINA_TRACE_FILE appends every finished span as a JSON line.
+
+import os
+import json
+import time
+import bisect
+import itertools
+import threading
+from collections import deque
+
+
+# ==============================
+# ======| Metrics Presets |=====
+# ==============================
+
+enabled             = os.environ.get("ELAINA_METRICS", "0") == "1"
+METRICS_FILE        = os.environ.get("ELAINA_METRICS_FILE")
+METRICS_PORT        = int(os.environ.get("ELAINA_METRICS_PORT", "0"))  # 0: no endpoint
+TRACE_FILE          = os.environ.get("ELAINA_TRACE_FILE")
+MAX_KEPT_SPANS      = 1024      # Finished spans kept in memory until the next trace export
+EXPORT_INTERVAL     = 10        # Seconds between two writes of METRICS_FILE / TRACE_FILE
+
+# Latency histogram bucket upper bounds (seconds)
+LATENCY_BUCKETS     = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+trace_counter       = itertools.count(1)
+lock                = threading.Lock()
+counters            = {}        # event name -> count
+histograms          = {}        # stage name -> Histogram
+spans               = deque(maxlen=MAX_KEPT_SPANS)
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+# ==============================
+# ======| Recording |===========
+# ==============================
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets    = buckets
+        self.counts     = [0] * len(buckets)
+        self.sum        = 0.0
+        self.count      = 0
+
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Span:
+    __slots__ = ("stage", "trace_id", "start", "duration")
+
+    def __init__(self, stage, trace_id=None):
+        self.stage      = stage
+        self.trace_id   = trace_id
+        self.start      = None
+        self.duration   = None
+
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self.start
+        record_span(self)
+        return False
+
+
+class NullSpan:
+    """
+    Stand-in returned while metrics are disabled.
+    """
+    __slots__ = ()
+    trace_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(stage, trace_id=None):
+    """
+    Time a pipeline stage: with metrics.span("asr.recognize", trace_id): ...
+    """
+    if not enabled:
+        return NULL_SPAN
+    return Span(stage, trace_id)
+
+
+def observe(stage, seconds, trace_id=None):
+    """
+    Record a stage duration measured elsewhere (e.g. in audio time).
+    """
+    if not enabled:
+        return
+    finished = Span(stage, trace_id)
+    finished.start, finished.duration = time.perf_counter() - seconds, seconds
+    record_span(finished)
+
+
+def record_span(finished):
+    with lock:
+        histogram = histograms.get(finished.stage)
+        if histogram is None:
+            histogram = histograms[finished.stage] = Histogram()
+        histogram.observe(finished.duration)
+        spans.append(finished)
+
+
+def count(event, n=1):
+    """
+    Increment an event counter (ASR failures, wake word misses...).
+    """
+    if not enabled:
+        return
+    with lock:
+        counters[event] = counters.get(event, 0) + n
+
+
+def new_trace_id():
+    """
+    Per-utterance trace ID (None while metrics are disabled).
+    """
+    if not enabled:
+        return None
+    return f"{os.getpid():x}-{next(trace_counter):06x}"
+
+
+class TracedFrames(bytes):
+    """
+    Utterance audio carrying its trace ID through the capture queue and the recognizer.
+    """
+    trace_id = None
+
+
+def tag(frames, trace_id):
+    """
+    Attach a trace ID to utterance frames (the frames are returned as they are while disabled).
+    Tracing copies the frames: a memoryview cannot carry the ID.
+    """
+    if trace_id is None:
+        return frames
+    traced = TracedFrames(frames)
+    traced.trace_id = trace_id
+    return traced
+
+
+def trace_of(frames):
+    return getattr(frames, "trace_id", None)
+
+
+# ==============================
+# ======| Export |==============
+# ==============================
+
+def format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def export_text():
+    """
+    Prometheus text exposition format.
+    """
+    lines = ["# HELP elaina_stage_seconds Latency of every pipeline stage.",
+             "# TYPE elaina_stage_seconds histogram"]
+    with lock:
+        for stage, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'elaina_stage_seconds_bucket{{stage="{stage}",le="{format_bound(bound)}"}} {cumulative}')
+            lines.append(f'elaina_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'elaina_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines += ["# HELP elaina_events_total Pipeline events (ASR failures, wake word misses...).",
+                  "# TYPE elaina_events_total counter"]
+        for event, value in sorted(counters.items()):
+            lines.append(f'elaina_events_total{{event="{event}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(filename=None):
+    """
+    Write the metrics to a file (atomically replaced) and flush the finished spans
+    to the trace file, when configured.
+    """
+    filename = filename or METRICS_FILE
+    if filename:
+        temp_filename = f"{filename}.tmp"
+        with open(temp_filename, "w") as wf:
+            wf.write(export_text())
+        os.replace(temp_filename, filename)
+
+    if TRACE_FILE:
+        with lock:
+            finished = list(spans)
+            spans.clear()
+        with open(TRACE_FILE, "a") as wf:
+            for item in finished:
+                wf.write(json.dumps({"trace_id": item.trace_id, "stage": item.stage,
+                                     "start": item.start, "duration": item.duration}) + "\n")
+
+
+def serve_metrics(port=None, host="127.0.0.1"):
+    """
+    Serve export_text() at http://host:port/metrics from a daemon thread.
+    :return: the HTTP server (call shutdown() to stop it)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = export_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port or METRICS_PORT), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="elaina-metrics", daemon=True).start()
+    return server
+
+
+def start_exporters():
+    """
+    Start the configured exporters: the HTTP endpoint (METRICS_PORT) and a daemon
+    thread writing METRICS_FILE / TRACE_FILE every EXPORT_INTERVAL seconds.
+    """
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+    if METRICS_FILE or TRACE_FILE:
+        def export_loop():
+            while True:
+                time.sleep(EXPORT_INTERVAL)
+                write_metrics()
+        threading.Thread(target=export_loop, name="elaina-metrics-export", daemon=True).start()
@@ -0,0 +1,349 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import math
+from collections import deque
+import numpy
+
+# =============================
+# ======| Audio Presets |======
+# =============================
+
+SHORT_NORMALIZE = (1.0/32768.0)
+SAMPLE_WIDTH    = 2             # 16-bit PCM (pyaudio.paInt16)
+SAMPLE_DTYPE    = numpy.dtype("<i2")
+
+
+# ===============================
+# ======| Frame Functions |======
+# ===============================
+
+def frame_view(frame):
+    """
+    Zero-copy int16 view over raw PCM bytes (bytes, bytearray or memoryview).
+    A trailing odd byte (partial sample) is ignored.
+    :param frame: raw 16-bit little-endian PCM audio
+    """
+    usable = len(frame) - (len(frame) % SAMPLE_WIDTH)
+    return numpy.frombuffer(frame, dtype=SAMPLE_DTYPE, count=usable // SAMPLE_WIDTH)
+
+
+def block_view(data, chunk):
+    """
+    Zero-copy (n_chunks, chunk) int16 view over raw PCM bytes. Trailing samples
+    that do not fill a whole chunk are left out.
+    :param data: raw 16-bit PCM audio
+    :param chunk: number of samples per chunk
+    """
+    samples = frame_view(data)
+    n_chunks = len(samples) // chunk
+    return samples[:n_chunks * chunk].reshape(n_chunks, chunk)
+
+
+def block_rms(blocks):
+    """
+    RMS (loudness) of every row of an int16 block, scaled the same way as the
+    original Recorder.rms (normalized rms * 1000).
+    :param blocks: 2D int16 array, one chunk per row
+    """
+    if blocks.shape[1] == 0:
+        return numpy.zeros(blocks.shape[0])
+    # einsum accumulates the squares in float64 without materializing a float copy of the block
+    sum_squares = numpy.einsum("ij,ij->i", blocks, blocks, dtype=numpy.float64)
+    return numpy.sqrt(sum_squares / blocks.shape[1]) * (SHORT_NORMALIZE * 1000)
+
+
+def block_zcr(blocks):
+    """
+    Zero-crossing rate (crossings per sample) of every row of an int16 block.
+    :param blocks: 2D int16 array, one chunk per row
+    """
+    if blocks.shape[1] < 2:
+        return numpy.zeros(blocks.shape[0])
+    signs = numpy.signbit(blocks)
+    crossings = numpy.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1)
+    return crossings / (blocks.shape[1] - 1)
+
+
+def rms(frame):
+    """
+    Function for measuring the rms (loudness) of a single frame.
+    :param frame: recorded frame (raw PCM bytes)
+    """
+    samples = frame_view(frame)
+    if len(samples) == 0:
+        return 0.0
+    return float(block_rms(samples.reshape(1, -1))[0])
+
+
+# ===============================
+# ======| Voice Detection |======
+# ===============================
+
+class VoiceActivityDetector:
+    """
+    Block-based voice activity detector.
+
+    Every chunk is classified as voiced when its rms is at or above the threshold
+    (and, optionally, its zero-crossing rate is at or below zcr_threshold, which
+    rejects hiss-like noise). A hangover keeps the detector active for
+    hangover_frames chunks after the last voiced chunk so that short pauses
+    between words do not end an utterance. State carries over between calls, so
+    audio can be fed one chunk at a time or as a whole recording.
+    """
+
+    def __init__(self, rms_threshold=10, hangover_frames=0, chunk=1024, zcr_threshold=None,
+                 adaptive_hangover=None):
+        """
+        :param rms_threshold: rms at or above which a chunk counts as voiced
+        :param hangover_frames: chunks to stay active after the last voiced chunk
+        :param chunk: samples per chunk
+        :param zcr_threshold: max zero-crossing rate of a voiced chunk (None to disable)
+        :param adaptive_hangover: AdaptiveHangover deciding the hangover from the speech so far
+                                  (hangover_frames is then only its upper bound)
+        """
+        self.rms_threshold      = rms_threshold
+        self.hangover_frames    = hangover_frames
+        self.chunk              = chunk
+        self.zcr_threshold      = zcr_threshold
+        self.adaptive_hangover  = adaptive_hangover
+        self.reset()
+
+
+    def reset(self):
+        """
+        Forget the hangover state (start of a new utterance).
+        """
+        self.frames_since_voice = self.hangover_frames + 1   # chunks since the last voiced chunk (starts inactive)
+        self.frames_seen        = 0
+        if self.adaptive_hangover is not None:
+            self.adaptive_hangover.reset()
+
+
+    def analyze(self, data):
+        """
+        Compute per-chunk rms, zero-crossing rate and raw (hangover-free) voicing.
+        :param data: raw PCM bytes holding one or more whole chunks
+        :return: (rms, zcr, voiced) numpy arrays, one entry per chunk
+        """
+        blocks = block_view(data, self.chunk)
+        energy = block_rms(blocks)
+        zcr = block_zcr(blocks)
+
+        voiced = energy >= self.rms_threshold
+        if self.zcr_threshold is not None:
+            voiced &= zcr <= self.zcr_threshold
+        return energy, zcr, voiced
+
+
+    def process(self, data):
+        """
+        Run the detector (including hangover) over one or more chunks.
+        :param data: raw PCM bytes holding one or more whole chunks
+        :return: boolean numpy array, True for every chunk inside speech
+        """
+        _, _, voiced = self.analyze(data)
+        return self.apply_hangover(voiced)
+
+
+    def apply_hangover(self, voiced):
+        """
+        Hangover state machine, vectorized over a block of raw voicing decisions.
+        :param voiced: boolean array of raw per-chunk voicing
+        :return: boolean array, True while within hangover_frames of a voiced chunk
+        """
+        n = len(voiced)
+        if n == 0:
+            return numpy.zeros(0, dtype=bool)
+        if self.adaptive_hangover is not None:
+            return self.apply_adaptive_hangover(voiced)
+
+        idx = numpy.arange(n)
+        # Index of the most recent voiced chunk (carried over from the previous call)
+        last_voiced = numpy.where(voiced, idx, -self.frames_since_voice - 1)
+        last_voiced = numpy.maximum.accumulate(last_voiced)
+        since_voice = idx - last_voiced
+
+        self.frames_since_voice = int(since_voice[-1])
+        self.frames_seen += n
+        return since_voice <= self.hangover_frames
+
+
+    def apply_adaptive_hangover(self, voiced):
+        """
+        Same as apply_hangover, with a hangover that changes chunk by chunk.
+        """
+        active = numpy.empty(len(voiced), dtype=bool)
+        for i, is_voiced in enumerate(voiced):
+            if is_voiced:
+                self.adaptive_hangover.voiced(self.frames_since_voice)
+                self.frames_since_voice = 0
+            else:
+                self.frames_since_voice += 1
+            active[i] = self.frames_since_voice <= self.current_hangover()
+        self.frames_seen += len(voiced)
+        return active
+
+
+    def current_hangover(self):
+        if self.adaptive_hangover is None:
+            return self.hangover_frames
+        return min(self.adaptive_hangover.hangover_frames, self.hangover_frames)
+
+
+    def is_active(self):
+        """
+        True while the detector is inside speech or its hangover.
+        """
+        return self.frames_since_voice <= self.current_hangover()
+
+
+class AdaptiveHangover:
+    """
+    Hangover that follows the speech so far. Until min_speech_frames voiced chunks
+    were heard (the user may still be pausing after the wake word) the full
+    hangover applies. After that it is pause_factor times the longest pause seen
+    inside the utterance, within [min_frames, max_frames]: a command spoken in one
+    go ends quickly, one with long pauses between words keeps a long hangover.
+    """
+
+    def __init__(self, min_frames, max_frames, min_speech_frames, pause_factor=1.5):
+        """
+        :param min_frames: shortest hangover (chunks)
+        :param max_frames: longest hangover (chunks)
+        :param min_speech_frames: voiced chunks before the hangover may shrink
+        :param pause_factor: hangover relative to the longest pause inside the utterance
+        """
+        self.min_frames         = min_frames
+        self.max_frames         = max_frames
+        self.min_speech_frames  = min_speech_frames
+        self.pause_factor       = pause_factor
+        self.reset()
+
+
+    def reset(self):
+        self.speech_frames  = 0     # Voiced chunks of the utterance
+        self.longest_pause  = 0     # Longest run of silent chunks between two voiced chunks
+        self.hangover_frames = self.max_frames
+
+
+    def voiced(self, pause_frames):
+        """
+        A voiced chunk ended a pause of pause_frames silent chunks.
+        """
+        if self.speech_frames > 0:
+            self.longest_pause = max(self.longest_pause, pause_frames)
+        self.speech_frames += 1
+
+        if self.speech_frames < self.min_speech_frames:
+            self.hangover_frames = self.max_frames
+        else:
+            hangover = math.ceil(self.longest_pause * self.pause_factor)
+            self.hangover_frames = min(max(hangover, self.min_frames), self.max_frames)
+
+
+class NoiseFloorTracker:
+    """
+    Continuous background noise estimate. Silent chunks move the floor with an
+    exponential moving average. Inside speech only chunks near the floor (below
+    the threshold, i.e. the pauses between words) move it: down quickly when
+    they are quieter than the floor, up at rise_rate otherwise. Speech itself
+    never raises the floor, however long or loud it is, so quieter words late in
+    an utterance still count as speech. A background level that jumps above the
+    threshold is only recognized when it fills a whole utterance up to the length
+    limit (see relevel).
+    """
+
+    def __init__(self, margin=15, adapt_rate=0.05, rise_rate=0.0, fall_rate=0.2,
+                 relevel_frames=0, relevel_percentile=95):
+        """
+        :param margin: rms above the floor that counts as speech
+        :param adapt_rate: weight of every silent chunk
+        :param rise_rate: weight of a near-floor chunk louder than the floor inside speech (0 freezes the floor)
+        :param fall_rate: weight of a quieter-than-floor chunk inside speech
+        :param relevel_frames: chunks without a pause that relevel takes for background noise (0 disables it)
+        :param relevel_percentile: percentile of those chunks the floor is moved to
+        """
+        self.margin     = margin
+        self.adapt_rate = adapt_rate
+        self.rise_rate  = rise_rate
+        self.fall_rate  = fall_rate
+        self.floor      = None
+        self.relevel_percentile = relevel_percentile
+        self.loud       = deque(maxlen=relevel_frames) if relevel_frames else None  # rms since the last pause
+
+
+    @property
+    def threshold(self):
+        return self.floor + self.margin
+
+
+    def calibrate(self, energy):
+        """
+        Initial estimate from the rms of a stretch of background audio.
+        """
+        self.floor = float(numpy.mean(energy))
+
+
+    def update_silence(self, energy):
+        floor = self.floor
+        for value in energy:
+            floor += self.adapt_rate * (value - floor)
+        self.floor = floor
+        if self.loud is not None:
+            self.loud.clear()
+
+
+    def update_speech(self, energy):
+        floor = self.floor
+        for value in energy:
+            near_floor = value < floor + self.margin
+            if value < floor:
+                floor += self.fall_rate * (value - floor)
+            elif near_floor:
+                floor += self.rise_rate * (value - floor)
+            if self.loud is not None:
+                if near_floor:
+                    self.loud.clear()
+                else:
+                    self.loud.append(value)
+        self.floor = floor
+
+
+    def relevel(self):
+        """
+        An utterance was cut at the length limit. If its last relevel_frames chunks had
+        no pause at all, that level is background noise (a fan, a crowd) rather than
+        speech: the floor moves above most of it so the recording can end.
+        :return: True if the floor was moved
+        """
+        if self.loud is None or len(self.loud) < self.loud.maxlen:
+            return False
+        self.floor = float(numpy.percentile(self.loud, self.relevel_percentile))
+        self.loud.clear()
+        return True
@@ -0,0 +1,314 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Elaina as a service: an asyncio server accepting many concurrent audio streams.
+# Protocol: a client connects (TCP on localhost, or a Unix socket) and waits for
+# the greeting line, {"session": id} or {"error": "server busy"}. It then streams
+# raw 16 kHz mono 16-bit little-endian PCM and closes its write side when done.
+# The server answers with one JSON line per utterance and closes the connection
+# after the last one. Every session has its own Endpointer (VAD, noise floor, pre-roll);
+# all sessions share one recognizer pool and one router (model + featurizer). Model
+# calls go through a MicroBatcher: they run on its thread, never on the event loop,
+# and utterances finishing together across sessions share one forward pass. The
+# wake word screen runs on a worker thread too: nothing slow blocks the other sessions.
+#
+# Backpressure: at most MAX_PENDING_RECOGNITIONS recognitions run at once; a
+# session whose utterance queue is full stops reading its socket, so a client
+# streaming faster than Elaina can answer is slowed down by TCP flow control.
+#
+# Usage (from this directory):
+#   python voice_server.py                         # 127.0.0.1:8765
+#   python voice_server.py --unix /tmp/elaina.sock --backend standin
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+from endpointer import Endpointer
+from stt_backends import AsyncRecognizer, get_backend, MAX_WORKERS
+from neural_network.micro_batcher import MicroBatcher
+from wake_word import WakeWordSpotter
+from utils.helper import eprint
+from vad import SAMPLE_WIDTH
+from record_audio import CHUNK, CHANNELS, RATE
+
+
+# ==================================
+# ======| Voice Server Presets |=====
+# ==================================
+
+SERVER_HOST                 = "127.0.0.1"
+SERVER_PORT                 = 8765
+READ_SIZE                   = CHUNK * CHANNELS * SAMPLE_WIDTH * 4   # Bytes read from a socket at once
+MAX_SESSIONS                = 64        # Connections served at once, later ones are refused
+SESSION_QUEUE_SIZE          = 4         # Utterances of a session waiting for recognition
+MAX_PENDING_RECOGNITIONS    = MAX_WORKERS * 2   # Recognitions in flight across all sessions
+
+BYTES_PER_SECOND            = RATE * CHANNELS * SAMPLE_WIDTH
+
+
+class SessionStats:
+    def __init__(self):
+        self.sessions           = 0
+        self.refused_sessions   = 0
+        self.active_sessions    = 0
+        self.utterances         = 0
+        self.recognitions       = 0
+        self.failed_recognitions = 0
+        self.failed_utterances  = 0     # Utterances dropped on an unexpected error (screen, router, ...)
+
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class VoiceSession:
+    def __init__(self, session_id, queue_size=SESSION_QUEUE_SIZE):
+        """
+        Per-connection state: endpointing and the utterances waiting for recognition.
+        """
+        self.session_id     = session_id
+        self.endpointer     = Endpointer()
+        self.utterances     = asyncio.Queue(maxsize=queue_size)   # (utterance number, frames, end offset), None at the end
+        self.pending        = bytearray()   # Received bytes that do not fill a whole chunk yet
+        self.bytes_fed      = 0
+
+
+    def feed(self, data):
+        """
+        :return: list of (frames, end offset in seconds) of the utterances finished by data
+        """
+        self.pending.extend(data)
+        whole = len(self.pending) - len(self.pending) % self.endpointer.chunk_bytes
+        if whole == 0:
+            return []
+        block = bytes(self.pending[:whole])
+        del self.pending[:whole]
+        self.bytes_fed += whole
+        return [(frames, self.bytes_fed / BYTES_PER_SECOND) for frames in self.endpointer.feed(block)]
+
+
+    def flush(self):
+        return [(frames, self.bytes_fed / BYTES_PER_SECOND) for frames in self.endpointer.flush()]
+
+
+class VoiceServer:
+    def __init__(self, router, recognizer=None, spotter=None, max_sessions=MAX_SESSIONS,
+                 session_queue_size=SESSION_QUEUE_SIZE, max_pending_recognitions=MAX_PENDING_RECOGNITIONS,
+                 batcher=None):
+        """
+        :param router: IntentRouter shared by every session (see intent_router.load_router)
+        :param recognizer: AsyncRecognizer shared by every session
+        :param spotter: WakeWordSpotter screening utterances before recognition
+        :param max_sessions: connections served at once
+        :param session_queue_size: utterances of a session waiting for recognition
+        :param max_pending_recognitions: recognitions in flight across all sessions
+        :param batcher: MicroBatcher serving the router (one over router.comprehend_batch by default)
+        """
+        self.router             = router
+        self.batcher            = batcher if batcher is not None else MicroBatcher(router.comprehend_batch)
+        self.recognizer         = recognizer if recognizer is not None else AsyncRecognizer()
+        self.spotter            = spotter if spotter is not None else WakeWordSpotter()
+        self.max_sessions       = max_sessions
+        self.session_queue_size = session_queue_size
+        self.max_pending_recognitions = max_pending_recognitions
+        self.recognitions       = None      # asyncio.Semaphore, created on the server's loop
+        self.session_ids        = itertools.count(1)
+        self.stats              = SessionStats()
+        self.server             = None
+
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT, unix_path=None):
+        self.recognitions = asyncio.Semaphore(self.max_pending_recognitions)
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server
+
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.recognizer.shutdown()
+        self.batcher.stop()
+
+
+    # ==============================
+    # ======| Session Handling |=====
+    # ==============================
+
+    async def handle_client(self, reader, writer):
+        if self.stats.active_sessions >= self.max_sessions:
+            self.stats.refused_sessions += 1
+            await self.send(writer, {"error": "server busy"})
+            writer.close()
+            return
+
+        session = VoiceSession(next(self.session_ids), self.session_queue_size)
+        self.stats.sessions += 1
+        self.stats.active_sessions += 1
+        worker = asyncio.create_task(self.process_session(session, writer))
+        try:
+            await self.send(writer, {"session": session.session_id})
+            await self.stream_session(reader, session, worker)
+        except ConnectionError as e:
+            eprint(f"Session {session.session_id} lost: {e!r}", dev=True)
+        finally:
+            try:
+                await self.enqueue(session, worker, None)
+                await worker
+            except Exception as e:
+                eprint(f"Session {session.session_id} failed: {e!r}", dev=True)
+            finally:
+                self.stats.active_sessions -= 1
+                writer.close()
+
+
+    async def stream_session(self, reader, session, worker):
+        """
+        Read a session's audio and queue its utterances, until the client is done
+        or the session worker stopped.
+        """
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+            for utterance in session.feed(data):
+                if not await self.enqueue(session, worker, utterance):
+                    return
+        for utterance in session.flush():
+            if not await self.enqueue(session, worker, utterance):
+                return
+
+
+    @staticmethod
+    async def enqueue(session, worker, item):
+        """
+        Queue an utterance for the session worker. Waits (stops reading) while the queue
+        is full, but not on a worker that has stopped: nothing would drain the queue.
+        :return: False if the worker has stopped
+        """
+        if worker.done():
+            return False
+        if not session.utterances.full():
+            session.utterances.put_nowait(item)
+            return True
+        put = asyncio.ensure_future(session.utterances.put(item))
+        await asyncio.wait({put, worker}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            return False
+        return True
+
+
+    async def process_session(self, session, writer):
+        """
+        Recognize and comprehend the utterances of one session in order. An utterance
+        that fails is logged and dropped; the session goes on with the next one.
+        """
+        for number in itertools.count(1):
+            item = await session.utterances.get()
+            if item is None:
+                return
+            self.stats.utterances += 1
+            try:
+                await self.process_utterance(session, writer, number, *item)
+            except Exception as e:
+                self.stats.failed_utterances += 1
+                eprint(f"Session {session.session_id} utterance {number} failed: {e!r}", dev=True)
+
+
+    async def process_utterance(self, session, writer, number, frames, end_offset):
+        start = time.perf_counter()
+
+        # Off the event loop: the keyword backend can take a while
+        if not await asyncio.to_thread(self.spotter.screen, frames, session.endpointer.rms_threshold):
+            return
+
+        async with self.recognitions:
+            text = await self.recognizer.recognize(frames)
+        self.stats.recognitions += 1
+        if text is None:
+            self.stats.failed_recognitions += 1
+
+        response = {"session": session.session_id, "utterance": number, "end_offset": end_offset,
+                    "text": text, "intent": None, "slots": {}, "confidence": None}
+        if self.spotter.confirm(text):
+            result = await self.batcher.comprehend_async(text)
+            response.update(intent=result.tag, slots=result.slots, confidence=result.confidence)
+        response["latency"] = time.perf_counter() - start
+
+        try:
+            await self.send(writer, response)
+        except ConnectionError:
+            pass    # Client gone, keep draining its queue
+
+
+    @staticmethod
+    async def send(writer, message):
+        writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        await writer.drain()
+
+
+async def run_server(router, recognizer, host=SERVER_HOST, port=SERVER_PORT, unix_path=None,
+                     max_sessions=MAX_SESSIONS):
+    server = VoiceServer(router, recognizer, max_sessions=max_sessions)
+    await server.start(host, port, unix_path)
+    eprint(f"Serving on {unix_path or f'{host}:{port}'}", user=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+        eprint(f"Sessions: {server.stats.as_dict()}", dev=True)
+        eprint(f"Comprehension tiers: {router.stats.as_dict()}", dev=True)
+
+
+if __name__ == "__main__":
+    from intent_router import load_router
+
+    parser = argparse.ArgumentParser(description="Serve Elaina to many audio streams at once.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--backend", help="speech-to-text backend (see stt_backends.BACKENDS)")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    args = parser.parse_args()
+
+    router = load_router()
+    recognizer = AsyncRecognizer(get_backend(args.backend))
+    try:
+        asyncio.run(run_server(router, recognizer, args.host, args.port, args.unix, args.max_sessions))
+    except KeyboardInterrupt:
+        sys.exit(0)
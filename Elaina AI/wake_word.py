@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+# -*- coding: UTF-8 -*-
+
+# Copyright (c) 2022 Kevin Liu
+# Elaina Voice Assistant (single & multi core) 
+# MIT License
+# Hosted at: https://github.com/ReZeroE/Elaina-Voice-Assistant
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Wake-word stage in front of speech recognition. Every utterance first goes through
+# cheap checks on the captured audio and, when pocketsphinx is installed, an offline
+# keyword recognizer on its first seconds; only utterances that pass are sent to the
+# full recognizer.
+# The transcript is then matched against all AI_NAME_ALT variants with one
+# precompiled regex.
+
+import re
+import threading
+import importlib.util
+import numpy
+from constants import AI_NAME_ALT
+from utils import metrics
+from utils.helper import eprint
+from vad import VoiceActivityDetector, SAMPLE_WIDTH
+from record_audio import CHUNK, RATE, MAX_UTTERANCE_LENGTH
+
+
+# ================================
+# ======| Wake Word Presets |=====
+# ================================
+
+MIN_VOICED_FRAMES   = 4     # Voiced chunks (~64ms each) needed to be speech rather than a click or cough
+PARTIAL_LENGTH      = 1.5   # Seconds of audio given to the keyword backend
+KEYWORD_SPOTTING    = True  # Check the first seconds for the wake word offline (pocketsphinx, when installed)
+
+# Seconds; longer sound is conversation/TV rather than a command. The capture cuts
+# utterances at MAX_UTTERANCE_LENGTH, so an utterance that long ran into the limit.
+MAX_COMMAND_LENGTH  = MAX_UTTERANCE_LENGTH or 15
+
+
+def make_keyword_backend(names=AI_NAME_ALT):
+    """
+    Offline keyword spotting backend for the wake word, None when pocketsphinx is not installed.
+    """
+    if importlib.util.find_spec("pocketsphinx") is None:
+        eprint("pocketsphinx not installed, the wake word is only checked in full transcripts", dev=True)
+        return None
+    from stt_backends import SphinxKeywordBackend
+    return SphinxKeywordBackend(names)
+
+
+class WakeWordMatcher:
+    def __init__(self, names=AI_NAME_ALT):
+        """
+        All name variants compiled into a single case-insensitive regex.
+        :param names: wake word variants
+        """
+        self.names = list(names)
+        alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+        self.pattern = re.compile(rf"\b(?:{alternatives})\b", re.IGNORECASE)
+
+
+    def contains(self, text):
+        return text is not None and self.pattern.search(text) is not None
+
+
+    def strip(self, text):
+        """
+        Remove every wake word occurrence (and the whitespace around it).
+        """
+        return " ".join(self.pattern.sub(" ", text).split())
+
+
+class WakeWordStats:
+    def __init__(self):
+        self.lock               = threading.Lock()  # screen() runs on several worker threads (voice_server.py)
+        self.utterances         = 0     # Utterances screened
+        self.rejected_acoustic  = 0     # Too little voiced audio, or too long
+        self.rejected_keyword   = 0     # Keyword backend did not hear the wake word
+        self.asr_calls          = 0     # Utterances passed on to full recognition
+        self.wake_word_hits     = 0     # Transcripts containing the wake word
+        self.wake_word_misses   = 0     # Transcripts without it (full ASR call spent for nothing)
+
+
+    @property
+    def asr_calls_saved(self):
+        return self.rejected_acoustic + self.rejected_keyword
+
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+    def as_dict(self):
+        with self.lock:
+            stats = {name: value for name, value in vars(self).items() if name != "lock"}
+        stats["asr_calls_saved"] = stats["rejected_acoustic"] + stats["rejected_keyword"]
+        return stats
+
+
+class WakeWordSpotter:
+    def __init__(self, matcher=None, keyword_backend=None, min_voiced_frames=MIN_VOICED_FRAMES,
+                 max_command_length=MAX_COMMAND_LENGTH, partial_length=PARTIAL_LENGTH,
+                 keyword_spotting=KEYWORD_SPOTTING):
+        """
+        :param matcher: WakeWordMatcher (AI_NAME_ALT by default)
+        :param keyword_backend: cheap SpeechBackend run on the first partial_length seconds; the
+                                utterance is dropped when its text lacks the wake word
+                                (make_keyword_backend() by default)
+        :param min_voiced_frames: voiced chunks an utterance needs
+        :param max_command_length: seconds from which an utterance is dropped
+        :param partial_length: seconds of audio given to keyword_backend
+        :param keyword_spotting: False to only run the acoustic checks
+        """
+        if keyword_backend is None and keyword_spotting:
+            keyword_backend = make_keyword_backend(matcher.names if matcher is not None else AI_NAME_ALT)
+
+        self.matcher            = matcher if matcher is not None else WakeWordMatcher()
+        self.keyword_backend    = keyword_backend
+        self.min_voiced_frames  = min_voiced_frames
+        self.max_command_bytes  = int(max_command_length * RATE) * SAMPLE_WIDTH
+        self.partial_bytes      = int(partial_length * RATE) * SAMPLE_WIDTH
+        self.stats              = WakeWordStats()
+
+
+    def screen(self, frames, rms_threshold):
+        """
+        Decide whether an utterance is worth a full recognition.
+        :param frames: raw PCM audio of the utterance
+        :param rms_threshold: current speech threshold of the capture (see CaptureService)
+        :return: True to recognize it, False to drop it
+        """
+        self.stats.count("utterances")
+
+        with metrics.span("wake_word.screen", metrics.trace_of(frames)):
+            voiced = VoiceActivityDetector(rms_threshold, chunk=CHUNK).analyze(frames)[2]
+            if numpy.count_nonzero(voiced) < self.min_voiced_frames or len(frames) >= self.max_command_bytes:
+                self.stats.count("rejected_acoustic")
+                metrics.count("wake_word_rejected_acoustic")
+                return False
+
+            if self.keyword_backend is not None:
+                partial_text = self.keyword_backend.recognize(memoryview(frames)[:self.partial_bytes])
+                if partial_text is not None and not self.matcher.contains(partial_text):
+                    self.stats.count("rejected_keyword")
+                    metrics.count("wake_word_rejected_keyword")
+                    return False
+
+        self.stats.count("asr_calls")
+        return True
+
+
+    def confirm(self, transcript):
+        """
+        Check a full transcript for the wake word.
+        """
+        found = self.matcher.contains(transcript)
+        if found:
+            self.stats.count("wake_word_hits")
+            metrics.count("wake_word_hits")
+        elif transcript is not None:
+            self.stats.count("wake_word_misses")
+            metrics.count("wake_word_misses")
+        return found